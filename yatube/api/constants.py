@@ -0,0 +1,2 @@
+API_PAGE_SIZE = 10
+API_MAX_PAGE_SIZE = 100
@@ -0,0 +1,108 @@
+"""Сериализаторы API поверх строк .values().
+
+Объекты моделей не создаются: запрос выбирает только колонки полей,
+перечисленных в ?fields=, и каждая строка сразу превращается в
+словарь ответа.
+"""
+from django.core.exceptions import ValidationError
+
+from posts.constants import FEED_ORDERING
+from posts.models import Comment, Follow, Group, Post
+
+
+def file_url(model, field_name):
+    """Преобразование имени файла из .values() в его URL.
+
+    Строки — не объекты модели, поэтому хранилище берётся у поля: то
+    же, что дало бы obj.<поле>.storage.
+    """
+    storage = model._meta.get_field(field_name).storage
+
+    def url(name):
+        return storage.url(name) if name else None
+    return url
+
+
+class Serializer:
+    model = None
+    # Имя поля в ответе -> путь для .values().
+    fields = {}
+    # Преобразования значений, которые JSON не выразит сам.
+    converters = {}
+    ordering = ('id',)
+
+    def __init__(self, names=None):
+        """names — строка ?fields= через запятую; пусто — все поля."""
+        if names:
+            self.names = [name.strip() for name in names.split(',')]
+        else:
+            self.names = list(self.fields)
+        unknown = [name for name in self.names if name not in self.fields]
+        if unknown:
+            raise ValidationError(
+                'Неизвестные поля: %(fields)s.',
+                params={'fields': ', '.join(unknown)},
+            )
+
+    def values(self, queryset):
+        """Строки запроса с полями ответа и ключами сортировки."""
+        lookups = {self.fields[name] for name in self.names}
+        lookups.update(field.lstrip('-') for field in self.ordering)
+        return queryset.values(*lookups)
+
+    def to_dict(self, row):
+        data = {}
+        for name in self.names:
+            value = row[self.fields[name]]
+            convert = self.converters.get(name)
+            data[name] = value if convert is None else convert(value)
+        return data
+
+
+class PostSerializer(Serializer):
+    model = Post
+    fields = {
+        'id': 'id',
+        'text': 'text',
+        'pub_date': 'pub_date',
+        'author': 'author__username',
+        'group': 'group__slug',
+        'image': 'image',
+        'image_width': 'image_width',
+        'image_height': 'image_height',
+        'comment_count': 'comment_count',
+    }
+    converters = {'image': file_url(Post, 'image')}
+    ordering = FEED_ORDERING
+
+
+class GroupSerializer(Serializer):
+    model = Group
+    fields = {
+        'id': 'id',
+        'title': 'title',
+        'slug': 'slug',
+        'description': 'description',
+    }
+
+
+class CommentSerializer(Serializer):
+    model = Comment
+    fields = {
+        'id': 'id',
+        'post': 'post_id',
+        'author': 'author__username',
+        'text': 'text',
+        'created': 'created',
+    }
+    ordering = ('created', 'id')
+
+
+class FollowSerializer(Serializer):
+    model = Follow
+    fields = {
+        'id': 'id',
+        'author': 'author__username',
+        'created': 'pub_date',
+    }
+    ordering = ('-pub_date', '-id')
@@ -0,0 +1,135 @@
+from unittest import mock
+
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from posts.models import Comment, Follow, Group, Post, User
+
+
+class ApiTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user('api_user')
+        cls.author = User.objects.create_user('api_author')
+        cls.group = Group.objects.create(
+            title='Группа', slug='api-group', description='Описание'
+        )
+        cls.posts = [
+            Post.objects.create(
+                text=f'Пост {i}', author=cls.author,
+                group=cls.group if i % 2 else None,
+            )
+            for i in range(15)
+        ]
+        cls.post = cls.posts[-1]
+        for i in range(3):
+            Comment.objects.create(
+                text=f'Комментарий {i}', author=cls.user, post=cls.post
+            )
+        Follow.objects.create(user=cls.user, author=cls.author)
+
+    def setUp(self):
+        self.client = Client()
+
+    def get(self, name, *args, **params):
+        return self.client.get(reverse(f'api:{name}', args=args), params)
+
+    def test_post_list_pages_by_cursor(self):
+        """Курсор next обходит все посты без повторов."""
+        response = self.get('post_list', limit=10)
+        data = response.json()
+        self.assertEqual(response['Content-Type'], 'application/json')
+        self.assertEqual(len(data['results']), 10)
+        self.assertIsNone(data['previous'])
+        self.assertEqual(data['results'][0]['id'], self.post.pk)
+        self.assertEqual(data['results'][0]['author'], 'api_author')
+        second = self.client.get(data['next']).json()
+        ids = [post['id'] for post in data['results'] + second['results']]
+        self.assertEqual(
+            ids, [post.pk for post in reversed(self.posts)]
+        )
+        self.assertIsNone(second['next'])
+        self.assertIsNotNone(second['previous'])
+
+    def test_post_list_filters(self):
+        data = self.get('post_list', group='api-group').json()
+        self.assertEqual(len(data['results']), 7)
+        self.assertEqual(
+            {post['group'] for post in data['results']}, {'api-group'}
+        )
+        data = self.get('post_list', author='api_user').json()
+        self.assertEqual(data['results'], [])
+
+    def test_sparse_fieldsets(self):
+        data = self.get('post_detail', self.post.pk, fields='id,text').json()
+        self.assertEqual(data, {'id': self.post.pk, 'text': self.post.text})
+
+    def test_image_url_from_field_storage(self):
+        """URL картинки строит хранилище поля image, а не default_storage."""
+        Post.objects.filter(pk=self.post.pk).update(image='posts/api.webp')
+        storage = Post._meta.get_field('image').storage
+        with mock.patch.object(storage, 'url', return_value='/cdn/api.webp'):
+            data = self.get(
+                'post_detail', self.post.pk, fields='image'
+            ).json()
+        self.assertEqual(data, {'image': '/cdn/api.webp'})
+
+    def test_unknown_field_rejected(self):
+        response = self.get('post_list', fields='id,password')
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('password', response.json()['detail'])
+
+    def test_bad_limit_rejected(self):
+        for limit in ('0', '1000', 'many'):
+            with self.subTest(limit=limit):
+                response = self.get('post_list', limit=limit)
+                self.assertEqual(response.status_code, 400)
+
+    def test_etag_not_modified(self):
+        """Повтор с If-None-Match получает 304 без тела."""
+        url = reverse('api:post_detail', args=[self.post.pk])
+        etag = self.client.get(url)['ETag']
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response.content, b'')
+        post = Post.objects.get(pk=self.post.pk)
+        post.text = 'Новый текст'
+        post.save()
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_post_list_is_one_query(self):
+        """Страница API — один запрос, сколько бы постов на ней ни было."""
+        with self.assertNumQueries(1):
+            self.get('post_list', limit=15)
+
+    def test_comments(self):
+        data = self.get('comment_list', self.post.pk).json()
+        self.assertEqual(
+            [comment['text'] for comment in data['results']],
+            ['Комментарий 0', 'Комментарий 1', 'Комментарий 2'],
+        )
+        response = self.get('comment_list', 0)
+        self.assertEqual(response.status_code, 404)
+
+    def test_groups(self):
+        data = self.get('group_list').json()
+        self.assertEqual(
+            [group['slug'] for group in data['results']], ['api-group']
+        )
+        data = self.get('group_detail', 'api-group', fields='title').json()
+        self.assertEqual(data, {'title': 'Группа'})
+        self.assertEqual(self.get('group_detail', 'missing').status_code, 404)
+
+    def test_follows_require_login(self):
+        self.assertEqual(self.get('follow_list').status_code, 401)
+        self.client.force_login(self.user)
+        data = self.get('follow_list').json()
+        self.assertEqual(
+            [follow['author'] for follow in data['results']], ['api_author']
+        )
+
+    def test_read_only(self):
+        response = self.client.post(reverse('api:post_list'), {'text': 'x'})
+        self.assertEqual(response.status_code, 405)
@@ -0,0 +1,147 @@
+import hashlib
+import json
+from functools import wraps
+
+from django.core.exceptions import ValidationError
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import Http404, HttpResponse
+from django.utils.cache import get_conditional_response
+from django.utils.http import quote_etag
+
+from core.routers import replica_reads
+from posts.models import Comment, Follow, Group, Post
+from posts.utils import CursorPaginator
+
+from .constants import API_MAX_PAGE_SIZE, API_PAGE_SIZE
+from .serializers import (
+    CommentSerializer, FollowSerializer, GroupSerializer, PostSerializer,
+)
+
+JSON_CONTENT_TYPE = 'application/json'
+
+
+def json_response(request, data, status=200):
+    """Ответ JSON с ETag; при совпадении If-None-Match — 304 без тела."""
+    content = json.dumps(data, cls=DjangoJSONEncoder, ensure_ascii=False)
+    content = content.encode()
+    etag = quote_etag(hashlib.md5(content).hexdigest())
+    response = None
+    if status == 200:
+        response = get_conditional_response(request, etag=etag)
+    if response is None:
+        response = HttpResponse(
+            content, content_type=JSON_CONTENT_TYPE, status=status
+        )
+    response['ETag'] = etag
+    return response
+
+
+def error_response(request, message, status):
+    return json_response(request, {'detail': message}, status=status)
+
+
+def api_view(view):
+    """Только чтение, с реплики; ошибки отдаются JSON, а не страницей."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        if request.method not in ('GET', 'HEAD'):
+            return error_response(request, 'Метод не поддерживается.', 405)
+        try:
+            return view(request, *args, **kwargs)
+        except ValidationError as error:
+            return error_response(request, ' '.join(error.messages), 400)
+        except Http404:
+            return error_response(request, 'Не найдено.', 404)
+    return replica_reads(wrapper)
+
+
+def get_page_size(request):
+    try:
+        size = int(request.GET.get('limit', API_PAGE_SIZE))
+    except ValueError:
+        raise ValidationError('limit должен быть числом.')
+    if not 1 <= size <= API_MAX_PAGE_SIZE:
+        raise ValidationError(
+            'limit должен быть от 1 до %(max)s.',
+            params={'max': API_MAX_PAGE_SIZE},
+        )
+    return size
+
+
+def page_link(request, query):
+    return request.build_absolute_uri(f'{request.path}?{query}')
+
+
+def listing(request, serializer_class, queryset):
+    """Страница по курсору: results и ссылки next/previous."""
+    serializer = serializer_class(request.GET.get('fields'))
+    query = {
+        key: value for key, value in request.GET.items() if key != 'cursor'
+    }
+    paginator = CursorPaginator(
+        serializer.values(queryset),
+        get_page_size(request),
+        ordering=serializer.ordering,
+        query=query,
+        transform=serializer.to_dict,
+    )
+    paginator.get_cursor_page(request.GET.get('cursor'))
+    return json_response(request, {
+        'results': paginator.items,
+        'next': paginator.next_cursor and page_link(
+            request, paginator.next_query
+        ),
+        'previous': paginator.previous_cursor and page_link(
+            request, paginator.previous_query
+        ),
+    })
+
+
+def detail(request, serializer_class, queryset):
+    serializer = serializer_class(request.GET.get('fields'))
+    row = serializer.values(queryset).first()
+    if row is None:
+        raise Http404
+    return json_response(request, serializer.to_dict(row))
+
+
+@api_view
+def post_list(request):
+    posts = Post.objects.all()
+    if 'group' in request.GET:
+        posts = posts.filter(group__slug=request.GET['group'])
+    if 'author' in request.GET:
+        posts = posts.filter(author__username=request.GET['author'])
+    return listing(request, PostSerializer, posts)
+
+
+@api_view
+def post_detail(request, post_id):
+    return detail(request, PostSerializer, Post.objects.filter(pk=post_id))
+
+
+@api_view
+def comment_list(request, post_id):
+    if not Post.objects.filter(pk=post_id).exists():
+        raise Http404
+    comments = Comment.objects.filter(post_id=post_id)
+    return listing(request, CommentSerializer, comments)
+
+
+@api_view
+def group_list(request):
+    return listing(request, GroupSerializer, Group.objects.all())
+
+
+@api_view
+def group_detail(request, slug):
+    return detail(request, GroupSerializer, Group.objects.filter(slug=slug))
+
+
+@api_view
+def follow_list(request):
+    """Подписки текущего пользователя."""
+    if not request.user.is_authenticated:
+        return error_response(request, 'Нужна авторизация.', 401)
+    follows = Follow.objects.filter(user=request.user)
+    return listing(request, FollowSerializer, follows)
@@ -1,5 +1,13 @@
 from django.apps import AppConfig
+from django.core.signals import request_started
+from django.db.backends.signals import connection_created
 
 
 class CoreConfig(AppConfig):
     name = 'core'
+
+    def ready(self):
+        from . import checks  # noqa: F401 (регистрирует проверки)
+        from . import db
+        connection_created.connect(db.configure_connection)
+        request_started.connect(db.check_connections)
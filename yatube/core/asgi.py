@@ -0,0 +1,178 @@
+"""ASGI-режим для Django 2.2, у которого нет своего ASGI-обработчика.
+
+ASGIHandler принимает соединения в цикле событий, а сам Django
+выполняет в ограниченном пуле из ASGI_THREADS потоков. Каждый запрос
+целиком, вместе с потоковым телом ответа, обрабатывается одним потоком
+пула: соединения с базой и состояние маршрутизатора привязаны к потоку.
+Куски тела ответа передаются в цикл событий по одному, и поток ждёт,
+пока кусок уйдёт клиенту, поэтому медленный клиент не копит ответ в
+памяти. Долгие потоки (живая лента) обслуживают асинхронные варианты
+представлений (asgi_variant) прямо в цикле событий.
+
+Приложение запускает ASGI-сервер (uvicorn yatube.asgi:application).
+Обычные страницы под ASGI не быстрее, чем под WSGI: оба упираются в
+один и тот же GIL. Режим нужен ради потоков живой ленты, которые не
+держат поток сервера.
+"""
+import asyncio
+import sys
+import tempfile
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+from django.conf import settings
+from django.core.wsgi import get_wsgi_application
+from django.urls import Resolver404, resolve
+
+
+def asgi_variant(async_view):
+    """Отдать маршрут под ASGI асинхронной функции, минуя пул потоков.
+
+    async_view(scope, receive, send, **kwargs) получает аргументы из
+    URL. Под WSGI работает обычное представление. Middleware Django к
+    асинхронному варианту не применяются.
+    """
+    def decorator(view):
+        view.asgi_view = async_view
+        return view
+    return decorator
+
+
+def build_environ(scope, body):
+    """WSGI environ для HTTP-запроса ASGI; body — файл с телом."""
+    server = scope.get('server') or ('localhost', 80)
+    client = scope.get('client') or ('', 0)
+    environ = {
+        'REQUEST_METHOD': scope['method'],
+        'SCRIPT_NAME': scope.get('root_path', ''),
+        # PEP 3333: путь — байты UTF-8, прочитанные как latin-1.
+        'PATH_INFO': scope['path'].encode().decode('latin-1'),
+        'QUERY_STRING': scope.get('query_string', b'').decode('latin-1'),
+        'SERVER_NAME': server[0],
+        'SERVER_PORT': str(server[1]),
+        'SERVER_PROTOCOL': f'HTTP/{scope.get("http_version", "1.1")}',
+        'REMOTE_ADDR': client[0],
+        'REMOTE_PORT': str(client[1]),
+        'wsgi.version': (1, 0),
+        'wsgi.url_scheme': scope.get('scheme', 'http'),
+        'wsgi.input': body,
+        'wsgi.errors': sys.stderr,
+        'wsgi.multithread': True,
+        'wsgi.multiprocess': False,
+        'wsgi.run_once': False,
+    }
+    for raw_name, raw_value in scope.get('headers', []):
+        name = raw_name.decode('latin-1').upper().replace('-', '_')
+        value = raw_value.decode('latin-1')
+        if name not in ('CONTENT_TYPE', 'CONTENT_LENGTH'):
+            name = f'HTTP_{name}'
+        if name in environ:
+            value = f'{environ[name]},{value}'
+        environ[name] = value
+    return environ
+
+
+class ASGIHandler:
+    """ASGI-приложение поверх WSGI-приложения Django."""
+
+    def __init__(self, wsgi_application, max_workers):
+        self.wsgi_application = wsgi_application
+        self.executor = ThreadPoolExecutor(
+            max_workers=max_workers, thread_name_prefix='asgi',
+        )
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] == 'lifespan':
+            await self.lifespan(receive, send)
+        elif scope['type'] == 'http':
+            await self.http(scope, receive, send)
+        else:
+            raise ValueError(f'Неподдерживаемый тип ASGI: {scope["type"]}')
+
+    async def lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message['type'] == 'lifespan.startup':
+                await send({'type': 'lifespan.startup.complete'})
+            elif message['type'] == 'lifespan.shutdown':
+                self.executor.shutdown(wait=False)
+                await send({'type': 'lifespan.shutdown.complete'})
+                return
+
+    async def read_body(self, receive):
+        """Тело запроса: в памяти до FILE_UPLOAD_MAX_MEMORY_SIZE."""
+        body = tempfile.SpooledTemporaryFile(
+            max_size=settings.FILE_UPLOAD_MAX_MEMORY_SIZE, mode='w+b'
+        )
+        while True:
+            message = await receive()
+            if message['type'] == 'http.disconnect':
+                body.close()
+                return None
+            body.write(message.get('body', b''))
+            if not message.get('more_body', False):
+                body.seek(0)
+                return body
+
+    @staticmethod
+    def async_view(scope):
+        try:
+            match = resolve(scope['path'])
+        except Resolver404:
+            return None
+        view = getattr(match.func, 'asgi_view', None)
+        if view is None:
+            return None
+        return partial(view, **match.kwargs)
+
+    async def http(self, scope, receive, send):
+        view = self.async_view(scope)
+        if view is not None:
+            await view(scope, receive, send)
+            return
+        body = await self.read_body(receive)
+        if body is None:
+            return
+        loop = asyncio.get_running_loop()
+        with body:
+            await loop.run_in_executor(
+                self.executor, self.respond,
+                loop, build_environ(scope, body), send,
+            )
+
+    def respond(self, loop, environ, send):
+        """Выполнить запрос в потоке пула и отправить ответ по кускам."""
+        def emit(message):
+            asyncio.run_coroutine_threadsafe(send(message), loop).result()
+
+        def start_response(status, headers, exc_info=None):
+            code, _, _ = status.partition(' ')
+            emit({
+                'type': 'http.response.start',
+                'status': int(code),
+                'headers': [
+                    (name.lower().encode('latin-1'), value.encode('latin-1'))
+                    for name, value in headers
+                ],
+            })
+
+        chunks = self.wsgi_application(environ, start_response)
+        try:
+            for chunk in chunks:
+                if chunk:
+                    emit({
+                        'type': 'http.response.body',
+                        'body': chunk,
+                        'more_body': True,
+                    })
+            emit({'type': 'http.response.body', 'body': b''})
+        finally:
+            # close() отправляет request_finished: соединения с базой
+            # закрываются в том же потоке, где были открыты.
+            close = getattr(chunks, 'close', None)
+            if close is not None:
+                close()
+
+
+def get_asgi_application():
+    return ASGIHandler(get_wsgi_application(), settings.ASGI_THREADS)
@@ -0,0 +1,306 @@
+"""Замеры скорости страниц проекта.
+
+Каждый маршрут из posts.urls, users.urls, about.urls и api.urls
+прогоняется через тестовый клиент (задержки и число запросов к базе)
+и, по желанию, через локальный HTTP-сервер несколькими потоками
+(задержки под конкурентной нагрузкой и пропускная способность). Итоги можно
+сохранить как эталон и сравнивать с ним следующие прогоны.
+"""
+import json
+import math
+import threading
+import time
+from collections import defaultdict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from itertools import cycle, islice
+from urllib.error import HTTPError
+from urllib.parse import unquote, urlencode
+from urllib.request import HTTPRedirectHandler, Request, build_opener
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.servers.basehttp import (
+    ThreadedWSGIServer, WSGIRequestHandler, get_internal_wsgi_application,
+)
+from django.db import connection
+from django.test import Client
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+
+from about import urls as about_urls
+from api import urls as api_urls
+from posts import urls as posts_urls
+from posts.models import Group, Post, User
+from users import urls as users_urls
+
+BENCHMARKED_URLCONFS = (posts_urls, users_urls, about_urls, api_urls)
+
+PERCENTILES = (50, 95, 99)
+STREAMING_ROUTES = {
+    'posts:live_index', 'posts:live_group', 'posts:live_follow',
+}
+# Статус запроса, на который сервер не ответил.
+CONNECTION_FAILED = 599
+# Сколько секунд клиент нагрузки ждёт ответа.
+LOAD_TIMEOUT = 30
+# Очередь соединений локального сервера, как у боевых серверов: при
+# очереди в 10 соединений нагрузка упиралась бы в повторы SYN клиента.
+LISTEN_BACKLOG = 1024
+
+Target = namedtuple('Target', ['name', 'path', 'method', 'data', 'user'])
+
+
+def route_names():
+    """Имена всех маршрутов, которые должен покрыть замер.
+
+    Потоки живой ленты без LIVE_ENABLED отвечают 404 и не замеряются.
+    """
+    return {
+        f'{urlconf.app_name}:{pattern.name}'
+        for urlconf in BENCHMARKED_URLCONFS
+        for pattern in urlconf.urlpatterns
+    } - (set() if settings.LIVE_ENABLED else STREAMING_ROUTES)
+
+
+def build_targets(data):
+    """Запросы ко всем маршрутам на данных, созданных posts.seed.seed()."""
+    reader_id, followed_id = data['follows'][0]
+    reader = User.objects.get(pk=reader_id)
+    followed = User.objects.get(pk=followed_id)
+    stranger = User.objects.exclude(
+        pk=reader_id
+    ).exclude(following__user=reader).first()
+    group = Group.objects.get(pk=data['groups'][0])
+    post = Post.objects.filter(author=reader).first() or Post.objects.create(
+        text='Пост для замеров', author=reader, group=group
+    )
+    word = post.text.split()[0]
+
+    def target(name, args=(), method='GET', data=None, user=None, query=''):
+        return Target(name, reverse(name, args=args) + query, method,
+                      data, user)
+
+    targets = [
+        target('posts:index'),
+        target('posts:index', query='?page=5'),
+        target('posts:group_list', [group.slug]),
+        target('posts:profile', [followed.username]),
+        target('posts:post_search', query='?' + urlencode({'q': word})),
+        target('posts:post_detail', [post.pk]),
+        target('posts:post_detail', [post.pk], query='?order=new'),
+        target('posts:comment_list', [post.pk]),
+        target('posts:post_create', user=reader),
+        target('posts:post_edit', [post.pk], user=reader),
+        target('posts:add_comment', [post.pk], 'POST',
+               {'text': 'Комментарий для замеров'}, reader),
+        target('posts:follow_index', user=reader),
+        target('posts:live_index'),
+        target('posts:live_group', [group.slug]),
+        target('posts:live_follow', user=reader),
+        target('posts:profile_follow', [stranger.username], user=reader),
+        target('posts:profile_unfollow', [stranger.username], user=reader),
+        target('users:signup'),
+        target('users:login'),
+        target('users:logout'),
+        target('users:password_reset_form'),
+        target('about:author'),
+        target('about:tech'),
+        target('api:post_list'),
+        target('api:post_list', query=f'?group={group.slug}&fields=id,text'),
+        target('api:post_detail', [post.pk]),
+        target('api:comment_list', [post.pk]),
+        target('api:group_list'),
+        target('api:group_detail', [group.slug]),
+        target('api:follow_list', user=reader),
+    ]
+    names = route_names()
+    return [target for target in targets if target.name in names]
+
+
+def label(target):
+    query = target.path.partition('?')[2]
+    return f'{target.name}?{unquote(query)}' if query else target.name
+
+
+def percentile(values, percent):
+    """Перцентиль методом ближайшего ранга."""
+    ordered = sorted(values)
+    rank = max(math.ceil(percent / 100 * len(ordered)), 1)
+    return ordered[rank - 1]
+
+
+def summarize(timings, elapsed):
+    """Перцентили задержки в миллисекундах и число запросов в секунду."""
+    summary = {
+        f'p{percent}': round(percentile(timings, percent) * 1000, 2)
+        for percent in PERCENTILES
+    }
+    summary['rps'] = round(len(timings) / elapsed, 1) if elapsed else 0
+    return summary
+
+
+def _login(user, clients):
+    if user is None:
+        return Client()
+    if user.pk not in clients:
+        clients[user.pk] = Client()
+        clients[user.pk].force_login(user)
+    return clients[user.pk]
+
+
+def measure(targets, iterations):
+    """Прогнать каждый запрос через тестовый клиент iterations раз.
+
+    Первый проход идёт с пустым кэшем, поэтому число запросов к базе
+    берётся наибольшее: это стоимость страницы в худшем случае.
+    """
+    cache.clear()
+    clients = {}
+    results = {}
+    for target in targets:
+        client = _login(target.user, clients)
+        send = getattr(client, target.method.lower())
+        timings, queries, errors = [], [], 0
+        started = time.perf_counter()
+        for _ in range(iterations):
+            with CaptureQueriesContext(connection) as context:
+                start = time.perf_counter()
+                response = send(target.path, target.data or {})
+                timings.append(time.perf_counter() - start)
+            queries.append(len(context))
+            errors += response.status_code >= 400
+        summary = summarize(timings, time.perf_counter() - started)
+        summary['queries'] = max(queries)
+        summary['errors'] = errors
+        results[label(target)] = summary
+    return results
+
+
+class LoadWSGIServer(ThreadedWSGIServer):
+    request_queue_size = LISTEN_BACKLOG
+
+
+class QuietRequestHandler(WSGIRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+
+@contextmanager
+def serve(host='127.0.0.1', port=0):
+    """Поднять проект на локальном многопоточном сервере."""
+    server = LoadWSGIServer((host, port), QuietRequestHandler)
+    server.set_app(get_internal_wsgi_application())
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        yield f'http://{host}:{server.server_port}'
+    finally:
+        server.shutdown()
+        server.server_close()
+        thread.join()
+
+
+class NoRedirectHandler(HTTPRedirectHandler):
+    """Редирект — это ответ страницы, а не повод для второго запроса."""
+    def redirect_request(self, *args, **kwargs):
+        return None
+
+
+def _session_cookie(user, clients):
+    client = _login(user, clients)
+    session = client.cookies[settings.SESSION_COOKIE_NAME].value
+    return f'{settings.SESSION_COOKIE_NAME}={session}'
+
+
+def load_test(base_url, targets, total, concurrency):
+    """Отправить total GET-запросов в concurrency потоков.
+
+    Запросы идут по кругу по всем GET-маршрутам; POST-маршруты
+    пропускаются, потому что требуют CSRF-токена, а бесконечные потоки
+    живой ленты — потому что их нельзя дочитать.
+    """
+    cache.clear()
+    clients = {}
+    requests = []
+    for target in targets:
+        if target.method != 'GET' or target.name in STREAMING_ROUTES:
+            continue
+        request = Request(base_url + target.path)
+        if target.user is not None:
+            request.add_header('Cookie',
+                               _session_cookie(target.user, clients))
+        requests.append((label(target), request))
+    opener = build_opener(NoRedirectHandler)
+
+    def send(item):
+        name, request = item
+        start = time.perf_counter()
+        try:
+            with opener.open(request, timeout=LOAD_TIMEOUT) as response:
+                response.read()
+                status = response.status
+        except HTTPError as error:
+            status = error.code
+        except OSError:
+            # Сервер не принял соединение: очередь переполнена.
+            status = CONNECTION_FAILED
+        return name, time.perf_counter() - start, status
+
+    timings = defaultdict(list)
+    errors = defaultdict(int)
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        for name, elapsed, status in executor.map(
+            send, islice(cycle(requests), total)
+        ):
+            timings[name].append(elapsed)
+            errors[name] += status >= 400
+    elapsed = time.perf_counter() - started
+    results = {}
+    for name, values in timings.items():
+        # Маршруты делят одно время прогона: их rps — доля общего.
+        results[name] = summarize(values, elapsed)
+        results[name]['errors'] = errors[name]
+    results['total'] = summarize(
+        [value for values in timings.values() for value in values], elapsed
+    )
+    results['total']['errors'] = sum(errors.values())
+    return results
+
+
+def load_baseline(path):
+    with open(path, encoding='utf-8') as file:
+        return json.load(file)
+
+
+def save_baseline(path, report):
+    with open(path, 'w', encoding='utf-8') as file:
+        json.dump(report, file, ensure_ascii=False, indent=2, sort_keys=True)
+
+
+def compare(baseline, report, tolerance):
+    """Регрессии относительно эталона.
+
+    Число запросов к базе не зависит от машины и сравнивается точно,
+    задержка p95 — с допуском tolerance (во сколько раз можно медленнее).
+    """
+    regressions = []
+    for phase, results in report.items():
+        if phase == 'volumes':
+            continue
+        for name, summary in results.items():
+            before = baseline.get(phase, {}).get(name)
+            if before is None:
+                continue
+            if summary.get('queries', 0) > before.get('queries', math.inf):
+                regressions.append(
+                    f'{phase} {name}: запросов {before["queries"]} '
+                    f'→ {summary["queries"]}'
+                )
+            if summary['p95'] > before['p95'] * tolerance:
+                regressions.append(
+                    f'{phase} {name}: p95 {before["p95"]} '
+                    f'→ {summary["p95"]} мс'
+                )
+    return regressions
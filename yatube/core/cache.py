@@ -0,0 +1,482 @@
+"""Кэш, общий для всех процессов сервера.
+
+SQLiteCache хранит записи в файле SQLite, который видят все воркеры
+на машине, и ведёт журнал изменённых ключей. TieredCache ставит перед
+любым общим кэшем ограниченный LRU-кэш в памяти процесса: повторные
+чтения не ходят в общий кэш, а журнал раз в POLL_INTERVAL секунд
+подсказывает, какие локальные копии устарели после записи в другом
+процессе.
+"""
+import os
+import pickle
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+from django.core.cache import caches
+from django.core.cache.backends.base import DEFAULT_TIMEOUT, BaseCache
+from django.db import connections
+
+# Журнал изменений хранится столько секунд; процесс, который не
+# заглядывал в него дольше, сбрасывает свою память целиком.
+LOG_RETENTION = 300
+# Метка в журнале: общий кэш очищен целиком.
+CLEAR_MARKER = '*'
+# Через сколько записей процесса проверять размер кэша.
+CULL_EVERY = 100
+
+_memory_connections = {}
+_memory_lock = threading.Lock()
+
+SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS cache_entries ('
+    ' key TEXT PRIMARY KEY, value BLOB NOT NULL, expires REAL)',
+    'CREATE TABLE IF NOT EXISTS cache_log ('
+    ' id INTEGER PRIMARY KEY AUTOINCREMENT,'
+    ' key TEXT NOT NULL, created REAL NOT NULL)',
+)
+
+
+def database_location(suffix='cache'):
+    """Путь рядом с базой default, в тестах — общая база в памяти."""
+    name = str(connections['default'].settings_dict['NAME'])
+    if name.startswith('file:') and '?' in name:
+        path, query = name.split('?', 1)
+        return f'{path}_{suffix}?{query}'
+    if name == ':memory:':
+        return f'file:memory_{suffix}?mode=memory&cache=shared'
+    root, _ = os.path.splitext(name)
+    return f'{root}-{suffix}.sqlite3'
+
+
+class SQLiteCache(BaseCache):
+    """Кэш в файле SQLite с журналом изменённых ключей.
+
+    LOCATION — путь к файлу; пустой LOCATION означает файл рядом с
+    базой default (см. database_location()).
+    """
+    def __init__(self, location, params):
+        super().__init__(params)
+        self._location = location
+        self._connection = None
+        self._lock = None
+        self._writes = 0
+
+    @property
+    def location(self):
+        return self._location or database_location()
+
+    @staticmethod
+    def _open(location):
+        connection = sqlite3.connect(
+            location, timeout=5, isolation_level=None,
+            check_same_thread=False, uri=location.startswith('file:'),
+        )
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        for statement in SCHEMA:
+            connection.execute(statement)
+        return connection
+
+    def _connect(self):
+        if self._connection is None:
+            location = self.location
+            if 'mode=memory' in location:
+                # База в памяти с общим кэшем не ждёт блокировок, а сразу
+                # отвечает «table is locked»: потоки процесса делят одно
+                # соединение по очереди.
+                with _memory_lock:
+                    if location not in _memory_connections:
+                        _memory_connections[location] = (
+                            self._open(location), threading.RLock()
+                        )
+                    self._connection, self._lock = (
+                        _memory_connections[location]
+                    )
+            else:
+                self._connection = self._open(location)
+                self._lock = threading.RLock()
+        return self._connection
+
+    def _read(self, callback):
+        connection = self._connect()
+        with self._lock:
+            return callback(connection)
+
+    def _write(self, callback):
+        """Выполнить callback(connection) в одной пишущей транзакции."""
+        connection = self._connect()
+        with self._lock:
+            connection.execute('BEGIN IMMEDIATE')
+            try:
+                result = callback(connection)
+            except BaseException:
+                connection.execute('ROLLBACK')
+                raise
+            connection.execute('COMMIT')
+        self._writes += 1
+        if self._writes % CULL_EVERY == 0:
+            self._write(self._cull)
+        return result
+
+    @staticmethod
+    def _log(connection, *keys):
+        now = time.time()
+        connection.executemany(
+            'INSERT INTO cache_log (key, created) VALUES (?, ?)',
+            [(key, now) for key in keys],
+        )
+
+    def _store(self, connection, key, value, timeout):
+        connection.execute(
+            'REPLACE INTO cache_entries (key, value, expires) '
+            'VALUES (?, ?, ?)',
+            (key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+             self.get_backend_timeout(timeout)),
+        )
+        self._log(connection, key)
+
+    def _select(self, connection, keys):
+        placeholders = ', '.join('?' * len(keys))
+        rows = connection.execute(
+            f'SELECT key, value FROM cache_entries '
+            f'WHERE key IN ({placeholders}) '
+            f'AND (expires IS NULL OR expires > ?)',
+            [*keys, time.time()],
+        )
+        return {key: pickle.loads(value) for key, value in rows}
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+
+        def add(connection):
+            if self._select(connection, [key]):
+                return False
+            self._store(connection, key, value, timeout)
+            return True
+        return self._write(add)
+
+    def get(self, key, default=None, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        found = self._read(lambda connection: self._select(connection, [key]))
+        return found.get(key, default)
+
+    def get_many(self, keys, version=None):
+        made = {self.make_key(key, version=version): key for key in keys}
+        for key in made:
+            self.validate_key(key)
+        if not made:
+            return {}
+        found = self._read(
+            lambda connection: self._select(connection, list(made))
+        )
+        return {made[key]: value for key, value in found.items()}
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        self._write(
+            lambda connection: self._store(connection, key, value, timeout)
+        )
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        def set_many(connection):
+            for key, value in data.items():
+                key = self.make_key(key, version=version)
+                self.validate_key(key)
+                self._store(connection, key, value, timeout)
+        self._write(set_many)
+        return []
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return self._write(lambda connection: connection.execute(
+            'UPDATE cache_entries SET expires = ? '
+            'WHERE key = ? AND (expires IS NULL OR expires > ?)',
+            (self.get_backend_timeout(timeout), key, time.time()),
+        ).rowcount > 0)
+
+    def incr(self, key, delta=1, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+
+        def incr(connection):
+            # BEGIN IMMEDIATE уже держит запись: другой процесс не
+            # прочитает старое значение между чтением и записью.
+            found = self._select(connection, [key])
+            if key not in found:
+                raise ValueError(f"Key '{key}' not found")
+            value = found[key] + delta
+            connection.execute(
+                'UPDATE cache_entries SET value = ? WHERE key = ?',
+                (pickle.dumps(value, pickle.HIGHEST_PROTOCOL), key),
+            )
+            self._log(connection, key)
+            return value
+        return self._write(incr)
+
+    def has_key(self, key, version=None):
+        key = self.make_key(key, version=version)
+        self.validate_key(key)
+        return bool(
+            self._read(lambda connection: self._select(connection, [key]))
+        )
+
+    def delete(self, key, version=None):
+        self.delete_many([key], version=version)
+
+    def delete_many(self, keys, version=None):
+        keys = [self.make_key(key, version=version) for key in keys]
+        for key in keys:
+            self.validate_key(key)
+
+        def delete_many(connection):
+            connection.executemany(
+                'DELETE FROM cache_entries WHERE key = ?',
+                [(key,) for key in keys],
+            )
+            self._log(connection, *keys)
+        if keys:
+            self._write(delete_many)
+
+    def clear(self):
+        def clear(connection):
+            connection.execute('DELETE FROM cache_entries')
+            self._log(connection, CLEAR_MARKER)
+        self._write(clear)
+
+    def _cull(self, connection):
+        now = time.time()
+        connection.execute(
+            'DELETE FROM cache_entries WHERE expires <= ?', (now,)
+        )
+        connection.execute(
+            'DELETE FROM cache_log WHERE created < ?', (now - LOG_RETENTION,)
+        )
+        count, = connection.execute(
+            'SELECT COUNT(*) FROM cache_entries'
+        ).fetchone()
+        if count > self._max_entries:
+            # Вытесняются самые давно записанные, как в LocMemCache
+            # доля 1 / CULL_FREQUENCY.
+            connection.execute(
+                'DELETE FROM cache_entries WHERE rowid IN ('
+                ' SELECT rowid FROM cache_entries ORDER BY rowid LIMIT ?)',
+                (count // max(self._cull_frequency, 1),),
+            )
+
+    def changes_since(self, last_id):
+        """Ключи, изменённые после записи журнала last_id.
+
+        Возвращает (новый last_id, ключи). Вместо ключей приходит None,
+        если журнал уже обрезан за last_id или кэш очищали целиком.
+        """
+        rows = self._read(lambda connection: connection.execute(
+            'SELECT id, key FROM cache_log WHERE id > ? ORDER BY id',
+            (last_id,),
+        ).fetchall())
+        if not rows:
+            return last_id, []
+        first_id = rows[0][0]
+        keys = [key for _, key in rows]
+        if first_id != last_id + 1 or CLEAR_MARKER in keys:
+            return rows[-1][0], None
+        return rows[-1][0], keys
+
+    def last_change(self):
+        row = self._read(lambda connection: connection.execute(
+            'SELECT MAX(id) FROM cache_log'
+        ).fetchone())
+        return row[0] or 0
+
+    def close(self, **kwargs):
+        # Соединение живёт вместе с объектом кэша потока: база в памяти
+        # в тестах исчезает, когда закрыто последнее соединение.
+        pass
+
+
+class LocalStore:
+    """Потокобезопасный LRU-словарь с пределами по числу и объёму."""
+    def __init__(self, max_entries, max_bytes):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.size = 0
+        self.last_change = None
+        self.polled = 0.0
+        self.lock = threading.Lock()
+        self._data = OrderedDict()
+
+    def get(self, key):
+        with self.lock:
+            item = self._data.get(key)
+            if item is None:
+                return None
+            pickled, expires = item
+            if expires <= time.monotonic():
+                self._pop(key)
+                return None
+            self._data.move_to_end(key)
+            return pickled
+
+    def put(self, key, pickled, expires):
+        with self.lock:
+            self._pop(key)
+            if len(pickled) > self.max_bytes:
+                return
+            self._data[key] = (pickled, expires)
+            self.size += len(pickled)
+            while (len(self._data) > self.max_entries
+                   or self.size > self.max_bytes):
+                self._pop(next(iter(self._data)))
+
+    def discard(self, keys):
+        with self.lock:
+            for key in keys:
+                self._pop(key)
+
+    def clear(self):
+        with self.lock:
+            self._data.clear()
+            self.size = 0
+
+    def _pop(self, key):
+        item = self._data.pop(key, None)
+        if item is not None:
+            self.size -= len(item[0])
+
+    def __len__(self):
+        return len(self._data)
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+class TieredCache(BaseCache):
+    """Память процесса (L1) перед общим кэшем (L2).
+
+    OPTIONS: SHARED — псевдоним общего кэша в CACHES; MAX_ENTRIES и
+    MAX_BYTES — пределы L1; LOCAL_TIMEOUT — сколько секунд L1 держит
+    копию; POLL_INTERVAL — как часто сверяться с журналом общего кэша,
+    если тот его ведёт (changes_since). Без журнала копии в L1 живут
+    не дольше LOCAL_TIMEOUT.
+    """
+    def __init__(self, location, params):
+        super().__init__(params)
+        options = params.get('OPTIONS', {})
+        self._shared_alias = options['SHARED']
+        self._local_timeout = float(options.get('LOCAL_TIMEOUT', 60))
+        self._poll_interval = float(options.get('POLL_INTERVAL', 0.5))
+        with _stores_lock:
+            self._local = _stores.setdefault(location, LocalStore(
+                self._max_entries,
+                int(options.get('MAX_BYTES', 16 * 1024 * 1024)),
+            ))
+
+    @property
+    def shared(self):
+        return caches[self._shared_alias]
+
+    def _local_key(self, key, version):
+        return self.shared.make_key(key, version=version)
+
+    def _expires(self, timeout):
+        local = self._local_timeout
+        expires = self.get_backend_timeout(timeout)
+        if expires is not None:
+            local = min(local, expires - time.time())
+        return time.monotonic() + local
+
+    def _remember(self, key, value, timeout=DEFAULT_TIMEOUT):
+        self._local.put(
+            key, pickle.dumps(value, pickle.HIGHEST_PROTOCOL),
+            self._expires(timeout),
+        )
+
+    def sync(self, force=False):
+        """Выбросить из L1 ключи, которые поменяли другие процессы."""
+        store = self._local
+        changes_since = getattr(self.shared, 'changes_since', None)
+        now = time.monotonic()
+        if changes_since is None or (
+            not force and now - store.polled < self._poll_interval
+        ):
+            return
+        store.polled = now
+        if store.last_change is None:
+            store.clear()
+            store.last_change = self.shared.last_change()
+            return
+        store.last_change, keys = changes_since(store.last_change)
+        if keys is None:
+            store.clear()
+        elif keys:
+            store.discard(keys)
+
+    def get(self, key, default=None, version=None):
+        return self._fetch([key], version).get(key, default)
+
+    def get_many(self, keys, version=None):
+        return self._fetch(keys, version)
+
+    def _fetch(self, keys, version):
+        self.sync()
+        found, missing = {}, []
+        for key in keys:
+            pickled = self._local.get(self._local_key(key, version))
+            if pickled is None:
+                missing.append(key)
+            else:
+                found[key] = pickle.loads(pickled)
+        if missing:
+            fetched = self.shared.get_many(missing, version=version)
+            for key, value in fetched.items():
+                self._remember(self._local_key(key, version), value)
+            found.update(fetched)
+        return found
+
+    def add(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        added = self.shared.add(key, value, timeout, version=version)
+        if added:
+            self._remember(self._local_key(key, version), value, timeout)
+        return added
+
+    def set(self, key, value, timeout=DEFAULT_TIMEOUT, version=None):
+        self.shared.set(key, value, timeout, version=version)
+        self._remember(self._local_key(key, version), value, timeout)
+
+    def set_many(self, data, timeout=DEFAULT_TIMEOUT, version=None):
+        failed = self.shared.set_many(data, timeout, version=version)
+        for key, value in data.items():
+            if key not in failed:
+                self._remember(self._local_key(key, version), value, timeout)
+        return failed
+
+    def touch(self, key, timeout=DEFAULT_TIMEOUT, version=None):
+        return self.shared.touch(key, timeout, version=version)
+
+    def incr(self, key, delta=1, version=None):
+        value = self.shared.incr(key, delta, version=version)
+        self._remember(self._local_key(key, version), value)
+        return value
+
+    def has_key(self, key, version=None):
+        return key in self._fetch([key], version)
+
+    def delete(self, key, version=None):
+        self.shared.delete(key, version=version)
+        self._local.discard([self._local_key(key, version)])
+
+    def delete_many(self, keys, version=None):
+        self.shared.delete_many(keys, version=version)
+        self._local.discard(
+            [self._local_key(key, version) for key in keys]
+        )
+
+    def clear(self):
+        self.shared.clear()
+        self._local.clear()
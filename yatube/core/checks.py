@@ -0,0 +1,33 @@
+from django.conf import settings
+from django.core.checks import Error, Tags, Warning, register
+from django.template import TemplateSyntaxError
+
+from . import templating
+
+
+@register(Tags.templates, deploy=True)
+def check_template_parse_times(app_configs, **kwargs):
+    """check --deploy: шаблоны, которые не разбираются или тормозят."""
+    messages = []
+    times = {}
+    for name in templating.project_template_names():
+        try:
+            times[name] = templating.parse_time(name)
+        except TemplateSyntaxError as error:
+            messages.append(Error(
+                f'Шаблон {name} не разбирается: {error}',
+                id='core.E001',
+            ))
+    total = sum(times.values())
+    for name in templating.dominant_templates(times):
+        messages.append(Warning(
+            f'На шаблон {name} приходится {times[name] / total:.0%} '
+            f'времени разбора всех шаблонов проекта.',
+            hint=(
+                'Вынесите повторяющиеся части в include или теги; порог — '
+                f'TEMPLATE_PARSE_DOMINANT_SHARE = '
+                f'{settings.TEMPLATE_PARSE_DOMINANT_SHARE}.'
+            ),
+            id='core.W001',
+        ))
+    return messages
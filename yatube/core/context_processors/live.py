@@ -0,0 +1,8 @@
+from django.conf import settings
+
+
+def live(request):
+    """Включена ли живая лента (LIVE_ENABLED)."""
+    return {
+        'live_enabled': settings.LIVE_ENABLED
+    }
@@ -0,0 +1,148 @@
+"""Настройка соединений SQLite для работы под нагрузкой.
+
+При открытии соединения выставляются прагмы SQLITE_PRAGMAS (WAL,
+synchronous, mmap, размер кэша страниц), а к соединению добавляется
+повтор запросов, упавших с «database is locked». Соединение основной
+базы отмечает пишущие запросы для маршрутизатора реплик. Долгоживущие
+соединения (CONN_MAX_AGE) проверяются в начале каждого запроса и
+закрываются, если база их больше не принимает.
+"""
+import logging
+import os
+import random
+import tempfile
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS, OperationalError, connections
+
+from .routers import note_writes
+
+logger = logging.getLogger(__name__)
+
+LOCKED_MESSAGES = ('database is locked', 'database table is locked')
+
+
+def is_locked_error(error):
+    return isinstance(error, OperationalError) and any(
+        message in str(error) for message in LOCKED_MESSAGES
+    )
+
+
+def backoff_delays(attempts=None, base=None):
+    """Паузы между попытками: экспоненциальный рост со случайным сдвигом."""
+    attempts = settings.SQLITE_WRITE_RETRIES if attempts is None else attempts
+    base = settings.SQLITE_RETRY_DELAY if base is None else base
+    for attempt in range(attempts):
+        yield base * 2 ** attempt * random.uniform(0.5, 1.5)
+
+
+def apply_pragmas(cursor, pragmas=None):
+    pragmas = settings.SQLITE_PRAGMAS if pragmas is None else pragmas
+    for name, value in pragmas.items():
+        cursor.execute(f'PRAGMA {name} = {value}')
+
+
+def retry_locked_statement(execute, sql, params, many, context):
+    """Обёртка execute: повторить запрос вне транзакции, если база занята.
+
+    Внутри atomic() повторять отдельный запрос нельзя: снимок чтения
+    транзакции уже мог устареть. Такие ошибки повторяет retry_on_locked
+    целиком.
+    """
+    delays = backoff_delays()
+    while True:
+        try:
+            return execute(sql, params, many, context)
+        except OperationalError as error:
+            connection = context['connection']
+            delay = next(delays, None)
+            if (delay is None or connection.in_atomic_block
+                    or not is_locked_error(error)):
+                raise
+            logger.info('База занята, повтор через %.3f с', delay)
+            time.sleep(delay)
+
+
+def retry_on_locked(func):
+    """Повторить функцию с транзакцией целиком, если база была занята."""
+    @wraps(func)
+    def wrapper(*args, **kwargs):
+        delays = backoff_delays()
+        while True:
+            try:
+                return func(*args, **kwargs)
+            except OperationalError as error:
+                delay = next(delays, None)
+                in_transaction = any(
+                    connection.in_atomic_block
+                    for connection in connections.all()
+                )
+                if delay is None or in_transaction or not is_locked_error(
+                    error
+                ):
+                    raise
+                logger.info('Транзакция упёрлась в блокировку, повтор '
+                            'через %.3f с', delay)
+                time.sleep(delay)
+    return wrapper
+
+
+def configure_connection(sender, connection, **kwargs):
+    """Обработчик connection_created: прагмы SQLite и обёртки запросов."""
+    wrappers = []
+    if connection.vendor == 'sqlite':
+        # Курсор DB-API, а не Django: прагмы не считаются запросами
+        # страницы.
+        apply_pragmas(connection.connection.cursor())
+        wrappers.append(retry_locked_statement)
+    if connection.alias == DEFAULT_DB_ALIAS:
+        wrappers.append(note_writes)
+    # В начало списка, то есть снаружи всех обёрток: execute_wrapper()
+    # снимает с конца свою, и обёртку в конце списка сняла бы чужая.
+    # Повторы одного запроса Recorder (core.instrumentation) считает
+    # одним запросом.
+    connection.execute_wrappers[:0] = [
+        wrapper for wrapper in wrappers
+        if wrapper not in connection.execute_wrappers
+    ]
+
+
+def check_connections(**kwargs):
+    """Закрыть долгоживущие соединения, которые перестали отвечать.
+
+    Запрос к базе идёт мимо курсора Django, поэтому не попадает в
+    счётчики запросов страницы.
+    """
+    for connection in connections.all():
+        if connection.connection is None or connection.in_atomic_block:
+            continue
+        try:
+            connection.connection.cursor().execute('SELECT 1')
+        except connection.Database.Error:
+            connection.close()
+
+
+@contextmanager
+def scratch_database():
+    """Отдельная база на время замеров, как у тестов.
+
+    Для SQLite это файл во временном каталоге, а не база в памяти:
+    потоки HTTP-сервера должны видеть данные, записанные командой.
+    """
+    connection = connections[DEFAULT_DB_ALIAS]
+    test_settings = connection.settings_dict.setdefault('TEST', {})
+    test_name = test_settings.get('NAME')
+    with tempfile.TemporaryDirectory() as directory:
+        if connection.vendor == 'sqlite' and not test_name:
+            test_settings['NAME'] = os.path.join(directory, 'scratch.sqlite3')
+        old_name = connection.creation.create_test_db(
+            verbosity=0, autoclobber=True, serialize=False
+        )
+        try:
+            yield
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            test_settings['NAME'] = test_name
@@ -0,0 +1,146 @@
+"""Сбор замеров одного запроса: база, шаблоны, кэш.
+
+Запросы к базе перехватываются штатным connection.execute_wrapper.
+Для шаблонов и кэша у Django нет таких точек, поэтому install()
+один раз оборачивает Template.render бэкенда шаблонов и get/get_many
+класса кэша default. Обёртки пишут в Recorder текущего потока,
+а без него только передают вызов дальше.
+"""
+import threading
+import time
+from collections import Counter
+from contextlib import ExitStack, contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import DEFAULT_CACHE_ALIAS
+from django.db import connections
+from django.template.backends.django import Template
+from django.utils.module_loading import import_string
+
+_local = threading.local()
+_installed = False
+_MISSING = object()
+
+
+class Recorder:
+    """Замеры одного запроса."""
+    def __init__(self):
+        self.queries = Counter()
+        self.db_time = 0.0
+        self.template_time = 0.0
+        self.cache_hits = 0
+        self.cache_misses = 0
+        self._template_depth = 0
+
+    @property
+    def query_count(self):
+        return sum(self.queries.values())
+
+    @property
+    def duplicate_count(self):
+        """Сколько запросов повторили уже выполненный с теми же данными."""
+        return sum(count - 1 for count in self.queries.values())
+
+    def execute(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - start
+            # Повтор после «database is locked» (core.db) приходит с тем
+            # же context: это всё ещё один запрос страницы.
+            repeated = context.get('recorded', False)
+            context['recorded'] = True
+            self.db_time += elapsed
+            if not repeated:
+                self.queries[(sql, repr(params))] += 1
+
+    def count_cache(self, hits, misses):
+        self.cache_hits += hits
+        self.cache_misses += misses
+
+
+def current():
+    return getattr(_local, 'recorder', None)
+
+
+@contextmanager
+def recording_to(recorder):
+    """Записывать замеры текущего потока в recorder; None — не писать."""
+    previous = current()
+    _local.recorder = recorder
+    try:
+        with ExitStack() as stack:
+            if recorder is not None:
+                for connection in connections.all():
+                    stack.enter_context(
+                        connection.execute_wrapper(recorder.execute)
+                    )
+            yield recorder
+    finally:
+        _local.recorder = previous
+
+
+def recording():
+    """Записывать замеры текущего потока в новый Recorder."""
+    return recording_to(Recorder())
+
+
+def _timed_render(render):
+    @wraps(render)
+    def wrapper(self, *args, **kwargs):
+        recorder = current()
+        if recorder is None:
+            return render(self, *args, **kwargs)
+        # render_to_string внутри тегов не должен считаться дважды.
+        recorder._template_depth += 1
+        start = time.perf_counter()
+        try:
+            return render(self, *args, **kwargs)
+        finally:
+            recorder._template_depth -= 1
+            if not recorder._template_depth:
+                recorder.template_time += time.perf_counter() - start
+    return wrapper
+
+
+def _counted_get(get):
+    @wraps(get)
+    def wrapper(self, key, default=None, version=None):
+        value = get(self, key, _MISSING, version)
+        recorder = current()
+        if recorder is not None:
+            missed = value is _MISSING
+            recorder.count_cache(int(not missed), int(missed))
+        return default if value is _MISSING else value
+    return wrapper
+
+
+def _counted_get_many(get_many):
+    @wraps(get_many)
+    def wrapper(self, keys, version=None):
+        keys = list(keys)
+        found = get_many(self, keys, version=version)
+        recorder = current()
+        if recorder is not None:
+            recorder.count_cache(len(found), len(keys) - len(found))
+        return found
+    return wrapper
+
+
+def install():
+    """Обернуть рендер шаблонов и чтение кэшей; повторно не действует."""
+    global _installed
+    if _installed:
+        return
+    _installed = True
+    Template.render = _timed_render(Template.render)
+    # Считается только кэш, к которому обращается код; ярусы за ним
+    # (например, общий кэш TieredCache) учли бы те же ключи повторно.
+    backend = import_string(settings.CACHES[DEFAULT_CACHE_ALIAS]['BACKEND'])
+    # get_many базового класса сам вызывает get: оборачиваем его,
+    # только если бэкенд определяет свой, иначе ключи учтутся дважды.
+    backend.get = _counted_get(backend.get)
+    if 'get_many' in vars(backend):
+        backend.get_many = _counted_get_many(backend.get_many)
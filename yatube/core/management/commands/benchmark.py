@@ -0,0 +1,106 @@
+import os
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core import benchmark
+from core.db import scratch_database
+from posts.seed import seed
+
+DEFAULT_BASELINE = os.path.join(settings.BASE_DIR, 'benchmark_baseline.json')
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет отдельную базу данными и замеряет задержки, число '
+        'запросов к базе и пропускную способность всех страниц.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=100)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=2000)
+        parser.add_argument('--comments', type=int, default=2000)
+        parser.add_argument('--follows', type=int, default=1000)
+        parser.add_argument(
+            '--iterations', type=int, default=20,
+            help='Повторов каждого запроса через тестовый клиент.',
+        )
+        parser.add_argument(
+            '--http', action='store_true',
+            help='Дополнительно нагрузить локальный HTTP-сервер.',
+        )
+        parser.add_argument(
+            '--requests', type=int, default=1000,
+            help='Всего HTTP-запросов при нагрузке.',
+        )
+        parser.add_argument(
+            '--concurrency', type=int, default=8,
+            help='Число одновременных HTTP-клиентов.',
+        )
+        parser.add_argument('--baseline', default=DEFAULT_BASELINE)
+        parser.add_argument(
+            '--save-baseline', action='store_true',
+            help='Записать результаты как новый эталон.',
+        )
+        parser.add_argument(
+            '--tolerance', type=float, default=1.5,
+            help='Во сколько раз p95 может превысить эталон.',
+        )
+
+    def handle(self, *args, **options):
+        volumes = {
+            name: options[name]
+            for name in ('users', 'groups', 'posts', 'comments', 'follows')
+        }
+        if volumes['users'] < 3 or volumes['follows'] < 1:
+            raise CommandError('Нужно хотя бы 3 пользователя и 1 подписка.')
+        with scratch_database():
+            targets = benchmark.build_targets(seed(**volumes))
+            report = {
+                'volumes': volumes,
+                'client': benchmark.measure(targets, options['iterations']),
+            }
+            if options['http']:
+                with benchmark.serve() as base_url:
+                    report['http'] = benchmark.load_test(
+                        base_url, targets,
+                        options['requests'], options['concurrency'],
+                    )
+        for phase in ('client', 'http'):
+            if phase in report:
+                self.write_table(phase, report[phase])
+
+        path = options['baseline']
+        if options['save_baseline']:
+            benchmark.save_baseline(path, report)
+            self.stdout.write(self.style.SUCCESS(f'Эталон записан: {path}'))
+            return
+        if not os.path.exists(path):
+            self.stdout.write(f'Эталона {path} нет, сравнивать не с чем.')
+            return
+        baseline = benchmark.load_baseline(path)
+        if baseline.get('volumes') != volumes:
+            self.stdout.write(self.style.WARNING(
+                'Объёмы данных отличаются от эталона.'
+            ))
+        regressions = benchmark.compare(
+            baseline, report, options['tolerance']
+        )
+        if regressions:
+            raise CommandError(
+                'Регрессии относительно эталона:\n' + '\n'.join(regressions)
+            )
+        self.stdout.write(self.style.SUCCESS('Регрессий нет.'))
+
+    def write_table(self, phase, results):
+        columns = ('p50', 'p95', 'p99', 'rps', 'queries', 'errors')
+        width = max(map(len, results)) + 2
+        self.stdout.write(self.style.MIGRATE_HEADING(phase))
+        self.stdout.write(
+            'route'.ljust(width) + ''.join(f'{c:>10}' for c in columns)
+        )
+        for name, summary in results.items():
+            self.stdout.write(name.ljust(width) + ''.join(
+                f'{summary.get(column, "-"):>10}' for column in columns
+            ))
@@ -0,0 +1,187 @@
+import os
+import random
+import sqlite3
+import tempfile
+import threading
+import time
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from core.db import apply_pragmas, backoff_delays
+
+SCHEMA = (
+    'CREATE TABLE post (id INTEGER PRIMARY KEY, author_id INTEGER, '
+    'text TEXT, pub_date REAL)',
+    'CREATE INDEX post_pub_date ON post (pub_date DESC, id DESC)',
+    'CREATE TABLE stats (author_id INTEGER PRIMARY KEY, posts INTEGER)',
+)
+
+# Профили соединения: как было (журнал отката, новое соединение на
+# каждую операцию, без повторов) и настроенный из settings.
+PROFILES = {
+    'default': {
+        'pragmas': {},
+        'persistent': False,
+        'retries': 0,
+        'timeout': 5,
+    },
+    'tuned': {
+        'pragmas': settings.SQLITE_PRAGMAS,
+        'persistent': True,
+        'retries': settings.SQLITE_WRITE_RETRIES,
+        'timeout': settings.DATABASES['default'].get(
+            'OPTIONS', {}
+        ).get('timeout', 5),
+    },
+}
+
+
+class Worker(threading.Thread):
+    """Поток, который до остановки повторяет чтение или запись."""
+    def __init__(self, path, profile, write, stop, authors):
+        super().__init__(daemon=True)
+        self.path = path
+        self.profile = profile
+        self.write = write
+        self.stop = stop
+        self.authors = authors
+        self.done = 0
+        self.errors = 0
+        self._connection = None
+
+    def connect(self):
+        if self._connection is None:
+            self._connection = sqlite3.connect(
+                self.path, timeout=self.profile['timeout'],
+                isolation_level=None,
+            )
+            apply_pragmas(self._connection, self.profile['pragmas'])
+        return self._connection
+
+    def release(self):
+        if not self.profile['persistent'] and self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    def read(self, connection):
+        connection.execute(
+            'SELECT id, author_id, text FROM post '
+            'ORDER BY pub_date DESC, id DESC LIMIT 10 OFFSET ?',
+            (random.randrange(0, 200, 10),),
+        ).fetchall()
+
+    def post(self, connection):
+        author_id = random.randrange(self.authors)
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            connection.execute(
+                'INSERT INTO post (author_id, text, pub_date) '
+                'VALUES (?, ?, ?)', (author_id, 'x' * 200, time.time()),
+            )
+            connection.execute(
+                'UPDATE stats SET posts = posts + 1 WHERE author_id = ?',
+                (author_id,),
+            )
+        except sqlite3.Error:
+            connection.execute('ROLLBACK')
+            raise
+        connection.execute('COMMIT')
+
+    def run(self):
+        operation = self.post if self.write else self.read
+        while not self.stop.is_set():
+            delays = backoff_delays(self.profile['retries'])
+            while True:
+                try:
+                    operation(self.connect())
+                    self.done += 1
+                    break
+                except sqlite3.OperationalError:
+                    delay = next(delays, None)
+                    if delay is None:
+                        self.errors += 1
+                        break
+                    time.sleep(delay)
+                finally:
+                    self.release()
+        if self._connection is not None:
+            self._connection.close()
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает пропускную способность SQLite на чтение и запись '
+        'при параллельной нагрузке с настройками по умолчанию и с '
+        'настройками проекта.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--readers', type=int, default=8)
+        parser.add_argument('--writers', type=int, default=2)
+        parser.add_argument('--duration', type=float, default=5)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--authors', type=int, default=100)
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Ошибка, если настройки проекта не быстрее.',
+        )
+
+    def handle(self, *args, **options):
+        results = {}
+        with tempfile.TemporaryDirectory() as directory:
+            for name, profile in PROFILES.items():
+                path = os.path.join(directory, f'{name}.sqlite3')
+                self.prepare(path, options['posts'], options['authors'])
+                results[name] = self.run_profile(path, profile, options)
+        self.stdout.write(
+            f'{"profile":<10}{"reads/s":>12}{"writes/s":>12}{"errors":>10}'
+        )
+        for name, (reads, writes, errors) in results.items():
+            self.stdout.write(
+                f'{name:<10}{reads:>12.1f}{writes:>12.1f}{errors:>10}'
+            )
+        before, after = results['default'], results['tuned']
+        speedup = (after[0] + after[1]) / max(before[0] + before[1], 1e-9)
+        self.stdout.write(f'Ускорение: x{speedup:.2f}')
+        if options['check'] and (speedup <= 1 or after[2] > before[2]):
+            raise CommandError('Настройки проекта не дали выигрыша.')
+
+    def prepare(self, path, posts, authors):
+        connection = sqlite3.connect(path, isolation_level=None)
+        for statement in SCHEMA:
+            connection.execute(statement)
+        now = time.time()
+        connection.execute('BEGIN')
+        connection.executemany(
+            'INSERT INTO post (author_id, text, pub_date) VALUES (?, ?, ?)',
+            (
+                (number % authors, 'x' * 200, now - number)
+                for number in range(posts)
+            ),
+        )
+        connection.executemany(
+            'INSERT INTO stats (author_id, posts) VALUES (?, 0)',
+            ((author_id,) for author_id in range(authors)),
+        )
+        connection.execute('COMMIT')
+        connection.close()
+
+    def run_profile(self, path, profile, options):
+        stop = threading.Event()
+        workers = [
+            Worker(path, profile, write, stop, options['authors'])
+            for write in (
+                [False] * options['readers'] + [True] * options['writers']
+            )
+        ]
+        for worker in workers:
+            worker.start()
+        time.sleep(options['duration'])
+        stop.set()
+        for worker in workers:
+            worker.join()
+        duration = options['duration']
+        reads = sum(w.done for w in workers if not w.write) / duration
+        writes = sum(w.done for w in workers if w.write) / duration
+        return reads, writes, sum(w.errors for w in workers)
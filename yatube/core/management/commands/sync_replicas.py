@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from core.replication import sync_replicas
+
+
+class Command(BaseCommand):
+    help = 'Копирует основную базу SQLite во все реплики.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(
+            f'Обновлено реплик: {sync_replicas()}'
+        ))
@@ -0,0 +1,40 @@
+from django.core.management.base import BaseCommand
+
+from core import templating
+
+
+class Command(BaseCommand):
+    help = (
+        'Разбирает все шаблоны из templates/ и показывает время разбора '
+        'каждого; отмечает шаблоны, на которые приходится основная доля.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--repeat', type=int, default=5,
+            help='Сколько раз разбирать шаблон; берётся лучшее время.',
+        )
+        parser.add_argument(
+            '--share', type=float, default=None,
+            help='Порог доли времени разбора (TEMPLATE_PARSE_DOMINANT_SHARE).',
+        )
+
+    def handle(self, *args, **options):
+        warmed = templating.warm_templates()
+        times = templating.parse_times(repeat=options['repeat'])
+        dominant = templating.dominant_templates(times, options['share'])
+        total = sum(times.values())
+        self.stdout.write(f'{"template":<45}{"ms":>9}{"share":>8}')
+        for name, seconds in sorted(
+            times.items(), key=lambda item: item[1], reverse=True
+        ):
+            line = (
+                f'{name:<45}{seconds * 1000:>9.3f}'
+                f'{seconds / total if total else 0:>8.0%}'
+            )
+            if name in dominant:
+                line = self.style.WARNING(line + '  <- узкое место')
+            self.stdout.write(line)
+        self.stdout.write(self.style.SUCCESS(
+            f'Разобрано шаблонов: {warmed}, всего {total * 1000:.1f} мс.'
+        ))
@@ -0,0 +1,113 @@
+"""Метрики страниц в памяти процесса в текстовом формате Prometheus.
+
+Время ответа учитывается у каждого запроса, подробности (база,
+шаблоны, кэш) — только у попавших в выборку; их число отдаётся
+отдельно, чтобы суммы можно было пересчитать на весь поток запросов.
+Каждый процесс сервера хранит свои значения, Prometheus суммирует их.
+"""
+import threading
+from bisect import bisect_left
+from collections import defaultdict
+
+DURATION_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5)
+
+COUNTERS = (
+    ('sampled_requests_total', 'Запросы, попавшие в выборку.'),
+    ('db_queries_total', 'Запросы к базе в выборке.'),
+    ('db_duplicate_queries_total', 'Повторные запросы к базе в выборке.'),
+    ('db_seconds_total', 'Время запросов к базе в выборке.'),
+    ('template_seconds_total', 'Время рендера шаблонов в выборке.'),
+    ('cache_hits_total', 'Попадания в кэш в выборке.'),
+    ('cache_misses_total', 'Промахи кэша в выборке.'),
+)
+
+PREFIX = 'yatube_'
+
+_lock = threading.Lock()
+_histograms = {}
+_counters = defaultdict(float)
+
+
+def _new_histogram():
+    return {'buckets': [0] * len(DURATION_BUCKETS), 'sum': 0.0, 'count': 0}
+
+
+def observe(view, status, duration, recorder=None):
+    """Учесть запрос к представлению view и, если есть, его замеры."""
+    with _lock:
+        histogram = _histograms.setdefault((view, status), _new_histogram())
+        index = bisect_left(DURATION_BUCKETS, duration)
+        if index < len(DURATION_BUCKETS):
+            histogram['buckets'][index] += 1
+        histogram['sum'] += duration
+        histogram['count'] += 1
+        if recorder is None:
+            return
+        values = {
+            'sampled_requests_total': 1,
+            'db_queries_total': recorder.query_count,
+            'db_duplicate_queries_total': recorder.duplicate_count,
+            'db_seconds_total': recorder.db_time,
+            'template_seconds_total': recorder.template_time,
+            'cache_hits_total': recorder.cache_hits,
+            'cache_misses_total': recorder.cache_misses,
+        }
+        for name, value in values.items():
+            _counters[(name, view)] += value
+
+
+def reset():
+    with _lock:
+        _histograms.clear()
+        _counters.clear()
+
+
+def _escape(value):
+    return (
+        str(value).replace('\\', r'\\').replace('"', r'\"')
+        .replace('\n', r'\n')
+    )
+
+
+def _format(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+def render():
+    """Все метрики процесса в текстовом формате Prometheus 0.0.4."""
+    with _lock:
+        histograms = {
+            key: {
+                'buckets': list(value['buckets']),
+                'sum': value['sum'],
+                'count': value['count'],
+            }
+            for key, value in _histograms.items()
+        }
+        counters = dict(_counters)
+    name = f'{PREFIX}request_duration_seconds'
+    lines = [
+        f'# HELP {name} Время ответа страниц.',
+        f'# TYPE {name} histogram',
+    ]
+    for (view, status), histogram in sorted(histograms.items()):
+        labels = f'view="{_escape(view)}",status="{status}"'
+        total = 0
+        for bound, count in zip(DURATION_BUCKETS, histogram['buckets']):
+            total += count
+            lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {total}')
+        lines.append(
+            f'{name}_bucket{{{labels},le="+Inf"}} {histogram["count"]}'
+        )
+        lines.append(f'{name}_sum{{{labels}}} {_format(histogram["sum"])}')
+        lines.append(f'{name}_count{{{labels}}} {histogram["count"]}')
+    for counter, help_text in COUNTERS:
+        name = f'{PREFIX}{counter}'
+        lines.append(f'# HELP {name} {help_text}')
+        lines.append(f'# TYPE {name} counter')
+        for (key, view), value in sorted(counters.items()):
+            if key == counter:
+                lines.append(
+                    f'{name}{{view="{_escape(view)}"}} {_format(value)}'
+                )
+    return '\n'.join(lines) + '\n'
@@ -0,0 +1,45 @@
+import random
+import time
+
+from django.conf import settings
+
+from . import instrumentation, metrics
+
+
+class PerformanceMiddleware:
+    """Замеры страниц: заголовок Server-Timing и метрики процесса.
+
+    Время ответа записывается всегда. База, шаблоны и кэш замеряются
+    у доли запросов PERFORMANCE_SAMPLE_RATE: только у них появляется
+    Server-Timing.
+    """
+    def __init__(self, get_response):
+        self.get_response = get_response
+        instrumentation.install()
+
+    def __call__(self, request):
+        start = time.perf_counter()
+        if random.random() >= settings.PERFORMANCE_SAMPLE_RATE:
+            response = self.get_response(request)
+            self.observe(request, response, start)
+            return response
+        with instrumentation.recording() as recorder:
+            response = self.get_response(request)
+        duration = self.observe(request, response, start, recorder)
+        response['Server-Timing'] = ', '.join((
+            f'db;dur={recorder.db_time * 1000:.1f};'
+            f'desc="{recorder.query_count} queries, '
+            f'{recorder.duplicate_count} duplicated"',
+            f'tpl;dur={recorder.template_time * 1000:.1f}',
+            f'cache;desc="{recorder.cache_hits} hits, '
+            f'{recorder.cache_misses} misses"',
+            f'total;dur={duration * 1000:.1f}',
+        ))
+        return response
+
+    def observe(self, request, response, start, recorder=None):
+        duration = time.perf_counter() - start
+        match = request.resolver_match
+        view = match.view_name if match else 'unresolved'
+        metrics.observe(view, response.status_code, duration, recorder)
+        return duration
@@ -0,0 +1,64 @@
+"""Заместитель репликации для реплик-файлов SQLite.
+
+У SQLite нет репликации, поэтому для проверки маршрутизации на одной
+машине реплики — это копии файла основной базы. После записи копия
+обновляется целиком через backup API в фоновом потоке, не раньше чем
+через REPLICATION_LAG секунд: реплики отстают, как настоящие.
+"""
+import logging
+import sqlite3
+import threading
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_timer = None
+
+
+def copy_database(source, target):
+    """Скопировать базу SQLite source в файл target."""
+    source_connection = sqlite3.connect(source)
+    target_connection = sqlite3.connect(target, timeout=30)
+    try:
+        source_connection.backup(target_connection)
+    finally:
+        target_connection.close()
+        source_connection.close()
+
+
+def sync_replicas():
+    """Обновить все реплики; вернуть их число."""
+    databases = settings.DATABASES
+    primary = databases[DEFAULT_DB_ALIAS]['NAME']
+    for alias in settings.DATABASE_REPLICAS:
+        copy_database(primary, databases[alias]['NAME'])
+    return len(settings.DATABASE_REPLICAS)
+
+
+def _run():
+    global _timer
+    with _lock:
+        _timer = None
+    try:
+        sync_replicas()
+    except sqlite3.Error:
+        logger.warning('Не удалось обновить реплики', exc_info=True)
+
+
+def schedule():
+    """Обновить реплики через REPLICATION_LAG секунд после записи.
+
+    Записи, пришедшие до срабатывания таймера, уедут одной копией.
+    """
+    global _timer
+    if not settings.REPLICATION_STAND_IN or not settings.DATABASE_REPLICAS:
+        return
+    with _lock:
+        if _timer is not None:
+            return
+        _timer = threading.Timer(settings.REPLICATION_LAG, _run)
+        _timer.daemon = True
+        _timer.start()
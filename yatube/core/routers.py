@@ -0,0 +1,109 @@
+"""Чтение с реплик базы для страниц, которые только читают.
+
+Представление, обёрнутое replica_reads, читает с одной из реплик
+DATABASE_REPLICAS; всё остальное и любая запись идут в default.
+Пользователь, который только что писал, ещё REPLICA_PIN_SECONDS
+читает с основной базы (ReplicaPinMiddleware ставит ему cookie),
+чтобы видеть свои изменения, пока реплики их догоняют. Запись
+отмечает обёртка соединения основной базы (note_writes, подключает
+core.db), а не маршрутизатор: db_for_write вызывается и там, где
+ничего не пишется, например в get_or_create, нашедшем объект.
+"""
+import random
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from django.conf import settings
+from django.db import DEFAULT_DB_ALIAS
+
+from . import replication
+
+_state = threading.local()
+WRITE_STATEMENTS = {'INSERT', 'UPDATE', 'DELETE', 'REPLACE'}
+
+
+def replica_in_use():
+    """Читает ли текущий поток с реплики."""
+    return (getattr(_state, 'replica', None) is not None
+            and not getattr(_state, 'wrote', False))
+
+
+def mark_written():
+    """Запрос писал: дальше он читает с основной базы, а реплики
+    получат изменения с задержкой."""
+    _state.wrote = True
+    replication.schedule()
+
+
+def note_writes(execute, sql, params, many, context):
+    """Обёртка выполнения запросов: отметить пишущие запросы."""
+    verb = sql.lstrip().split(None, 1)[:1]
+    if verb and verb[0].upper() in WRITE_STATEMENTS:
+        mark_written()
+    return execute(sql, params, many, context)
+
+
+@contextmanager
+def reading_from_replica():
+    """Направить чтения внутри блока на случайную реплику."""
+    replicas = settings.DATABASE_REPLICAS
+    if not replicas or getattr(_state, 'pinned', False):
+        yield
+        return
+    # Одна реплика на весь запрос: разные реплики могут отставать
+    # по-разному, и страница собралась бы из разных моментов.
+    _state.replica = random.choice(replicas)
+    try:
+        yield
+    finally:
+        _state.replica = None
+
+
+def replica_reads(view):
+    """Декоратор представлений, которые не пишут в базу."""
+    @wraps(view)
+    def wrapper(request, *args, **kwargs):
+        with reading_from_replica():
+            return view(request, *args, **kwargs)
+    return wrapper
+
+
+class ReplicaRouter:
+    def db_for_read(self, model, **hints):
+        if replica_in_use():
+            return _state.replica
+        return DEFAULT_DB_ALIAS
+
+    def db_for_write(self, model, **hints):
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        # Схема попадает на реплики вместе с данными.
+        return db == DEFAULT_DB_ALIAS
+
+
+class ReplicaPinMiddleware:
+    """Закрепить за основной базой того, кто только что писал."""
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        _state.pinned = settings.REPLICA_PIN_COOKIE in request.COOKIES
+        _state.wrote = False
+        try:
+            response = self.get_response(request)
+            wrote = _state.wrote
+        finally:
+            _state.pinned = False
+            _state.wrote = False
+        if wrote and settings.DATABASE_REPLICAS:
+            response.set_cookie(
+                settings.REPLICA_PIN_COOKIE, '1',
+                max_age=settings.REPLICA_PIN_SECONDS,
+                httponly=True, samesite='Lax',
+            )
+        return response
@@ -0,0 +1,89 @@
+"""Файловое хранилище с адресацией по содержимому.
+
+Имя файла — SHA-256 его байтов: <каталог>/ab/cd/<хэш><расширение>,
+где каталог берётся из upload_to. Повторная загрузка того же файла не
+пишет вторую копию, а возвращает имя уже лежащей; её время изменения
+обновляется, чтобы уборка сирот (posts.media) не удалила файл, на
+который вот-вот сошлётся новая строка. Запись и удаление одного имени
+идут под общим замком в кэше (lock), иначе удаление могло бы проверить
+время изменения до обновления и стереть только что переиспользованный
+файл.
+"""
+import hashlib
+import os
+import re
+import time
+from contextlib import contextmanager
+
+from django.core.cache import cache
+from django.core.files import File
+from django.core.files.storage import FileSystemStorage
+
+HASH_NAME = re.compile(r'(^|/)[0-9a-f]{2}/[0-9a-f]{2}/[0-9a-f]{64}\.\w+$')
+LOCK_KEY = 'storage:lock:{}'
+# Замок снимается сам, если процесс с ним упал.
+LOCK_TIMEOUT = 30
+LOCK_POLL_INTERVAL = 0.05
+
+
+@contextmanager
+def name_lock(name, blocking=True):
+    """Замок на имя файла в общем кэше; отдаёт True, если его взяли.
+
+    Без blocking не ждёт: занятое имя сейчас пишут или удаляют.
+    """
+    key = LOCK_KEY.format(name)
+    locked = cache.add(key, True, LOCK_TIMEOUT)
+    while blocking and not locked:
+        time.sleep(LOCK_POLL_INTERVAL)
+        locked = cache.add(key, True, LOCK_TIMEOUT)
+    try:
+        yield locked
+    finally:
+        if locked:
+            cache.delete(key)
+
+
+def content_digest(content):
+    digest = hashlib.sha256()
+    content.seek(0)
+    for chunk in content.chunks():
+        digest.update(chunk)
+    content.seek(0)
+    return digest.hexdigest()
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    def content_name(self, name, content):
+        directory, filename = os.path.split(name)
+        _, extension = os.path.splitext(filename)
+        digest = content_digest(content)
+        return os.path.join(
+            directory, digest[:2], digest[2:4],
+            f'{digest}{extension.lower()}',
+        ).replace('\\', '/')
+
+    @staticmethod
+    def is_content_name(name):
+        return bool(name and HASH_NAME.search(name))
+
+    def lock(self, name, blocking=True):
+        return name_lock(name, blocking)
+
+    def save(self, name, content, max_length=None):
+        if name is None:
+            name = content.name
+        if not hasattr(content, 'chunks'):
+            content = File(content, name)
+        name = self.content_name(name, content)
+        with self.lock(name):
+            if self.exists(name):
+                os.utime(self.path(name))
+                return name
+            # Параллельная запись того же файла получит имя с суффиксом:
+            # лишняя копия, но не испорченный файл.
+            return self._save(name, content)
+
+    def is_recent(self, name, age):
+        """Файл записан или переиспользован меньше age секунд назад."""
+        return time.time() - os.path.getmtime(self.path(name)) < age
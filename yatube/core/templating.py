@@ -0,0 +1,87 @@
+"""Прогрев шаблонов проекта и замер времени их разбора.
+
+С кэширующим загрузчиком шаблон разбирается при первом обращении в
+каждом процессе, и первый запрос после выкладки платит за разбор
+base.html и всех include страницы. warm_templates() разбирает все
+шаблоны из templates/ заранее, при старте процесса.
+"""
+import logging
+import math
+import os
+import time
+
+from django.conf import settings
+from django.template import TemplateSyntaxError, engines
+from django.template.base import Template
+
+logger = logging.getLogger(__name__)
+
+
+def get_engine():
+    return engines['django']
+
+
+def project_template_names(engine=None):
+    """Имена всех шаблонов из DIRS движка, то есть из templates/."""
+    engine = engine or get_engine()
+    names = []
+    for directory in engine.engine.dirs:
+        for root, _, files in os.walk(directory):
+            names += [
+                os.path.relpath(os.path.join(root, file), directory)
+                for file in files
+            ]
+    return sorted(name.replace(os.sep, '/') for name in names)
+
+
+def warm_templates(names=None, engine=None):
+    """Разобрать шаблоны заранее; вернуть число разобранных."""
+    engine = engine or get_engine()
+    warmed = 0
+    for name in names or project_template_names(engine):
+        try:
+            engine.get_template(name)
+        except TemplateSyntaxError:
+            logger.exception('Шаблон %s не разбирается', name)
+            continue
+        warmed += 1
+    return warmed
+
+
+def parse_time(name, engine=None, repeat=5):
+    """Лучшее из repeat время разбора шаблона name, в секундах.
+
+    Разбирается исходник в обход кэширующего загрузчика, чтобы замер
+    не зависел от того, прогрет ли процесс.
+    """
+    engine = engine or get_engine()
+    loaded = engine.get_template(name).template
+    best = math.inf
+    for _ in range(repeat):
+        started = time.perf_counter()
+        Template(loaded.source, loaded.origin, name, engine.engine)
+        best = min(best, time.perf_counter() - started)
+    return best
+
+
+def parse_times(names=None, engine=None, repeat=5):
+    engine = engine or get_engine()
+    return {
+        name: parse_time(name, engine, repeat)
+        for name in names or project_template_names(engine)
+    }
+
+
+def dominant_templates(times, share=None):
+    """Шаблоны, на которые приходится не меньше share всего разбора."""
+    if share is None:
+        share = settings.TEMPLATE_PARSE_DOMINANT_SHARE
+    total = sum(times.values())
+    if not total:
+        return []
+    return [
+        name for name, seconds in sorted(
+            times.items(), key=lambda item: item[1], reverse=True
+        )
+        if seconds / total >= share
+    ]
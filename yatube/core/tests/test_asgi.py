@@ -0,0 +1,84 @@
+import asyncio
+from io import BytesIO
+
+from django.core.wsgi import get_wsgi_application
+from django.test import SimpleTestCase
+
+from core import asgi
+
+
+def http_scope(path, method='GET', query=b'', headers=()):
+    return {
+        'type': 'http',
+        'method': method,
+        'path': path,
+        'query_string': query,
+        'headers': list(headers),
+        'server': ('testserver', 80),
+        'client': ('127.0.0.1', 5000),
+    }
+
+
+class ASGIHandlerTests(SimpleTestCase):
+    def setUp(self):
+        self.application = asgi.ASGIHandler(get_wsgi_application(), 2)
+        self.addCleanup(self.application.executor.shutdown)
+
+    def request(self, scope, body=b''):
+        messages = []
+        requests = [{'type': 'http.request', 'body': body}]
+
+        async def receive():
+            return requests.pop(0)
+
+        async def send(message):
+            messages.append(message)
+
+        asyncio.run(self.application(scope, receive, send))
+        return messages
+
+    def test_environ(self):
+        environ = asgi.build_environ(http_scope(
+            '/пост/', 'POST', b'a=1',
+            [(b'content-type', b'text/plain'), (b'x-tag', b'a'),
+             (b'x-tag', b'b')],
+        ), BytesIO())
+        self.assertEqual(environ['REQUEST_METHOD'], 'POST')
+        self.assertEqual(
+            environ['PATH_INFO'].encode('latin-1').decode(), '/пост/'
+        )
+        self.assertEqual(environ['QUERY_STRING'], 'a=1')
+        self.assertEqual(environ['CONTENT_TYPE'], 'text/plain')
+        self.assertEqual(environ['HTTP_X_TAG'], 'a,b')
+
+    def test_page_rendered_in_pool(self):
+        messages = self.request(http_scope('/about/tech/'))
+        self.assertEqual(messages[0]['type'], 'http.response.start')
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertIn(
+            (b'content-type', b'text/html; charset=utf-8'),
+            messages[0]['headers'],
+        )
+        body = b''.join(message.get('body', b'') for message in messages)
+        self.assertIn('Технологии'.encode(), body)
+        self.assertFalse(messages[-1].get('more_body', False))
+
+    def test_missing_page(self):
+        messages = self.request(http_scope('/нет-такой/'))
+        self.assertEqual(messages[0]['status'], 404)
+
+    def test_lifespan(self):
+        messages = []
+        events = [{'type': 'lifespan.startup'}, {'type': 'lifespan.shutdown'}]
+
+        async def receive():
+            return events.pop(0)
+
+        async def send(message):
+            messages.append(message['type'])
+
+        application = asgi.ASGIHandler(get_wsgi_application(), 1)
+        asyncio.run(application({'type': 'lifespan'}, receive, send))
+        self.assertEqual(messages, [
+            'lifespan.startup.complete', 'lifespan.shutdown.complete',
+        ])
@@ -0,0 +1,63 @@
+from django.test import TestCase
+
+from core import benchmark
+from posts.seed import seed
+
+
+class BenchmarkTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.targets = benchmark.build_targets(seed(
+            users=5, groups=2, posts=30, comments=10, follows=5
+        ))
+
+    def test_targets_cover_all_routes(self):
+        """Замер обходит каждый маршрут posts, users, about и api."""
+        self.assertEqual(
+            {target.name for target in self.targets},
+            benchmark.route_names(),
+        )
+
+    def test_measure_reports_latency_and_queries(self):
+        """Тестовый клиент даёт перцентили и число запросов без ошибок."""
+        results = benchmark.measure(self.targets, iterations=2)
+        for name, summary in results.items():
+            with self.subTest(route=name):
+                self.assertEqual(summary['errors'], 0)
+                self.assertLessEqual(summary['p50'], summary['p99'])
+                self.assertIn('queries', summary)
+
+    def test_load_test_against_local_server(self):
+        """Нагрузка на локальный сервер считает пропускную способность."""
+        targets = [
+            target for target in self.targets
+            if target.name.startswith('about:')
+        ]
+        with benchmark.serve() as base_url:
+            results = benchmark.load_test(
+                base_url, targets, total=10, concurrency=2
+            )
+        self.assertEqual(results['total']['errors'], 0)
+        self.assertGreater(results['total']['rps'], 0)
+
+    def test_percentile(self):
+        values = list(range(1, 101))
+        self.assertEqual(benchmark.percentile(values, 50), 50)
+        self.assertEqual(benchmark.percentile(values, 99), 99)
+        self.assertEqual(benchmark.percentile([7], 95), 7)
+
+    def test_compare_flags_regressions(self):
+        """Рост числа запросов и p95 сверх допуска — регрессии."""
+        baseline = {'client': {
+            'posts:index': {'p95': 10, 'queries': 3},
+            'about:tech': {'p95': 10, 'queries': 0},
+        }}
+        report = {'volumes': {}, 'client': {
+            'posts:index': {'p95': 12, 'queries': 4},
+            'about:tech': {'p95': 30, 'queries': 0},
+        }}
+        regressions = benchmark.compare(baseline, report, tolerance=1.5)
+        self.assertEqual(len(regressions), 2)
+        self.assertIn('posts:index', regressions[0])
+        self.assertIn('about:tech', regressions[1])
@@ -0,0 +1,161 @@
+import os
+import shutil
+import tempfile
+import time
+
+from django.core.cache import caches
+from django.test import SimpleTestCase, override_settings
+
+from core.cache import LocalStore, SQLiteCache, TieredCache
+
+TEMP_DIR = tempfile.mkdtemp()
+SHARED_CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'shared': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': os.path.join(TEMP_DIR, 'cache.sqlite3'),
+    },
+    'plain': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'plain',
+    },
+}
+
+
+def tearDownModule():
+    shutil.rmtree(TEMP_DIR, ignore_errors=True)
+
+
+def worker(name, shared='shared', **options):
+    """Кэш отдельного воркера: своя память, общий второй ярус."""
+    return TieredCache(name, {
+        'OPTIONS': {'SHARED': shared, 'POLL_INTERVAL': 0, **options},
+    })
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class SQLiteCacheTests(SimpleTestCase):
+    def setUp(self):
+        self.cache = caches['shared']
+        self.cache.clear()
+
+    def test_basic_operations(self):
+        cache = self.cache
+        self.assertIsNone(cache.get('key'))
+        cache.set('key', {'a': 1})
+        self.assertEqual(cache.get('key'), {'a': 1})
+        self.assertFalse(cache.add('key', 'other'))
+        self.assertTrue(cache.add('new', 'value'))
+        cache.set_many({'x': 1, 'y': 2})
+        self.assertEqual(cache.get_many(['x', 'y', 'z']), {'x': 1, 'y': 2})
+        cache.delete('x')
+        self.assertFalse(cache.has_key('x'))
+        cache.clear()
+        self.assertIsNone(cache.get('key'))
+
+    def test_incr(self):
+        self.cache.set('counter', 10)
+        self.assertEqual(self.cache.incr('counter', 5), 15)
+        self.assertEqual(self.cache.get('counter'), 15)
+        with self.assertRaises(ValueError):
+            self.cache.incr('missing')
+
+    def test_expiry(self):
+        self.cache.set('short', 1, timeout=-1)
+        self.cache.set('forever', 1, timeout=None)
+        self.assertIsNone(self.cache.get('short'))
+        self.assertEqual(self.cache.get('forever'), 1)
+        self.assertFalse(self.cache.touch('short'))
+        self.assertTrue(self.cache.touch('forever', 10))
+
+    def test_changes_log(self):
+        """Журнал отдаёт изменённые ключи и сообщает об очистке."""
+        start = self.cache.last_change()
+        self.cache.set('a', 1)
+        self.cache.delete('b')
+        last, keys = self.cache.changes_since(start)
+        self.assertEqual(keys, [
+            self.cache.make_key('a'), self.cache.make_key('b'),
+        ])
+        self.cache.clear()
+        _, keys = self.cache.changes_since(last)
+        self.assertIsNone(keys)
+
+    def test_visible_to_another_connection(self):
+        """Запись видна другому экземпляру, как другому процессу."""
+        other = SQLiteCache(SHARED_CACHES['shared']['LOCATION'], {})
+        self.cache.set('shared', 'value')
+        self.assertEqual(other.get('shared'), 'value')
+
+
+@override_settings(CACHES=SHARED_CACHES)
+class TieredCacheTests(SimpleTestCase):
+    def setUp(self):
+        caches['shared'].clear()
+        caches['plain'].clear()
+        self.first = worker('first')
+        self.second = worker('second')
+        self.first.clear()
+        self.second.sync(force=True)
+
+    def test_reads_served_from_local_memory(self):
+        self.first.set('key', 'value')
+        caches['shared'].delete('key')
+        self.first._local.last_change = caches['shared'].last_change()
+        self.assertEqual(self.first.get('key'), 'value')
+
+    def test_reads_through_to_shared_tier(self):
+        self.first.set('key', 'value')
+        self.assertEqual(self.second.get('key'), 'value')
+        self.assertEqual(len(self.second._local), 1)
+
+    def test_write_invalidates_other_workers(self):
+        """Запись одного воркера сбрасывает копию в памяти другого."""
+        self.first.set('version', 1)
+        self.assertEqual(self.second.get('version'), 1)
+        self.first.incr('version')
+        self.assertEqual(self.second.get('version'), 2)
+        self.first.delete('version')
+        self.assertIsNone(self.second.get('version'))
+
+    def test_clear_reaches_other_workers(self):
+        self.first.set('key', 'value')
+        self.second.get('key')
+        self.first.clear()
+        self.assertIsNone(self.second.get('key'))
+
+    def test_local_copy_expires_without_log(self):
+        """Без журнала у общего кэша копия живёт LOCAL_TIMEOUT секунд."""
+        first = worker('plain_first', 'plain', LOCAL_TIMEOUT=0.05)
+        second = worker('plain_second', 'plain', LOCAL_TIMEOUT=0.05)
+        first.set('key', 1)
+        self.assertEqual(second.get('key'), 1)
+        first.set('key', 2)
+        self.assertEqual(second.get('key'), 1)
+        time.sleep(0.06)
+        self.assertEqual(second.get('key'), 2)
+
+
+class LocalStoreTests(SimpleTestCase):
+    def test_evicts_least_recently_used(self):
+        store = LocalStore(max_entries=2, max_bytes=1024)
+        forever = time.monotonic() + 60
+        store.put('a', b'1', forever)
+        store.put('b', b'2', forever)
+        store.get('a')
+        store.put('c', b'3', forever)
+        self.assertEqual(store.get('a'), b'1')
+        self.assertIsNone(store.get('b'))
+
+    def test_bounded_by_size(self):
+        store = LocalStore(max_entries=100, max_bytes=10)
+        forever = time.monotonic() + 60
+        store.put('a', b'12345', forever)
+        store.put('b', b'12345', forever)
+        store.put('c', b'12345', forever)
+        self.assertEqual(len(store), 2)
+        self.assertLessEqual(store.size, 10)
+        store.put('huge', b'x' * 11, forever)
+        self.assertIsNone(store.get('huge'))
@@ -0,0 +1,117 @@
+from io import StringIO
+from types import SimpleNamespace
+from unittest import mock
+
+from django.core.management import call_command
+from django.db import OperationalError, connection
+from django.test import (
+    SimpleTestCase, TestCase, TransactionTestCase, override_settings,
+)
+
+from core import db, instrumentation
+
+
+class SQLitePragmaTests(TestCase):
+    def test_pragmas_applied_on_connect(self):
+        cursor = connection.connection.cursor()
+        self.assertEqual(cursor.execute('PRAGMA synchronous').fetchone(),
+                         (1,))
+        self.assertEqual(cursor.execute('PRAGMA cache_size').fetchone(),
+                         (-16000,))
+        self.assertIn(db.retry_locked_statement, connection.execute_wrappers)
+
+
+@override_settings(SQLITE_RETRY_DELAY=0, SQLITE_WRITE_RETRIES=3)
+class RetryTests(SimpleTestCase):
+    def flaky(self, failures, message='database is locked'):
+        calls = []
+
+        def call(*args):
+            calls.append(args)
+            if len(calls) <= failures:
+                raise OperationalError(message)
+            return 'ok'
+        return call, calls
+
+    def test_transaction_retried_after_lock(self):
+        call, calls = self.flaky(2)
+        self.assertEqual(db.retry_on_locked(call)(), 'ok')
+        self.assertEqual(len(calls), 3)
+
+    def test_gives_up_after_retries(self):
+        call, calls = self.flaky(10)
+        with self.assertRaises(OperationalError):
+            db.retry_on_locked(call)()
+        self.assertEqual(len(calls), 4)
+
+    def test_other_errors_not_retried(self):
+        call, calls = self.flaky(1, 'no such table: posts_post')
+        with self.assertRaises(OperationalError):
+            db.retry_on_locked(call)()
+        self.assertEqual(len(calls), 1)
+
+    def test_statement_retried_only_outside_transaction(self):
+        """Отдельный запрос повторяется только в режиме autocommit."""
+        call, calls = self.flaky(1)
+        context = {'connection': SimpleNamespace(in_atomic_block=False)}
+        self.assertEqual(
+            db.retry_locked_statement(call, 'SQL', (), False, context), 'ok'
+        )
+        call, calls = self.flaky(1)
+        context = {'connection': SimpleNamespace(in_atomic_block=True)}
+        with self.assertRaises(OperationalError):
+            db.retry_locked_statement(call, 'SQL', (), False, context)
+        self.assertEqual(len(calls), 1)
+
+
+class HealthCheckTests(SimpleTestCase):
+    def test_broken_connection_closed(self):
+        class Broken(Exception):
+            pass
+
+        raw = mock.Mock()
+        raw.cursor.return_value.execute.side_effect = Broken
+        broken = mock.Mock(
+            connection=raw, in_atomic_block=False,
+            Database=SimpleNamespace(Error=Broken),
+        )
+        healthy = mock.Mock(connection=mock.Mock(), in_atomic_block=False)
+        with mock.patch.object(db, 'connections') as connections:
+            connections.all.return_value = [broken, healthy]
+            db.check_connections()
+        broken.close.assert_called_once()
+        healthy.close.assert_not_called()
+
+
+class BenchmarkSQLiteTests(SimpleTestCase):
+    def test_command_reports_both_profiles(self):
+        out = StringIO()
+        call_command(
+            'benchmark_sqlite', duration=0.2, readers=2, writers=1,
+            posts=100, authors=5, stdout=out,
+        )
+        output = out.getvalue()
+        self.assertIn('default', output)
+        self.assertIn('tuned', output)
+        self.assertIn('Ускорение', output)
+
+
+@override_settings(SQLITE_RETRY_DELAY=0, SQLITE_WRITE_RETRIES=3)
+class RetryRecordingTests(TransactionTestCase):
+    def test_retried_statement_recorded_once(self):
+        """Повторы запроса после блокировки — один запрос в замерах."""
+        attempts = []
+
+        def locked_twice(execute, sql, params, many, context):
+            attempts.append(sql)
+            if len(attempts) <= 2:
+                raise OperationalError('database is locked')
+            return execute(sql, params, many, context)
+
+        with instrumentation.recording() as recorder:
+            with connection.execute_wrapper(locked_twice):
+                with connection.cursor() as cursor:
+                    cursor.execute('SELECT 1')
+        self.assertEqual(len(attempts), 3)
+        self.assertEqual(recorder.query_count, 1)
+        self.assertEqual(recorder.duplicate_count, 0)
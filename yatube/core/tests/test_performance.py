@@ -0,0 +1,89 @@
+from django.contrib.auth import get_user_model
+from django.core.cache import cache
+from django.template.loader import render_to_string
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core import instrumentation, metrics
+
+User = get_user_model()
+
+
+class RecorderTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        instrumentation.install()
+
+    def test_counts_queries_and_duplicates(self):
+        """Повтор запроса с теми же параметрами считается дублем."""
+        with instrumentation.recording() as recorder:
+            User.objects.filter(pk=1).exists()
+            User.objects.filter(pk=1).exists()
+            User.objects.filter(pk=2).exists()
+        self.assertEqual(recorder.query_count, 3)
+        self.assertEqual(recorder.duplicate_count, 1)
+        self.assertGreater(recorder.db_time, 0)
+
+    def test_counts_cache_hits_and_misses(self):
+        cache.clear()
+        with instrumentation.recording() as recorder:
+            self.assertIsNone(cache.get('perf:key'))
+            cache.set('perf:key', 0)
+            self.assertEqual(cache.get('perf:key'), 0)
+            cache.get_many(['perf:key', 'perf:other'])
+        self.assertEqual(recorder.cache_hits, 2)
+        self.assertEqual(recorder.cache_misses, 2)
+
+    def test_measures_template_render(self):
+        with instrumentation.recording() as recorder:
+            render_to_string('about/tech.html')
+        self.assertGreater(recorder.template_time, 0)
+
+    def test_nothing_recorded_outside_request(self):
+        self.assertIsNone(instrumentation.current())
+        self.assertEqual(cache.get('perf:absent', 'default'), 'default')
+
+
+class PerformanceMiddlewareTests(TestCase):
+    def setUp(self):
+        metrics.reset()
+        self.client = Client()
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=1)
+    def test_sampled_response_has_server_timing(self):
+        response = self.client.get(reverse('posts:index'))
+        timing = response['Server-Timing']
+        for part in ('db;dur=', 'tpl;dur=', 'cache;desc=', 'total;dur='):
+            with self.subTest(part=part):
+                self.assertIn(part, timing)
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=0)
+    def test_unsampled_response_only_counted(self):
+        response = self.client.get(reverse('about:tech'))
+        self.assertFalse(response.has_header('Server-Timing'))
+        text = metrics.render()
+        self.assertIn(
+            'yatube_request_duration_seconds_count'
+            '{view="about:tech",status="200"} 1', text
+        )
+        self.assertNotIn('yatube_sampled_requests_total{', text)
+
+    @override_settings(PERFORMANCE_SAMPLE_RATE=1)
+    def test_metrics_endpoint(self):
+        """Эндпоинт отдаёт метрики в формате Prometheus."""
+        self.client.get(reverse('posts:index'))
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response['Content-Type'].startswith('text/plain'))
+        text = response.content.decode()
+        self.assertIn('# TYPE yatube_request_duration_seconds histogram',
+                      text)
+        self.assertIn('yatube_sampled_requests_total{view="posts:index"} 1',
+                      text)
+        self.assertIn('yatube_db_queries_total{view="posts:index"}', text)
+
+    @override_settings(INTERNAL_IPS=[])
+    def test_metrics_endpoint_is_private(self):
+        response = self.client.get(reverse('metrics'))
+        self.assertEqual(response.status_code, 403)
@@ -0,0 +1,181 @@
+import os
+import sqlite3
+import tempfile
+
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import (
+    Client, RequestFactory, SimpleTestCase, TestCase, override_settings,
+)
+from django.urls import reverse
+
+from core.replication import copy_database
+from core.routers import (
+    ReplicaPinMiddleware, ReplicaRouter, note_writes, replica_in_use,
+    replica_reads,
+)
+from posts.caching import FEED_SCOPE, bump, fragment_cache
+from posts.models import Post, User
+
+router = ReplicaRouter()
+
+
+def execute(sql):
+    """Пропустить запрос через note_writes, не обращаясь к базе."""
+    return note_writes(lambda *args: None, sql, None, False, {})
+
+
+def request_through(view, cookies=None):
+    """Пропустить запрос через ReplicaPinMiddleware до view."""
+    request = RequestFactory().get('/')
+    request.COOKIES.update(cookies or {})
+    return ReplicaPinMiddleware(view)(request)
+
+
+@override_settings(DATABASE_REPLICAS=['replica'], REPLICATION_STAND_IN=False)
+class ReplicaRouterTests(SimpleTestCase):
+    def test_read_only_view_reads_from_replica(self):
+        databases = []
+
+        @replica_reads
+        def view(request):
+            databases.append(router.db_for_read(Post))
+            return HttpResponse()
+
+        response = request_through(view)
+        self.assertEqual(databases, ['replica'])
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+        self.assertEqual(router.db_for_read(Post), 'default')
+
+    def test_reads_after_write_go_to_primary(self):
+        """Запрос, который писал, дочитывает с основной базы."""
+        databases = []
+
+        @replica_reads
+        def view(request):
+            databases.append(router.db_for_read(Post))
+            execute('UPDATE "posts_post" SET "text" = %s')
+            databases.append(router.db_for_read(Post))
+            return HttpResponse()
+
+        response = request_through(view)
+        self.assertEqual(databases, ['replica', 'default'])
+        cookie = response.cookies[settings.REPLICA_PIN_COOKIE]
+        self.assertEqual(cookie['max-age'], settings.REPLICA_PIN_SECONDS)
+
+    def test_routing_a_write_does_not_pin(self):
+        """db_for_write без записи (get_or_create нашёл объект) не
+        закрепляет зрителя за основной базой."""
+        databases = []
+
+        @replica_reads
+        def view(request):
+            databases.append(router.db_for_write(Post))
+            execute('SELECT "posts_post"."id" FROM "posts_post"')
+            databases.append(router.db_for_read(Post))
+            return HttpResponse()
+
+        response = request_through(view)
+        self.assertEqual(databases, ['default', 'replica'])
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_pinned_user_reads_from_primary(self):
+        databases = []
+
+        @replica_reads
+        def view(request):
+            databases.append(router.db_for_read(Post))
+            return HttpResponse()
+
+        request_through(view, {settings.REPLICA_PIN_COOKIE: '1'})
+        self.assertEqual(databases, ['default'])
+
+    def test_undecorated_view_reads_from_primary(self):
+        databases = []
+
+        def view(request):
+            databases.append(router.db_for_read(Post))
+            return HttpResponse()
+
+        request_through(view)
+        self.assertEqual(databases, ['default'])
+
+    def test_migrations_only_on_primary(self):
+        self.assertTrue(router.allow_migrate('default', 'posts'))
+        self.assertFalse(router.allow_migrate('replica', 'posts'))
+
+
+class ReplicaFragmentCacheTests(TestCase):
+    def fragment_timeout(self):
+        databases = []
+
+        @replica_reads
+        def view(request):
+            request.user = User()
+            databases.append(replica_in_use())
+            return HttpResponse(
+                fragment_cache(request, FEED_SCOPE)['cache_timeout']
+            )
+
+        timeout = request_through(view).content.decode()
+        return databases[0], timeout
+
+    @override_settings(DATABASE_REPLICAS=['default'], REPLICATION_LAG=30,
+                       REPLICATION_STAND_IN=False)
+    def test_recent_change_shortens_fragment_life(self):
+        """Фрагмент с реплики после свежей записи живёт только окно лага."""
+        bump(FEED_SCOPE)
+        on_replica, timeout = self.fragment_timeout()
+        self.assertTrue(on_replica)
+        self.assertLessEqual(int(timeout), 30)
+
+    @override_settings(DATABASE_REPLICAS=[], REPLICATION_STAND_IN=False)
+    def test_primary_keeps_fragment_timeout(self):
+        bump(FEED_SCOPE)
+        on_replica, timeout = self.fragment_timeout()
+        self.assertFalse(on_replica)
+        self.assertEqual(timeout, 'None')
+
+
+@override_settings(DATABASE_REPLICAS=['default'], REPLICATION_STAND_IN=False)
+class ReplicaViewsTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user('replica_user')
+        cls.post = Post.objects.create(text='Пост', author=cls.user)
+
+    def setUp(self):
+        self.client = Client()
+        self.client.force_login(self.user)
+        self.client.cookies.pop(settings.REPLICA_PIN_COOKIE, None)
+
+    def test_comment_pins_author_to_primary(self):
+        response = self.client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Комментарий'},
+        )
+        self.assertIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+    def test_reading_feed_does_not_pin(self):
+        response = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.status_code, 200)
+        self.assertNotIn(settings.REPLICA_PIN_COOKIE, response.cookies)
+
+
+class ReplicationStandInTests(SimpleTestCase):
+    def test_copy_database(self):
+        with tempfile.TemporaryDirectory() as directory:
+            primary = os.path.join(directory, 'primary.sqlite3')
+            replica = os.path.join(directory, 'replica.sqlite3')
+            with sqlite3.connect(primary) as connection:
+                connection.execute('CREATE TABLE posts (text TEXT)')
+                connection.execute("INSERT INTO posts VALUES ('пост')")
+            connection.close()
+            copy_database(primary, replica)
+            connection = sqlite3.connect(replica)
+            self.assertEqual(
+                connection.execute('SELECT text FROM posts').fetchall(),
+                [('пост',)],
+            )
+            connection.close()
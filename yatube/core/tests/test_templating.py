@@ -0,0 +1,77 @@
+import os
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.management import call_command
+from django.template import engines
+from django.template.loaders.filesystem import Loader
+from django.test import SimpleTestCase, override_settings
+
+from core import checks, templating
+
+CACHED_TEMPLATES = [{
+    'BACKEND': 'django.template.backends.django.DjangoTemplates',
+    'DIRS': [os.path.join(settings.BASE_DIR, 'templates')],
+    'OPTIONS': {
+        'loaders': [(
+            'django.template.loaders.cached.Loader',
+            ['django.template.loaders.filesystem.Loader'],
+        )],
+    },
+}]
+
+
+class TemplateWarmupTests(SimpleTestCase):
+    def test_project_templates_listed(self):
+        names = templating.project_template_names()
+        for name in ('base.html', 'posts/index.html', 'core/404.html',
+                     'users/login.html', 'about/tech.html'):
+            self.assertIn(name, names)
+
+    @override_settings(TEMPLATES=CACHED_TEMPLATES)
+    def test_warm_fills_cached_loader(self):
+        """После прогрева шаблоны не читаются с диска."""
+        warmed = templating.warm_templates()
+        self.assertEqual(warmed, len(templating.project_template_names()))
+        with mock.patch.object(Loader, 'get_contents') as get_contents:
+            engines['django'].get_template('posts/index.html')
+        get_contents.assert_not_called()
+
+    def test_dominant_templates(self):
+        times = {'base.html': 0.8, 'a.html': 0.1, 'b.html': 0.1}
+        self.assertEqual(
+            templating.dominant_templates(times, 0.5), ['base.html']
+        )
+        self.assertEqual(templating.dominant_templates({}, 0.5), [])
+
+    def test_command_reports_parse_times(self):
+        out = StringIO()
+        call_command('warm_templates', repeat=1, share=0, stdout=out)
+        output = out.getvalue()
+        self.assertIn('base.html', output)
+        self.assertIn('узкое место', output)
+
+
+class TemplateCheckTests(SimpleTestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+        for name, source in {
+            'heavy.html': '{% if a %}{{ b|default:c }}{% endif %}' * 200,
+            'light.html': '{{ a }}',
+            'broken.html': '{% if %}',
+        }.items():
+            with open(os.path.join(self.directory, name), 'w') as file:
+                file.write(source)
+
+    def test_reports_broken_and_dominant_templates(self):
+        templates = [{**CACHED_TEMPLATES[0], 'DIRS': [self.directory]}]
+        with self.settings(TEMPLATES=templates):
+            messages = checks.check_template_parse_times(None)
+        ids = {message.id: message.msg for message in messages}
+        self.assertIn('broken.html', ids['core.E001'])
+        self.assertIn('heavy.html', ids['core.W001'])
+        self.assertEqual(len(messages), 2)
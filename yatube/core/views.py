@@ -1,5 +1,10 @@
+from django.conf import settings
+from django.core.exceptions import PermissionDenied
+from django.http import HttpResponse
 from django.shortcuts import render
 
+from . import metrics
+
 
 def page_not_found(request, exception):
     return render(request, 'core/404.html', {'path': request.path}, status=404)
@@ -15,3 +20,14 @@ def server_error(request):
 
 def permission_denied(request, exception):
     return render(request, 'core/403.html', status=403)
+
+
+def prometheus_metrics(request):
+    """Метрики процесса для Prometheus: с внутренних адресов и для staff."""
+    if (request.META.get('REMOTE_ADDR') not in settings.INTERNAL_IPS
+            and not request.user.is_staff):
+        raise PermissionDenied
+    return HttpResponse(
+        metrics.render(),
+        content_type='text/plain; version=0.0.4; charset=utf-8',
+    )
@@ -1,16 +1,72 @@
 from django.contrib import admin
+from django.http import StreamingHttpResponse
 
-from .models import Post, Group, Comment
+from .export import MODEL_KINDS, csv_lines, jsonl_lines
+from .models import Post, Group, Comment, Follow
+from .search import search
 
+EXPORT_CONTENT_TYPES = {
+    'jsonl': 'application/x-ndjson; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+}
 
-class PostAdmin(admin.ModelAdmin):
+
+def export_action(export_format):
+    """Действие админки: выгрузить выбранные записи потоком."""
+    def action(modeladmin, request, queryset):
+        kind = MODEL_KINDS[queryset.model]
+        if export_format == 'csv':
+            lines = csv_lines(kind, queryset=queryset)
+        else:
+            lines = jsonl_lines([kind], querysets={kind: queryset})
+        response = StreamingHttpResponse(
+            lines, content_type=EXPORT_CONTENT_TYPES[export_format]
+        )
+        response['Content-Disposition'] = (
+            f'attachment; filename="{kind}s.{export_format}"'
+        )
+        return response
+    action.__name__ = f'export_{export_format}'
+    action.short_description = (
+        f'Выгрузить выбранные в {export_format.upper()}'
+    )
+    return action
+
+
+EXPORT_ACTIONS = [
+    export_action(export_format) for export_format in EXPORT_CONTENT_TYPES
+]
+
+
+class ExportMixin:
+    actions = EXPORT_ACTIONS
+
+
+class PostAdmin(ExportMixin, admin.ModelAdmin):
     list_display = ('pk', 'text', 'pub_date', 'author', 'group')
     list_editable = ('group',)
     search_fields = ('text',)
     list_filter = ('pub_date',)
     empty_value_display = '-пусто-'
 
+    def get_search_results(self, request, queryset, search_term):
+        """Поиск по индексу вместо LIKE по всей таблице."""
+        if not search_term:
+            return queryset, False
+        return search(search_term, queryset), False
+
+
+class CommentAdmin(ExportMixin, admin.ModelAdmin):
+    list_display = ('pk', 'text', 'created', 'author', 'post')
+    list_select_related = ('author',)
+
+
+class FollowAdmin(ExportMixin, admin.ModelAdmin):
+    list_display = ('pk', 'user', 'author', 'pub_date')
+    list_select_related = ('user', 'author')
+
 
 admin.site.register(Post, PostAdmin)
 admin.site.register(Group)
-admin.site.register(Comment)
+admin.site.register(Comment, CommentAdmin)
+admin.site.register(Follow, FollowAdmin)
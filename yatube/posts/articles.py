@@ -0,0 +1,58 @@
+"""Вывод карточек постов для лент.
+
+Разметка карточки одна — posts/includes/article.html. Готовый HTML
+карточки лежит в кэше под версией поста, поэтому обычно страница —
+это два запроса get_many к кэшу, а шаблон (разобранный один раз на
+процесс кэширующим загрузчиком) рендерится только для карточек,
+которых в кэше нет.
+"""
+from django.core.cache import cache
+from django.template.loader import get_template
+from django.utils.safestring import mark_safe
+
+from .caching import (
+    GROUPS_SCOPE, fragment_timeout, get_versions, post_scope,
+)
+
+ARTICLE_KEY = 'posts:article:{}:{}:{}:{}'
+ARTICLE_TEMPLATE = 'posts/includes/article.html'
+
+
+def render_article(post, template, without_group_links=False):
+    return template.render({
+        'post': post,
+        'without_group_links': without_group_links,
+    })
+
+
+def render_articles(posts, without_group_links=False):
+    """HTML карточек постов страницы, по строке на пост.
+
+    Карточка берётся из кэша по версиям поста и групп; версия поста
+    меняется при правке, новом комментарии и готовой миниатюре.
+    """
+    posts = list(posts)
+    if not posts:
+        return []
+    versions = get_versions(
+        GROUPS_SCOPE, *(post_scope(post.pk) for post in posts)
+    )
+    groups_version = versions[0]
+    variant = int(bool(without_group_links))
+    keys = [
+        ARTICLE_KEY.format(post.pk, version, groups_version, variant)
+        for post, version in zip(posts, versions[1:])
+    ]
+    cached = cache.get_many(keys)
+    missing = {}
+    template = None
+    for post, key in zip(posts, keys):
+        if key not in cached:
+            template = template or get_template(ARTICLE_TEMPLATE)
+            missing[key] = render_article(
+                post, template, without_group_links
+            )
+    if missing:
+        cache.set_many(missing, timeout=fragment_timeout(versions))
+        cached.update(missing)
+    return [mark_safe(cached[key]) for key in keys]
@@ -0,0 +1,219 @@
+"""Версии закэшированных фрагментов страниц.
+
+Каждая область (общая лента, группа, профиль автора, подписки
+читателя) хранит в кэше номер версии, который входит в ключ фрагмента.
+Запись в базу меняет версию, поэтому фрагмент можно держать сколько
+угодно долго: устаревший ключ просто больше не запрашивается.
+"""
+import hashlib
+import math
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
+
+from core.routers import replica_in_use
+
+from . import feed
+from .constants import FRAGMENT_CACHE_TIMEOUT
+from .models import Group, User
+from .selectors import feed_posts, page_object
+
+VERSION_KEY = 'posts:version:{}'
+# Кэш фрагментов первой страницы ленты и дальних страниц.
+FRAGMENT_CACHE = 'default'
+DEEP_PAGE_CACHE = 'uncached'
+FEED_SCOPE = 'feed'
+GROUPS_SCOPE = 'groups'
+
+
+def group_scope(group_id):
+    return f'group:{group_id}'
+
+
+def profile_scope(author_id):
+    return f'profile:{author_id}'
+
+
+def follow_scope(user_id):
+    return f'follow:{user_id}'
+
+
+def post_scope(post_id):
+    return f'post:{post_id}'
+
+
+def stats_scope(user_id):
+    return f'stats:{user_id}'
+
+
+def _new_version():
+    # Версия — время в наносекундах, а не счётчик: она не повторяется,
+    # даже если ключ версии вытеснят из кэша, и по ней видно, как давно
+    # область менялась.
+    return time.time_ns()
+
+
+def get_versions(*scopes):
+    keys = [VERSION_KEY.format(scope) for scope in scopes]
+    versions = cache.get_many(keys)
+    missing = {key: _new_version() for key in keys if key not in versions}
+    if missing:
+        cache.set_many(missing, timeout=None)
+        versions.update(missing)
+    return [versions[key] for key in keys]
+
+
+def bump(*scopes):
+    """Сделать устаревшими фрагменты перечисленных областей."""
+    cache.set_many(
+        {VERSION_KEY.format(scope): _new_version() for scope in scopes},
+        timeout=None,
+    )
+
+
+def bump_post(post_id, author_id, *group_ids, followers=True):
+    """Сбросить фрагменты, где виден пост автора из указанных групп.
+
+    Ленты подписок сбрасываются у читателей, которым посты автора
+    раздаются при записи: их не больше FEED_FANOUT_LIMIT. Ленты с
+    популярным автором следят за версией его профиля. Без followers
+    (новый комментарий) ленты подписок не сбрасываются: ради счётчика
+    комментариев в карточке не стоит обходить всех подписчиков.
+    """
+    scopes = [FEED_SCOPE, post_scope(post_id), profile_scope(author_id)]
+    scopes += [
+        group_scope(group_id) for group_id in set(group_ids) if group_id
+    ]
+    if followers:
+        scopes += [
+            follow_scope(user_id)
+            for user_id in feed.fanout_followers(author_id)
+        ]
+    bump(*scopes)
+
+
+def _replica_lag(versions):
+    """Сколько секунд реплика ещё может не видеть последних изменений."""
+    if not replica_in_use():
+        return 0
+    return settings.REPLICATION_LAG - (time.time_ns() - max(versions)) / 1e9
+
+
+def fragment_timeout(versions):
+    """Время жизни фрагмента, собранного при данных версиях."""
+    lag = _replica_lag(versions)
+    if lag > 0:
+        return math.ceil(lag)
+    return FRAGMENT_CACHE_TIMEOUT
+
+
+def fragment_cache(request, *scopes):
+    """Ключ, время жизни и кэш фрагмента для контекста шаблона.
+
+    Ключ — области с их версиями и вид зрителя. Имя области в ключе
+    обязательно: версии разных читателей или групп могут совпасть, а
+    фрагменты у них разные. Кэшируется только первая страница ленты:
+    позиция ?cursor= задаётся клиентом, и ключ по ней позволил бы
+    завести сколько угодно записей в кэше. Если
+    страница читается с реплики, а область менялась недавно, реплика
+    может ещё не видеть изменений: такой фрагмент живёт только до
+    конца окна REPLICATION_LAG, а не FRAGMENT_CACHE_TIMEOUT.
+    """
+    scopes = [GROUPS_SCOPE, *scopes]
+    versions = get_versions(*scopes)
+    key = ':'.join(map(str, [
+        *(f'{scope}={version}' for scope, version in zip(scopes, versions)),
+        int(request.user.is_authenticated),
+    ]))
+    deep = 'cursor' in request.GET or 'page' in request.GET
+    return {
+        'cache_key': key,
+        'cache_timeout': fragment_timeout(versions),
+        'cache_using': DEEP_PAGE_CACHE if deep else FRAGMENT_CACHE,
+    }
+
+
+def page_validators(request, *scopes):
+    """ETag и Last-Modified страницы по версиям её областей.
+
+    Версия — момент последнего изменения области, поэтому самая
+    свежая из них и есть время изменения страницы. Пока реплика может
+    отставать, валидаторов нет: иначе клиент запомнил бы под новым
+    ETag старую страницу.
+    """
+    versions = get_versions(GROUPS_SCOPE, *scopes)
+    if _replica_lag(versions) > 0:
+        return None, None
+    viewer = request.user.pk
+    # Токен CSRF в формах страницы меняется при входе в систему.
+    csrf = request.COOKIES.get(settings.CSRF_COOKIE_NAME, '')
+    key = ':'.join(map(str, [
+        *versions, request.get_full_path(), viewer, csrf,
+    ]))
+    etag = quote_etag(hashlib.md5(key.encode()).hexdigest())
+    changed = max(versions) // 10 ** 9
+    # Last-Modified не различает зрителей и точен до секунды: он
+    # только у анонимных страниц и после конца секунды изменения.
+    if viewer is not None or changed >= int(time.time()):
+        return etag, None
+    return etag, changed
+
+
+def conditional_page(get_scopes):
+    """Декоратор: 304 Not Modified до запросов ленты и рендеринга.
+
+    get_scopes(request, *args, **kwargs) возвращает области страницы
+    или None, если страницу нельзя проверить без её построения.
+    Объекты, которые для этого пришлось загрузить, страница берёт
+    через page_object() без повторного запроса.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(request, *args, **kwargs):
+            etag = last_modified = None
+            if request.method in ('GET', 'HEAD'):
+                scopes = get_scopes(request, *args, **kwargs)
+                if scopes is not None:
+                    etag, last_modified = page_validators(request, *scopes)
+            response = get_conditional_response(
+                request, etag=etag, last_modified=last_modified
+            )
+            if response is None:
+                response = view(request, *args, **kwargs)
+                if etag is None or response.status_code != 200:
+                    return response
+            response['ETag'] = etag
+            if last_modified is not None:
+                response['Last-Modified'] = http_date(last_modified)
+            # Браузер хранит страницу у себя, но каждый раз сверяется.
+            patch_cache_control(response, private=True, no_cache=True)
+            return response
+        return wrapper
+    return decorator
+
+
+def index_scopes(request):
+    return [FEED_SCOPE]
+
+
+def group_page_scopes(request, slug):
+    group = page_object(request, Group, slug=slug)
+    return [group_scope(group.pk)]
+
+
+def profile_page_scopes(request, username):
+    author = page_object(request, User, username=username)
+    scopes = [profile_scope(author.pk), stats_scope(author.pk)]
+    if request.user.is_authenticated:
+        # Кнопка «Подписаться» зависит от подписок зрителя.
+        scopes.append(follow_scope(request.user.pk))
+    return scopes
+
+
+def post_page_scopes(request, post_id):
+    post = page_object(request, feed_posts(), pk=post_id)
+    return [post_scope(post.pk), stats_scope(post.author_id)]
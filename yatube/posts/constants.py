@@ -1,3 +1,20 @@
 POST_ON_PEGE = 10
 MAX_SUMBOL = 15
 TEST_SECOND_PAGE = 3
+FEED_ORDERING = ('-pub_date', '-id')
+CURSOR_FORWARD = 'n'
+CURSOR_BACKWARD = 'p'
+FEED_ENTRY_ORDERING = ('-pub_date', '-post_id')
+FEED_FANOUT_LIMIT = 1000
+FEED_BATCH_SIZE = 500
+FRAGMENT_CACHE_TIMEOUT = None
+THUMBNAIL_SIZE = (960, 339)
+THUMBNAIL_QUALITY = 85
+MEDIA_SWEEP_BATCH_SIZE = 500
+SEARCH_ORDERING = ('-search_rank', '-id')
+COMMENTS_ON_PAGE = 20
+COMMENT_ORDERINGS = {
+    'old': ('created', 'id'),
+    'new': ('-created', '-id'),
+}
+COMMENT_DEFAULT_ORDER = 'old'
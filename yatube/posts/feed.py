@@ -0,0 +1,169 @@
+"""Лента подписок с раздачей постов при записи (fan-out-on-write).
+
+Новый пост сразу раскладывается по лентам подписчиков в FeedEntry,
+поэтому страница /follow/ читается одним диапазоном по индексу
+(user, pub_date). Авторы, у которых подписчиков не меньше
+FEED_FANOUT_LIMIT, не раздаются: их посты подмешиваются при чтении.
+Число подписчиков берётся из UserStats, а не COUNT по Follow: иначе
+каждая запись и каждый показ ленты обходили бы всех подписчиков
+популярного автора.
+"""
+from django.db.models import Q
+
+from .constants import (
+    FEED_BATCH_SIZE, FEED_ENTRY_ORDERING, FEED_FANOUT_LIMIT, FEED_ORDERING,
+)
+from .models import FeedEntry, Follow, Post, UserStats
+from .selectors import FEED_RELATED, feed_posts
+from .utils import get_page_paginator
+
+
+def followers_count(author_id):
+    """Число подписчиков автора; без строки UserStats — подсчёт."""
+    count = UserStats.objects.filter(user_id=author_id).values_list(
+        'followers_count', flat=True
+    ).first()
+    if count is None:
+        count = Follow.objects.filter(author_id=author_id).count()
+    return count
+
+
+def is_fanout_author(author_id):
+    """Раздаются ли посты автора подписчикам при записи."""
+    return followers_count(author_id) < FEED_FANOUT_LIMIT
+
+
+def fanout_followers(author_id):
+    """Читатели, в ленты которых разложены посты автора."""
+    if not is_fanout_author(author_id):
+        return []
+    return list(Follow.objects.filter(author_id=author_id).values_list(
+        'user_id', flat=True
+    ))
+
+
+def _bulk_insert(entries):
+    FeedEntry.objects.bulk_create(
+        entries, batch_size=FEED_BATCH_SIZE, ignore_conflicts=True
+    )
+
+
+def fan_out(post):
+    """Добавить пост в ленты всех подписчиков автора."""
+    if not is_fanout_author(post.author_id):
+        return
+    followers = Follow.objects.filter(
+        author_id=post.author_id
+    ).values_list('user_id', flat=True)
+    _bulk_insert(
+        FeedEntry(user_id=user_id, post=post, pub_date=post.pub_date)
+        for user_id in followers.iterator()
+    )
+
+
+def backfill(user_id, author_id):
+    """Заполнить ленту читателя постами автора после подписки."""
+    posts = Post.objects.filter(
+        author_id=author_id
+    ).values_list('id', 'pub_date')
+    _bulk_insert(
+        FeedEntry(user_id=user_id, post_id=post_id, pub_date=pub_date)
+        for post_id, pub_date in posts.iterator()
+    )
+
+
+def backfill_followers(author_id):
+    """Дозаполнить ленты всех подписчиков автора.
+
+    Нужно, когда автор опускается ниже FEED_FANOUT_LIMIT: его посты,
+    написанные без раздачи, иначе пропали бы из лент.
+    """
+    followers = Follow.objects.filter(
+        author_id=author_id
+    ).values_list('user_id', flat=True)
+    for user_id in followers.iterator():
+        backfill(user_id, author_id)
+
+
+def prune(user_id, author_id):
+    """Убрать посты автора из ленты читателя после отписки."""
+    FeedEntry.objects.filter(
+        user_id=user_id, post__author_id=author_id
+    ).delete()
+
+
+def rebuild():
+    """Пересобрать все ленты с нуля."""
+    FeedEntry.objects.all().delete()
+    follows = Follow.objects.values_list('user_id', 'author_id')
+    for user_id, author_id in follows.iterator():
+        if is_fanout_author(author_id):
+            backfill(user_id, author_id)
+
+
+def rebuild_authors(author_ids):
+    """Пересобрать раздачу постов указанных авторов по всем лентам."""
+    FeedEntry.objects.filter(post__author_id__in=author_ids).delete()
+    for author_id in author_ids:
+        if is_fanout_author(author_id):
+            backfill_followers(author_id)
+
+
+def pulled_authors_query(user):
+    """Запрос id авторов из подписок, чьи посты подмешиваются при чтении.
+
+    Запрос идёт по подпискам читателя (индекс user, author) и строкам
+    UserStats, а не по подписчикам этих авторов.
+    """
+    return Follow.objects.filter(
+        user=user, author__stats__followers_count__gte=FEED_FANOUT_LIMIT,
+    ).order_by('author_id').values_list('author_id', flat=True)
+
+
+def get_pulled_authors(user):
+    return list(pulled_authors_query(user))
+
+
+def follow_entries(user):
+    """Материализованная лента пользователя с авторами и группами."""
+    return FeedEntry.objects.filter(user=user).select_related(
+        *(f'post__{field}' for field in FEED_RELATED)
+    )
+
+
+def get_follow_page(request, pulled_authors):
+    """Страница ленты подписок текущего пользователя.
+
+    pulled_authors — результат get_pulled_authors(): посты этих
+    авторов читаются без раздачи. Материализованная лента и каждый
+    такой автор читаются своим диапазоном по индексу, а страница
+    сливается из них в Python (MergedCursorPaginator).
+    """
+    user = request.user
+    if not pulled_authors:
+        return get_page_paginator(
+            request, follow_entries(user),
+            ordering=FEED_ENTRY_ORDERING,
+            transform=lambda entry: entry.post,
+        )
+    # Запрос с OR нужен только старым ссылкам ?page=N.
+    posts = feed_posts().filter(
+        Q(pk__in=FeedEntry.objects.filter(user=user).values('post_id'))
+        | Q(author_id__in=pulled_authors)
+    )
+    return get_page_paginator(
+        request, posts, ordering=FEED_ORDERING,
+        sources=follow_sources(user, pulled_authors),
+    )
+
+
+def follow_sources(user, pulled_authors):
+    """Источники MergedCursorPaginator для ленты с авторами без раздачи."""
+    sources = [
+        (follow_entries(user), FEED_ENTRY_ORDERING, lambda entry: entry.post)
+    ]
+    sources += [
+        (feed_posts().filter(author_id=author_id), FEED_ORDERING, None)
+        for author_id in pulled_authors
+    ]
+    return sources
@@ -1,5 +1,7 @@
 from django import forms
+from django.core.files.uploadedfile import UploadedFile
 
+from . import images
 from .models import Post, Comment
 
 
@@ -13,6 +15,27 @@ class PostForm(forms.ModelForm):
             'image': 'Изображение'
         }
 
+    processed_image = None
+
+    def clean_image(self):
+        """Новую картинку уменьшить и перекодировать до сохранения."""
+        image = self.cleaned_data.get('image')
+        if not isinstance(image, UploadedFile):
+            return image
+        self.processed_image = images.process(image)
+        return self.processed_image.file
+
+    def save(self, commit=True):
+        processed = self.processed_image
+        # Сигнал post_saved строит по ней миниатюру без чтения файла.
+        self.instance.processed_image = processed
+        if processed is not None:
+            self.instance.image_width = processed.width
+            self.instance.image_height = processed.height
+        elif not self.instance.image:
+            self.instance.image_width = self.instance.image_height = None
+        return super().save(commit)
+
 
 class CommentForm(forms.ModelForm):
     class Meta:
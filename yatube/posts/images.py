@@ -0,0 +1,96 @@
+"""Обработка картинок постов при загрузке.
+
+Оригинал не хранится: картинка проверяется, уменьшается до
+POST_IMAGE_MAX_SIZE по большей стороне, поворачивается по EXIF и
+перекодируется в POST_IMAGE_FORMAT без метаданных (EXIF, ICC,
+комментарии). Если Pillow собран без WebP, используется
+прогрессивный JPEG. Размеры результата пишутся в модель, а уже
+декодированные пиксели сразу идут на миниатюру (thumbnails.render).
+"""
+import os
+from collections import namedtuple
+from io import BytesIO
+
+from django.conf import settings
+from django.core.exceptions import ValidationError
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps, features
+
+ProcessedImage = namedtuple(
+    'ProcessedImage', ['file', 'width', 'height', 'image']
+)
+
+EXTENSIONS = {'JPEG': 'jpg', 'WEBP': 'webp'}
+INVALID_IMAGE = ValidationError(
+    'Загрузите правильное изображение. Файл, который вы загрузили, '
+    'поврежден или не является изображением.',
+    code='invalid_image',
+)
+
+
+def output_format():
+    """Формат хранения: WEBP только если Pillow умеет его писать."""
+    image_format = settings.POST_IMAGE_FORMAT.upper()
+    if image_format == 'WEBP' and not features.check('webp'):
+        return 'JPEG'
+    return image_format
+
+
+def _has_alpha(image):
+    return image.mode in ('RGBA', 'LA', 'PA') or (
+        image.mode == 'P' and 'transparency' in image.info
+    )
+
+
+def _flatten(image, image_format):
+    """Привести к RGB; прозрачность JPEG заливается белым."""
+    if not _has_alpha(image):
+        return image.convert('RGB')
+    image = image.convert('RGBA')
+    if image_format == 'WEBP':
+        return image
+    background = Image.new('RGB', image.size, 'white')
+    background.paste(image, mask=image.getchannel('A'))
+    return background
+
+
+def _encode(image, image_format):
+    buffer = BytesIO()
+    quality = settings.POST_IMAGE_QUALITY
+    if image_format == 'WEBP':
+        image.save(buffer, 'WEBP', quality=quality, method=6)
+    else:
+        image.save(buffer, 'JPEG', quality=quality, optimize=True,
+                   progressive=True)
+    return buffer.getvalue()
+
+
+def process(upload):
+    """Проверить, уменьшить и перекодировать загруженный файл.
+
+    Ошибки формата и слишком большие картинки дают ValidationError.
+    """
+    upload.seek(0)
+    try:
+        image = Image.open(upload)
+        if image.width * image.height > settings.POST_IMAGE_MAX_PIXELS:
+            raise ValidationError(
+                'Слишком большое изображение: не больше %(limit)s '
+                'мегапикселей.',
+                code='image_too_large',
+                params={'limit': settings.POST_IMAGE_MAX_PIXELS // 10 ** 6},
+            )
+        # Для анимации берётся первый кадр.
+        image.load()
+    except (OSError, SyntaxError, Image.DecompressionBombError):
+        raise INVALID_IMAGE
+    image_format = output_format()
+    image = _flatten(ImageOps.exif_transpose(image), image_format)
+    limit = settings.POST_IMAGE_MAX_SIZE
+    image.thumbnail((limit, limit), Image.LANCZOS)
+    stem, _ = os.path.splitext(os.path.basename(upload.name))
+    content = ContentFile(
+        _encode(image, image_format),
+        name=f'{stem}.{EXTENSIONS[image_format]}',
+    )
+    return ProcessedImage(content, image.width, image.height, image)
@@ -0,0 +1,376 @@
+"""Массовая загрузка постов, комментариев и подписок.
+
+Формат — тот же, что у posts.export: JSON Lines с полем model или
+CSV одного вида записей. Авторы и группы ищутся по словарям в памяти
+(имя пользователя и slug -> id), недостающие создаются пачкой. Записи
+вставляются bulk_create пачками, каждая в своей транзакции, мимо
+сигналов; вторичные индексы пустых таблиц на время загрузки снимаются.
+Ленты, счётчики, поисковый индекс и версии кэша затронутых записей
+пересобираются один раз в конце (rebuild()), даже если загрузка
+оборвалась на середине.
+"""
+import csv
+import json
+import time
+from collections import Counter, defaultdict
+from contextlib import contextmanager
+
+from django.db import connection, transaction
+from django.db.models import Max
+from django.utils import timezone
+from django.utils.dateparse import parse_datetime
+
+from . import caching, feed, search, stats
+from .export import EXPORTS
+from .models import Comment, Follow, Group, Post, User
+
+IMPORT_BATCH_SIZE = 1000
+# Порядок сброса буферов: комментарии ссылаются на посты.
+FLUSH_ORDER = ('post', 'comment', 'follow')
+
+
+def read_jsonl(lines):
+    for line in lines:
+        if line.strip():
+            row = json.loads(line)
+            yield row.pop('model'), row
+
+
+def read_csv(lines, kind):
+    for row in csv.DictReader(lines):
+        yield kind, row
+
+
+def _int(value):
+    return int(value) if value not in (None, '') else None
+
+
+def _datetime(value):
+    if not value:
+        return timezone.now()
+    moment = parse_datetime(value)
+    if moment is None:
+        raise ValueError(f'Не дата: {value}')
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+@contextmanager
+def keep_timestamps(*fields):
+    """Не подменять даты из файла текущим временем (auto_now_add).
+
+    Меняет поле модели на время загрузки, поэтому годится только для
+    отдельного процесса команды, а не для работающего сайта.
+    """
+    saved = [field.auto_now_add for field in fields]
+    for field in fields:
+        field.auto_now_add = False
+    try:
+        yield
+    finally:
+        for field, value in zip(fields, saved):
+            field.auto_now_add = value
+
+
+def missing_indexes(model):
+    """Индексы Meta.indexes, которых нет в схеме базы."""
+    with connection.cursor() as cursor:
+        existing = connection.introspection.get_constraints(
+            cursor, model._meta.db_table
+        )
+    return [
+        index for index in model._meta.indexes
+        if index.name not in existing
+    ]
+
+
+def restore_indexes(*models):
+    """Построить недостающие индексы; упасть, если какой-то не появился."""
+    with connection.schema_editor() as editor:
+        for model in models:
+            for index in missing_indexes(model):
+                editor.add_index(model, index)
+    missing = [
+        index.name for model in models for index in missing_indexes(model)
+    ]
+    if missing:
+        raise RuntimeError(f'Не построены индексы: {", ".join(missing)}')
+
+
+@contextmanager
+def deferred_indexes(*models):
+    """Снять индексы Meta.indexes пустых таблиц и построить после загрузки.
+
+    Один проход CREATE INDEX по готовой таблице дешевле, чем
+    поддержка индекса на каждой вставленной строке. С заполненных
+    таблиц индексы не снимаются: запросы сайта без них не останутся.
+    Индексы, потерянные оборванной прошлой загрузкой, достраиваются
+    при входе. Внутри внешней транзакции DDL на SQLite недоступен —
+    тогда индексы остаются.
+    """
+    if connection.in_atomic_block or not models:
+        yield
+        return
+    restore_indexes(*models)
+    empty = [model for model in models if not model.objects.exists()]
+    with connection.schema_editor() as editor:
+        for model in empty:
+            for index in model._meta.indexes:
+                editor.remove_index(model, index)
+    try:
+        yield
+    finally:
+        restore_indexes(*empty)
+
+
+def lock_table(model):
+    """Закрыть таблицу модели для чужих вставок до конца транзакции.
+
+    На SQLite первая запись берёт блокировку базы на запись: чтение
+    Max(id) после неё не устареет до коммита пачки.
+    """
+    table = connection.ops.quote_name(model._meta.db_table)
+    with connection.cursor() as cursor:
+        if connection.vendor == 'postgresql':
+            cursor.execute(f'LOCK TABLE {table} IN SHARE ROW EXCLUSIVE MODE')
+        else:
+            cursor.execute(f'UPDATE {table} SET id = id WHERE 0')
+
+
+class Importer:
+    """Накопитель записей: add() по одной, вставка пачками."""
+
+    def __init__(self, batch_size=IMPORT_BATCH_SIZE, keep_ids=False):
+        self.batch_size = batch_size
+        self.keep_ids = keep_ids
+        self.users = {}
+        self.groups = {}
+        # id поста в файле -> id в базе, для ссылок из комментариев.
+        self.posts = {}
+        # id постов из файла, пропущенных из-за занятого id: ссылки на
+        # них не должны уйти к чужому посту с тем же id.
+        self.collided = set()
+        self.buffers = defaultdict(list)
+        self.imported = Counter()
+        self.skipped = Counter()
+        self.touched = defaultdict(set)
+        # Секунды на вставку и на пересборку производных данных.
+        self.timings = Counter()
+
+    def add(self, kind, row):
+        if kind not in EXPORTS:
+            raise ValueError(f'Неизвестный вид записи: {kind}')
+        self.buffers[kind].append(row)
+        if len(self.buffers[kind]) >= self.batch_size:
+            self.flush(kind)
+
+    def flush(self, kind=None):
+        """Вставить накопленное; комментарии — после своих постов."""
+        for name in FLUSH_ORDER:
+            rows = self.buffers.pop(name, None)
+            if rows:
+                with transaction.atomic():
+                    getattr(self, f'_insert_{name}s')(rows)
+            if name == kind:
+                break
+
+    def rebuild(self):
+        """Пересобрать производные данные затронутых записей.
+
+        Счётчики пересчитываются для затронутых пользователей и постов,
+        ленты — для авторов новых постов и подписок, в поиск попадают
+        только новые посты. Версии кэша их страниц сбрасываются.
+        """
+        for users in self._chunks(self.touched['user']):
+            stats.recount(
+                User.objects.filter(pk__in=users), Post.objects.none()
+            )
+        for posts in self._chunks(self.touched['post']):
+            stats.recount(
+                User.objects.none(), Post.objects.filter(pk__in=posts)
+            )
+        for authors in self._chunks(self.touched['author']):
+            feed.rebuild_authors(authors)
+        for posts in self._chunks(self.touched['new_post']):
+            search.index_posts(Post.objects.filter(pk__in=posts))
+        scopes = [caching.FEED_SCOPE, caching.GROUPS_SCOPE]
+        scopes += [caching.profile_scope(pk) for pk in self.touched['author']]
+        scopes += [caching.stats_scope(pk) for pk in self.touched['user']]
+        scopes += [caching.group_scope(pk) for pk in self.touched['group']]
+        scopes += [caching.follow_scope(pk) for pk in self.touched['reader']]
+        scopes += [caching.post_scope(pk) for pk in self.touched['post']]
+        caching.bump(*scopes)
+
+    def _chunks(self, ids):
+        ids = sorted(ids)
+        for start in range(0, len(ids), self.batch_size):
+            yield ids[start:start + self.batch_size]
+
+    def _resolve(self, mapping, model, field, values, defaults):
+        """id по естественным ключам; недостающие записи создаются."""
+        missing = {value for value in values if value} - set(mapping)
+        if not missing:
+            return
+        lookup = {f'{field}__in': missing}
+
+        def load():
+            mapping.update(
+                model.objects.filter(**lookup).values_list(field, 'pk')
+            )
+        load()
+        created = missing - set(mapping)
+        if created:
+            model.objects.bulk_create(
+                (model(**{field: value, **defaults(value)})
+                 for value in created),
+                batch_size=self.batch_size,
+            )
+            load()
+
+    def _users(self, rows, *columns):
+        self._resolve(
+            self.users, User, 'username',
+            {row[column] for row in rows for column in columns},
+            lambda username: {'password': '!'},
+        )
+
+    def _ids(self, model, kind, rows):
+        """Строки пачки и их id: из файла или подряд после последнего.
+
+        Таблица блокируется, поэтому записи, созданные сайтом во время
+        загрузки, не столкнутся с пачкой по id. С --keep-ids строки с
+        уже занятым id пропускаются.
+        """
+        lock_table(model)
+        if not self.keep_ids:
+            start = (
+                model.objects.aggregate(last=Max('pk'))['last'] or 0
+            ) + 1
+            return rows, list(range(start, start + len(rows)))
+        ids = [_int(row['id']) for row in rows]
+        taken = set(model.objects.filter(pk__in=ids).values_list(
+            'pk', flat=True
+        ))
+        accepted = []
+        for row, pk in zip(rows, ids):
+            if pk in taken:
+                self.skipped[kind] += 1
+                if kind == 'post':
+                    self.collided.add(pk)
+                continue
+            # Повтор id внутри файла тоже занят.
+            taken.add(pk)
+            accepted.append((row, pk))
+        return [row for row, _ in accepted], [pk for _, pk in accepted]
+
+    def _insert_posts(self, rows):
+        self._users(rows, 'author')
+        self._resolve(
+            self.groups, Group, 'slug', {row.get('group') for row in rows},
+            lambda slug: {'title': slug, 'description': ''},
+        )
+        posts = []
+        for row, pk in zip(*self._ids(Post, 'post', rows)):
+            post = Post(
+                pk=pk,
+                text=row['text'],
+                pub_date=_datetime(row.get('pub_date')),
+                author_id=self.users[row['author']],
+                group_id=self.groups.get(row.get('group') or None),
+                image=row.get('image') or '',
+            )
+            if row.get('id') not in (None, ''):
+                self.posts[_int(row['id'])] = pk
+            self.touched['author'].add(post.author_id)
+            self.touched['user'].add(post.author_id)
+            if post.group_id:
+                self.touched['group'].add(post.group_id)
+            self.touched['post'].add(pk)
+            self.touched['new_post'].add(pk)
+            posts.append(post)
+        Post.objects.bulk_create(posts)
+        self.imported['post'] += len(posts)
+
+    def _known_posts(self, rows):
+        """Ссылки комментариев на посты -> id постов в базе."""
+        known = dict(self.posts)
+        if self.keep_ids:
+            # Пост мог прийти прошлой загрузкой: он уже в базе под тем же id.
+            referenced = (
+                {_int(row['post']) for row in rows}
+                - set(known) - self.collided
+            )
+            known.update(
+                (pk, pk) for pk in Post.objects.filter(
+                    pk__in=referenced
+                ).values_list('pk', flat=True)
+            )
+        return known
+
+    def _insert_comments(self, rows):
+        known = self._known_posts(rows)
+        accepted = [row for row in rows if _int(row['post']) in known]
+        self.skipped['comment'] += len(rows) - len(accepted)
+        accepted, ids = self._ids(Comment, 'comment', accepted)
+        self._users(accepted, 'author')
+        comments = [
+            Comment(
+                pk=pk,
+                post_id=known[_int(row['post'])],
+                author_id=self.users[row['author']],
+                text=row['text'],
+                created=_datetime(row.get('created')),
+            )
+            for row, pk in zip(accepted, ids)
+        ]
+        for comment in comments:
+            self.touched['user'].add(comment.author_id)
+            self.touched['post'].add(comment.post_id)
+        Comment.objects.bulk_create(comments)
+        self.imported['comment'] += len(comments)
+
+    def _insert_follows(self, rows):
+        self._users(rows, 'user', 'author')
+        follows = [
+            Follow(
+                user_id=self.users[row['user']],
+                author_id=self.users[row['author']],
+                pub_date=_datetime(row.get('created')),
+            )
+            for row in rows if row['user'] != row['author']
+        ]
+        self.skipped['follow'] += len(rows) - len(follows)
+        for follow in follows:
+            self.touched['user'].update((follow.user_id, follow.author_id))
+            self.touched['reader'].add(follow.user_id)
+            self.touched['author'].add(follow.author_id)
+        # Повторная подписка упрётся в unique_author_user и пропустится.
+        Follow.objects.bulk_create(follows, ignore_conflicts=True)
+        self.imported['follow'] += len(follows)
+
+
+def import_records(records, batch_size=IMPORT_BATCH_SIZE, keep_ids=False,
+                   defer_indexes=True):
+    """Загрузить пары (вид, строка); вернуть Importer со счётчиками."""
+    importer = Importer(batch_size, keep_ids)
+    indexes = (Post, Comment, Follow) if defer_indexes else ()
+    timestamps = (
+        Post._meta.get_field('pub_date'),
+        Comment._meta.get_field('created'),
+        Follow._meta.get_field('pub_date'),
+    )
+    started = time.perf_counter()
+    try:
+        with keep_timestamps(*timestamps), deferred_indexes(*indexes):
+            for kind, row in records:
+                importer.add(kind, row)
+            importer.flush()
+    finally:
+        loaded = time.perf_counter()
+        importer.timings['load'] = loaded - started
+        # Вставленные пачки уже зафиксированы: ленты и счётчики должны
+        # их учесть и при ошибке в середине файла.
+        importer.rebuild()
+        importer.timings['rebuild'] = time.perf_counter() - loaded
+    return importer
@@ -0,0 +1,382 @@
+"""Живая лента: новые посты приходят открытой странице через SSE.
+
+После фиксации нового поста его карточка публикуется в каналы общей
+ленты, группы и автора. Страница держит поток text/event-stream и
+вставляет присланные карточки сверху, вместо того чтобы заново
+запрашивать и собирать всю ленту. Лента подписок слушает каналы
+авторов из подписок, поэтому публикация не обходит подписчиков.
+
+Шина живёт в памяти процесса. Чтобы событие дошло до клиентов других
+воркеров, заместитель доставки кладёт его в общий кэш, а каждый
+процесс раз в LIVE_POLL_INTERVAL секунд забирает чужие события.
+Под WSGI поток держит поток сервера, поэтому закрывается через
+LIVE_WSGI_LIFETIME секунд, а браузер переподключается сам; под ASGI
+(core.asgi) он занимает только цикл событий. Без LIVE_ENABLED страницы
+не открывают поток, а адреса потоков отвечают 404.
+"""
+import asyncio
+import json
+import logging
+import threading
+import time
+import uuid
+from collections import defaultdict, deque
+from http.cookies import SimpleCookie
+from importlib import import_module
+
+from django.conf import settings
+from django.contrib.auth import get_user
+from django.core.cache import caches
+from django.core.exceptions import PermissionDenied
+from django.db import close_old_connections
+from django.http import Http404, HttpRequest
+from django.shortcuts import get_object_or_404
+
+from .articles import render_articles
+from .models import Follow, Group
+from .selectors import feed_posts
+
+logger = logging.getLogger(__name__)
+
+FEED_CHANNEL = 'feed'
+RELAY_SEQUENCE_KEY = 'posts:live:sequence'
+RELAY_EVENT_KEY = 'posts:live:event:{}'
+# Метка процесса: свои события из общего кэша не доставляются дважды.
+ORIGIN = uuid.uuid4().hex
+# Через сколько миллисекунд браузеру переподключаться после обрыва.
+RETRY_MS = 3000
+
+
+def group_channel(group_id):
+    return f'group:{group_id}'
+
+
+def author_channel(author_id):
+    return f'author:{author_id}'
+
+
+class Subscription:
+    """Очередь событий одного клиента.
+
+    Читать можно из потока (get) или из цикла событий (aget). Медленный
+    клиент теряет самые старые события, а не копит их без предела.
+    """
+
+    def __init__(self, bus, channels):
+        self.bus = bus
+        self.channels = frozenset(channels)
+        self.events = deque(maxlen=settings.LIVE_QUEUE_SIZE)
+        self.condition = threading.Condition()
+        self.loop = None
+        self.wakeup = None
+
+    def push(self, event):
+        with self.condition:
+            self.events.append(event)
+            self.condition.notify_all()
+            if self.loop is not None:
+                self.loop.call_soon_threadsafe(self.wakeup.set)
+
+    def _pop(self):
+        with self.condition:
+            return self.events.popleft() if self.events else None
+
+    def get(self, timeout):
+        """Следующее событие или None, если за timeout ничего не пришло."""
+        with self.condition:
+            self.condition.wait_for(lambda: self.events, timeout)
+            return self.events.popleft() if self.events else None
+
+    async def aget(self, timeout):
+        if self.loop is None:
+            self.loop = asyncio.get_running_loop()
+            self.wakeup = asyncio.Event()
+        # Сброс до проверки очереди: push между ними не потеряется.
+        self.wakeup.clear()
+        event = self._pop()
+        if event is not None:
+            return event
+        try:
+            await asyncio.wait_for(self.wakeup.wait(), timeout)
+        except asyncio.TimeoutError:
+            return None
+        return self._pop()
+
+    def close(self):
+        self.bus.unsubscribe(self)
+
+
+class Bus:
+    """Публикация и подписка внутри процесса."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.subscriptions = defaultdict(set)
+
+    def subscribe(self, channels):
+        subscription = Subscription(self, channels)
+        with self.lock:
+            for channel in subscription.channels:
+                self.subscriptions[channel].add(subscription)
+        if settings.LIVE_STAND_IN:
+            relay.start()
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self.lock:
+            for channel in subscription.channels:
+                subscribers = self.subscriptions.get(channel)
+                if subscribers is not None:
+                    subscribers.discard(subscription)
+                    if not subscribers:
+                        del self.subscriptions[channel]
+
+    def deliver(self, messages):
+        """Разослать пары (канал, событие) подписчикам процесса.
+
+        Клиент, подписанный на несколько каналов сразу, получает пост
+        один раз.
+        """
+        with self.lock:
+            targets = {}
+            for channel, event in messages:
+                for subscription in self.subscriptions.get(channel, ()):
+                    targets.setdefault(subscription, event)
+        for subscription, event in targets.items():
+            subscription.push(event)
+        return len(targets)
+
+    def publish(self, messages):
+        messages = list(messages)
+        delivered = self.deliver(messages)
+        if settings.LIVE_STAND_IN:
+            relay.store(messages)
+        return delivered
+
+
+class Relay:
+    """Заместитель доставки между процессами через общий кэш."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.thread = None
+        self.seen = None
+        # Номер события -> когда его увидели: store() увеличивает
+        # счётчик раньше, чем пишет событие, и опрос между ними не
+        # должен потерять номер.
+        self.pending = {}
+
+    @property
+    def cache(self):
+        return caches[settings.LIVE_RELAY_CACHE]
+
+    def store(self, messages):
+        cache = self.cache
+        cache.add(RELAY_SEQUENCE_KEY, 0, timeout=None)
+        sequence = cache.incr(RELAY_SEQUENCE_KEY)
+        cache.set(
+            RELAY_EVENT_KEY.format(sequence), (ORIGIN, messages),
+            timeout=settings.LIVE_EVENT_TIMEOUT,
+        )
+
+    def poll(self):
+        """Доставить события других процессов; вернуть их число.
+
+        Номер без события остаётся в ожидании до LIVE_EVENT_TIMEOUT:
+        событие ещё может дописываться.
+        """
+        current = self.cache.get(RELAY_SEQUENCE_KEY, 0)
+        if self.seen is None or current < self.seen:
+            # Первый опрос или кэш очищен: прошлое не досылается.
+            self.seen = current
+            self.pending = {}
+            return 0
+        now = time.monotonic()
+        for sequence in range(self.seen + 1, current + 1):
+            self.pending[sequence] = now
+        self.seen = current
+        if not self.pending:
+            return 0
+        keys = {
+            RELAY_EVENT_KEY.format(sequence): sequence
+            for sequence in self.pending
+        }
+        found = self.cache.get_many(list(keys))
+        delivered = 0
+        for key in sorted(found, key=keys.get):
+            del self.pending[keys[key]]
+            origin, messages = found[key]
+            if origin != ORIGIN:
+                delivered += bus.deliver(messages)
+        deadline = now - settings.LIVE_EVENT_TIMEOUT
+        self.pending = {
+            sequence: seen for sequence, seen in self.pending.items()
+            if seen > deadline
+        }
+        return delivered
+
+    def start(self):
+        with self.lock:
+            if self.thread is not None:
+                return
+            self.poll()
+            self.thread = threading.Thread(
+                target=self.run, name='live-relay', daemon=True,
+            )
+            self.thread.start()
+
+    def run(self):
+        while True:
+            time.sleep(settings.LIVE_POLL_INTERVAL)
+            try:
+                self.poll()
+            except Exception:
+                logger.warning('Не удалось забрать события живой ленты',
+                               exc_info=True)
+
+
+bus = Bus()
+relay = Relay()
+
+
+def publish_post(post_id):
+    """Разослать карточку нового поста в каналы ленты, группы и автора."""
+    post = feed_posts().filter(pk=post_id).first()
+    if post is None:
+        return 0
+    feed_html, = render_articles([post])
+    event = {'id': post.pk, 'html': feed_html}
+    messages = [
+        (FEED_CHANNEL, event),
+        (author_channel(post.author_id), event),
+    ]
+    if post.group_id:
+        group_html, = render_articles([post], without_group_links=True)
+        messages.append(
+            (group_channel(post.group_id), {'id': post.pk, 'html': group_html})
+        )
+    return bus.publish(messages)
+
+
+def page_channels(user, kind, slug=None):
+    """Каналы, которые слушает страница: index, group или follow."""
+    if kind == 'index':
+        return [FEED_CHANNEL]
+    if kind == 'group':
+        group = get_object_or_404(Group, slug=slug)
+        return [group_channel(group.pk)]
+    if kind == 'follow':
+        if user is None or not user.is_authenticated:
+            raise PermissionDenied
+        return [
+            author_channel(author_id)
+            for author_id in Follow.objects.filter(user=user).values_list(
+                'author_id', flat=True
+            )
+        ]
+    raise Http404
+
+
+def encode_event(event):
+    data = json.dumps(event, ensure_ascii=False)
+    return f'id: {event["id"]}\nevent: post\ndata: {data}\n\n'.encode()
+
+
+HEARTBEAT = b': ping\n\n'
+
+
+def stream(channels):
+    """Тело ответа SSE для WSGI: события и пустые комментарии.
+
+    Подписка заводится на первом куске: ответ, который так и не начали
+    читать, не оставляет её в шине. Через LIVE_WSGI_LIFETIME секунд
+    поток заканчивается и отпускает поток сервера.
+    """
+    subscription = bus.subscribe(channels)
+    deadline = time.monotonic() + settings.LIVE_WSGI_LIFETIME
+    try:
+        yield f'retry: {RETRY_MS}\n\n'.encode()
+        while True:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            event = subscription.get(min(settings.LIVE_HEARTBEAT, remaining))
+            yield HEARTBEAT if event is None else encode_event(event)
+    finally:
+        subscription.close()
+
+
+SSE_HEADERS = [
+    (b'content-type', b'text/event-stream; charset=utf-8'),
+    (b'cache-control', b'no-cache'),
+    # nginx не должен копить поток в буфере.
+    (b'x-accel-buffering', b'no'),
+]
+
+
+def _scope_user(scope):
+    """Пользователь по cookie сессии из ASGI scope; None — аноним.
+
+    Как и AuthenticationMiddleware, идёт через auth.get_user(): сессия
+    после смены пароля и неактивный пользователь не проходят.
+    """
+    cookies = SimpleCookie()
+    for name, value in scope.get('headers', []):
+        if name == b'cookie':
+            cookies.load(value.decode('latin-1'))
+    morsel = cookies.get(settings.SESSION_COOKIE_NAME)
+    if morsel is None:
+        return None
+    request = HttpRequest()
+    engine = import_module(settings.SESSION_ENGINE)
+    request.session = engine.SessionStore(morsel.value)
+    return get_user(request)
+
+
+def _scope_channels(scope, kind, slug):
+    try:
+        return page_channels(_scope_user(scope), kind, slug)
+    finally:
+        close_old_connections()
+
+
+async def asgi_stream(scope, receive, send, kind, slug=None):
+    """Тот же поток SSE, но в цикле событий, без потока на клиента."""
+    loop = asyncio.get_running_loop()
+    try:
+        if not settings.LIVE_ENABLED:
+            raise Http404
+        channels = await loop.run_in_executor(
+            None, _scope_channels, scope, kind, slug
+        )
+    except (Http404, PermissionDenied) as error:
+        status = 404 if isinstance(error, Http404) else 403
+        await send({'type': 'http.response.start', 'status': status,
+                    'headers': []})
+        await send({'type': 'http.response.body', 'body': b''})
+        return
+    subscription = bus.subscribe(channels)
+    disconnected = loop.create_task(_wait_disconnect(receive))
+    try:
+        await send({'type': 'http.response.start', 'status': 200,
+                    'headers': SSE_HEADERS})
+        await send({'type': 'http.response.body',
+                    'body': f'retry: {RETRY_MS}\n\n'.encode(),
+                    'more_body': True})
+        while not disconnected.done():
+            event = await subscription.aget(settings.LIVE_HEARTBEAT)
+            await send({
+                'type': 'http.response.body',
+                'body': HEARTBEAT if event is None else encode_event(event),
+                'more_body': True,
+            })
+    except (ConnectionError, OSError):
+        pass
+    finally:
+        disconnected.cancel()
+        subscription.close()
+
+
+async def _wait_disconnect(receive):
+    while (await receive())['type'] != 'http.disconnect':
+        pass
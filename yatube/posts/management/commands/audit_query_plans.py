@@ -0,0 +1,183 @@
+import re
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+
+from core.db import scratch_database
+from posts.constants import (
+    COMMENT_ORDERINGS, COMMENTS_ON_PAGE, CURSOR_FORWARD,
+    FEED_ENTRY_ORDERING, FEED_ORDERING, POST_ON_PEGE, SEARCH_ORDERING,
+)
+from posts.feed import follow_entries, follow_sources, pulled_authors_query
+from posts.models import Follow, Group, Post
+from posts.search import search
+from posts.seed import seed
+from posts.selectors import (
+    feed_posts, group_posts, index_posts, post_comments, profile_posts,
+)
+from posts.utils import CursorPaginator, MergedCursorPaginator
+
+# Признаки плохого плана: полный просмотр таблицы и сортировка
+# во временном B-дереве (SQLite) или Seq Scan и Sort (PostgreSQL).
+# Просмотр виртуальной таблицы FTS5 идёт по её собственному индексу.
+BAD_PLAN_PATTERNS = {
+    'sqlite': {
+        'scan': re.compile(
+            r'\bSCAN\b(?!.*\bUSING\b.*\bINDEX\b)(?!.*\bVIRTUAL TABLE\b)'
+        ),
+        'sort': re.compile(r'TEMP B-TREE'),
+    },
+    'postgresql': {
+        'scan': re.compile(r'Seq Scan'),
+        'sort': re.compile(r'^\s*(->\s*)?Sort\b'),
+    },
+}
+# Сколько авторов из подписок читателя считать подмешиваемыми при
+# проверке плана ленты без раздачи.
+PULLED_SAMPLE = 3
+
+
+class Command(BaseCommand):
+    help = (
+        'Наполняет отдельную базу тестовыми данными и проверяет планы '
+        'запросов страниц posts.views.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--users', type=int, default=200)
+        parser.add_argument('--groups', type=int, default=10)
+        parser.add_argument('--posts', type=int, default=5000)
+        parser.add_argument('--comments', type=int, default=5000)
+        parser.add_argument('--follows', type=int, default=2000)
+
+    def handle(self, *args, **options):
+        patterns = BAD_PLAN_PATTERNS.get(connection.vendor)
+        if patterns is None:
+            raise CommandError(
+                f'Разбор планов для {connection.vendor} не поддерживается.'
+            )
+        # Рабочая база не блокируется на время наполнения, а версии
+        # фрагментов в общем кэше не сбрасываются.
+        with scratch_database(), transaction.atomic():
+            seed(
+                users=options['users'],
+                groups=options['groups'],
+                posts=options['posts'],
+                comments=options['comments'],
+                follows=options['follows'],
+                bump_versions=False,
+            )
+            if connection.vendor == 'sqlite':
+                with connection.cursor() as cursor:
+                    cursor.execute('ANALYZE')
+            failures = self.audit(patterns)
+            transaction.set_rollback(True)
+        if failures:
+            raise CommandError(
+                'Плохие планы запросов: ' + ', '.join(failures)
+            )
+        self.stdout.write(self.style.SUCCESS('Все планы используют индексы.'))
+
+    def audit(self, patterns):
+        failures = []
+        for name, queryset, allowed in self.get_querysets():
+            plan = queryset.explain()
+            checks = [
+                pattern for kind, pattern in patterns.items()
+                if kind not in allowed
+            ]
+            bad = [
+                line for line in plan.splitlines()
+                if any(pattern.search(line) for pattern in checks)
+            ]
+            status = self.style.ERROR('FAIL') if bad else 'ok'
+            self.stdout.write(f'[{status}] {name}')
+            for line in plan.splitlines():
+                self.stdout.write(f'    {line}')
+            if bad:
+                failures.append(name)
+        return failures
+
+    @staticmethod
+    def pages(name, paginator, offset):
+        """Первая страница и страница после строки с номером offset."""
+        yield name, paginator.window_queryset(), ()
+        middle = paginator.object_list[offset:][:1]
+        if middle:
+            paginator.direction, paginator.position = paginator.decode(
+                paginator.encode(CURSOR_FORWARD, middle[0])
+            )
+            yield f'{name} (курсор)', paginator.window_queryset(), ()
+
+    def get_querysets(self):
+        """Запросы, которые строят страницы, на первой и дальней странице.
+
+        Тройки (имя, запрос, допустимые признаки): поиск сортирует
+        найденные посты по рангу, индексом такой порядок не задать.
+        Без подписок (--follows 0) планы ленты подписок и кнопки
+        «Подписаться» проверить не на чем: они пропускаются.
+        """
+        follow = Follow.objects.order_by('?').first()
+        group = Group.objects.filter(posts__isnull=False).first()
+        post = Post.objects.order_by('-comment_count').first()
+        if follow is None:
+            self.stdout.write(self.style.WARNING(
+                'Нет подписок: планы follow_index и profile following '
+                'пропущены.'
+            ))
+            author = post.author
+        else:
+            author = follow.author
+        feeds = {
+            'index': (index_posts(), FEED_ORDERING, POST_ON_PEGE),
+            'group_list': (group_posts(group), FEED_ORDERING, POST_ON_PEGE),
+            'profile': (profile_posts(author), FEED_ORDERING, POST_ON_PEGE),
+        }
+        if follow is not None:
+            feeds['follow_index'] = (
+                follow_entries(follow.user), FEED_ENTRY_ORDERING,
+                POST_ON_PEGE,
+            )
+        for order, ordering in COMMENT_ORDERINGS.items():
+            feeds[f'comment_list ({order})'] = (
+                post_comments(post), ordering, COMMENTS_ON_PAGE
+            )
+        for name, (queryset, ordering, per_page) in feeds.items():
+            yield from self.pages(
+                name,
+                CursorPaginator(queryset, per_page, ordering=ordering),
+                per_page * 3,
+            )
+        yield 'post_detail', index_posts().filter(pk=post.pk), ()
+        word = post.text.split()[0]
+        yield 'post_search', search(word, feed_posts()).order_by(
+            *SEARCH_ORDERING
+        )[:POST_ON_PEGE + 1], ('sort',)
+        if follow is None:
+            return
+        yield from self.follow_querysets(follow)
+
+    def follow_querysets(self, follow):
+        """Планы ленты подписок с авторами без раздачи и кнопки подписки."""
+        yield 'get_pulled_authors', pulled_authors_query(follow.user), ()
+        pulled = list(Follow.objects.filter(user=follow.user_id).values_list(
+            'author_id', flat=True
+        )[:PULLED_SAMPLE])
+        paginator = MergedCursorPaginator(
+            feed_posts().none(), POST_ON_PEGE,
+            follow_sources(follow.user, pulled), ordering=FEED_ORDERING,
+        )
+        for number, queryset in enumerate(paginator.window_querysets()):
+            yield f'follow_index pull [{number}]', queryset, ()
+        middle = feed_posts().filter(author_id__in=pulled).order_by(
+            *FEED_ORDERING
+        )[POST_ON_PEGE * 3:][:1]
+        if middle:
+            paginator.position = paginator.decode(
+                paginator.encode(CURSOR_FORWARD, middle[0])
+            )[1]
+            for number, queryset in enumerate(paginator.window_querysets()):
+                yield f'follow_index pull [{number}] (курсор)', queryset, ()
+        yield 'profile following', Follow.objects.filter(
+            author=follow.author_id, user=follow.user_id
+        ), ()
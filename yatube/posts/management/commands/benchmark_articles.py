@@ -0,0 +1,80 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.template import engines
+from django.utils import timezone
+
+from posts.articles import render_articles
+from posts.constants import POST_ON_PEGE
+from posts.models import Group, Post, User
+
+INCLUDE_LOOP = (
+    "{% for post in posts %}"
+    "{% include 'posts/includes/article.html' %}"
+    "{% if not forloop.last %}<hr>{% endif %}"
+    "{% endfor %}"
+)
+
+
+def sample_posts(count):
+    """Посты страницы в памяти: замер не зависит от базы."""
+    group = Group(pk=1, title='Группа', slug='benchmark')
+    now = timezone.now()
+    return [
+        Post(
+            pk=number + 1,
+            text='Абзац поста.\n\nЕщё один абзац поста. ' * 5,
+            author=User(pk=number % 3 + 1, username=f'author{number % 3}'),
+            group=group,
+            pub_date=now,
+            comment_count=number,
+        )
+        for number in range(count)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Сравнивает вывод страницы постов циклом с include '
+        'posts/includes/article.html и тегом render_articles, который '
+        'берёт готовые карточки из кэша.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--posts', type=int, default=POST_ON_PEGE)
+        parser.add_argument('--iterations', type=int, default=200)
+        parser.add_argument(
+            '--check', action='store_true',
+            help='Ошибка, если вывод из кэша не быстрее цикла с include.',
+        )
+
+    def handle(self, *args, **options):
+        posts = sample_posts(options['posts'])
+        template = engines['django'].from_string(INCLUDE_LOOP)
+
+        variants = {
+            'include': lambda: template.render({'posts': posts}),
+            'cached': lambda: '<hr>'.join(render_articles(posts)),
+        }
+        timings = {
+            name: self.measure(render, options['iterations'])
+            for name, render in variants.items()
+        }
+        base = timings['include']
+        self.stdout.write(f'{"renderer":<12}{"ms/page":>10}{"speedup":>10}')
+        for name, seconds in timings.items():
+            self.stdout.write(
+                f'{name:<12}{seconds * 1000:>10.3f}'
+                f'{base / seconds:>9.1f}x'
+            )
+        if options['check'] and timings['cached'] >= base:
+            raise CommandError('Вывод из кэша не быстрее цикла с include.')
+
+    @staticmethod
+    def measure(render, iterations):
+        # Первый вызов прогревает кэши шаблонов, ссылок и карточек.
+        render()
+        started = time.perf_counter()
+        for _ in range(iterations):
+            render()
+        return (time.perf_counter() - started) / iterations
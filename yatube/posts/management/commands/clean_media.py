@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from posts.media import sweep
+
+
+class Command(BaseCommand):
+    help = 'Удаляет файлы картинок, на которые не ссылается ни один пост.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS(
+            f'Удалено файлов без ссылок: {sweep()}'
+        ))
@@ -0,0 +1,75 @@
+import argparse
+from datetime import datetime, time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.utils import timezone
+from django.utils.dateparse import parse_date, parse_datetime
+
+from posts.export import (
+    EXPORT_CHUNK_SIZE, EXPORTS, FORMATS, csv_lines, jsonl_lines,
+)
+
+
+def since_type(value):
+    """Дата или дата и время в ISO 8601; без зоны — в TIME_ZONE."""
+    moment = parse_datetime(value)
+    if moment is None:
+        day = parse_date(value)
+        if day is None:
+            raise argparse.ArgumentTypeError(f'Не дата: {value}')
+        moment = datetime.combine(day, time.min)
+    if timezone.is_naive(moment):
+        moment = timezone.make_aware(moment)
+    return moment
+
+
+class Command(BaseCommand):
+    help = (
+        'Выгружает посты, комментарии и подписки в JSON Lines или CSV '
+        'потоком, не загружая таблицы в память.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=FORMATS, default='jsonl')
+        parser.add_argument(
+            '--models', nargs='+', choices=list(EXPORTS),
+            default=list(EXPORTS),
+            help='Что выгружать; для CSV — ровно один вид записей.',
+        )
+        parser.add_argument(
+            '--since', type=since_type,
+            help='Только записи новее этой даты (pub_date, created).',
+        )
+        parser.add_argument(
+            '--output', default='-',
+            help='Файл для выгрузки; по умолчанию stdout.',
+        )
+        parser.add_argument(
+            '--chunk-size', type=int, default=EXPORT_CHUNK_SIZE,
+        )
+
+    def handle(self, *args, **options):
+        kinds = options['models']
+        if options['format'] == 'csv':
+            if len(kinds) != 1:
+                raise CommandError('CSV выгружает один вид записей.')
+            lines = csv_lines(kinds[0], options['since'],
+                              chunk_size=options['chunk_size'])
+        else:
+            lines = jsonl_lines(kinds, options['since'],
+                                chunk_size=options['chunk_size'])
+        if options['output'] == '-':
+            self.write(lines, self.stdout)
+            return
+        with open(options['output'], 'w', encoding='utf-8',
+                  newline='') as output:
+            count = self.write(lines, output)
+        self.stdout.write(self.style.SUCCESS(f'Выгружено строк: {count}'))
+
+    @staticmethod
+    def write(lines, output):
+        count = 0
+        for line in lines:
+            output.write(line)
+            count += 1
+        return count
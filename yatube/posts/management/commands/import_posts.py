@@ -0,0 +1,93 @@
+import sys
+from contextlib import ExitStack
+
+from django.core.management.base import BaseCommand, CommandError
+
+from posts.export import EXPORTS, FORMATS
+from posts.imports import (
+    IMPORT_BATCH_SIZE, import_records, read_csv, read_jsonl,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Загружает посты, комментарии и подписки из JSON Lines или CSV '
+        '(формат export_posts) пачками через bulk_create.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'paths', nargs='+',
+            help='Файлы для загрузки; "-" — stdin.',
+        )
+        parser.add_argument(
+            '--format', choices=FORMATS,
+            help='По умолчанию — по расширению файла.',
+        )
+        parser.add_argument(
+            '--model', choices=list(EXPORTS),
+            help='Вид записей в CSV.',
+        )
+        parser.add_argument(
+            '--batch-size', type=int, default=IMPORT_BATCH_SIZE,
+        )
+        parser.add_argument(
+            '--keep-ids', action='store_true',
+            help='Сохранить id из файла; занятые id пропускаются.',
+        )
+        parser.add_argument(
+            '--keep-indexes', action='store_true',
+            help='Не снимать индексы на время загрузки.',
+        )
+
+    def handle(self, *args, **options):
+        if options['batch_size'] < 1:
+            raise CommandError('--batch-size должен быть больше нуля.')
+        if options['model'] is None and any(
+            self.format(path, options) == 'csv' for path in options['paths']
+        ):
+            raise CommandError('Для CSV нужен --model.')
+        with ExitStack() as stack:
+            importer = import_records(
+                self.records(stack, options),
+                batch_size=options['batch_size'],
+                keep_ids=options['keep_ids'],
+                defer_indexes=not options['keep_indexes'],
+            )
+        total = sum(importer.imported.values())
+        for kind in EXPORTS:
+            self.stdout.write(
+                f'{kind}: загружено {importer.imported[kind]}, '
+                f'пропущено {importer.skipped[kind]}'
+            )
+        # Пересборка считается отдельно: её время зависит от числа
+        # затронутых авторов и постов, а не от числа строк файла.
+        load, rebuild = importer.timings['load'], importer.timings['rebuild']
+        rebuilt = len(importer.touched['user']) + len(importer.touched['post'])
+        self.stdout.write(
+            f'Пересборка: {rebuilt} пользователей и постов за '
+            f'{rebuild:.2f} с ({rebuilt / max(rebuild, 1e-9):.0f} записей/с)'
+        )
+        self.stdout.write(self.style.SUCCESS(
+            f'Всего {total} строк за {load:.2f} с '
+            f'({total / max(load, 1e-9):.0f} строк/с)'
+        ))
+
+    def records(self, stack, options):
+        for path in options['paths']:
+            if path == '-':
+                file = sys.stdin
+            else:
+                file = stack.enter_context(
+                    open(path, encoding='utf-8', newline='')
+                )
+            if self.format(path, options) == 'csv':
+                yield from read_csv(file, options['model'])
+            else:
+                yield from read_jsonl(file)
+
+    @staticmethod
+    def format(path, options):
+        if options['format']:
+            return options['format']
+        return 'csv' if path.endswith('.csv') else 'jsonl'
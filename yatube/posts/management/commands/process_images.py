@@ -0,0 +1,48 @@
+from django.core.exceptions import ValidationError
+from django.core.management.base import BaseCommand
+
+from posts import caching, images, media, thumbnails
+from posts.models import Post
+
+
+class Command(BaseCommand):
+    help = ('Пропускает картинки, загруженные до обработки при загрузке, '
+            'через posts.images и записывает их размеры.')
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--keep-originals', action='store_true',
+            help='Не удалять исходные файлы.',
+        )
+
+    def handle(self, *args, **options):
+        posts = Post.objects.exclude(image='').filter(
+            image_width__isnull=True
+        ).only('image', 'author_id', 'group_id')
+        done = failed = 0
+        for post in posts.iterator():
+            original = post.image.name
+            try:
+                with post.image.storage.open(original) as source:
+                    processed = images.process(source)
+            except (OSError, ValidationError) as error:
+                self.stderr.write(f'{original}: {error}')
+                failed += 1
+                continue
+            name = post.image.field.generate_filename(
+                post, processed.file.name
+            )
+            name = post.image.storage.save(name, processed.file)
+            Post.objects.filter(pk=post.pk).update(
+                image=name, image_width=processed.width,
+                image_height=processed.height,
+            )
+            thumbnails.render(name, processed.image)
+            caching.bump_post(post.pk, post.author_id, post.group_id)
+            if not options['keep_originals']:
+                # Исходник мог быть общим с другими постами.
+                media.release(original)
+            done += 1
+        self.stdout.write(self.style.SUCCESS(
+            f'Обработано картинок: {done}, ошибок: {failed}'
+        ))
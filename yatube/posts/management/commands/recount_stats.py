@@ -0,0 +1,15 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from posts.stats import recount_all
+
+
+class Command(BaseCommand):
+    help = 'Пересчитывает счётчики постов, подписок и комментариев.'
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            repaired = recount_all()
+        self.stdout.write(self.style.SUCCESS(
+            f'Исправлено записей: {repaired}'
+        ))
@@ -0,0 +1,29 @@
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posts.models import Post
+from posts.thumbnails import generate
+
+
+class Command(BaseCommand):
+    help = 'Заранее строит миниатюры для всех картинок постов.'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers', type=int,
+            default=max(settings.POST_THUMBNAIL_WORKERS, 1),
+            help='Число параллельных потоков.',
+        )
+
+    def handle(self, *args, **options):
+        names = Post.objects.exclude(image='').values_list(
+            'image', flat=True
+        ).distinct()
+        with ThreadPoolExecutor(max_workers=options['workers']) as pool:
+            results = list(pool.map(generate, names.iterator()))
+        self.stdout.write(self.style.SUCCESS(
+            f'Готово миниатюр: {sum(results)}, ошибок: '
+            f'{len(results) - sum(results)}'
+        ))
@@ -0,0 +1,82 @@
+"""Учёт ссылок на файлы картинок постов.
+
+Одинаковые картинки хранятся одним файлом (core.storage), поэтому
+файл нельзя удалять вместе с постом: число ссылок на него — число
+постов с тем же Post.image (индекс post_image_idx). Когда пост удалён
+или сменил картинку, после коммита release() проверяет, остались ли
+ссылки, и удаляет сироту вместе с миниатюрой. Проверка и удаление
+идут под замком имени (ContentAddressedStorage.lock), что и повторная
+запись того же файла. Недавно записанные файлы не трогаются; их, как
+и прочих сирот с именем по содержимому, подбирает команда clean_media.
+"""
+import os
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import default_storage
+
+from . import thumbnails
+from .constants import MEDIA_SWEEP_BATCH_SIZE
+from .models import Post
+
+
+def get_storage():
+    return Post._meta.get_field('image').storage
+
+
+def reference_count(name):
+    return Post.objects.filter(image=name).count()
+
+
+def release(name):
+    """Удалить файл name, если на него больше не ссылается ни один пост."""
+    storage = get_storage()
+    if not name or reference_count(name):
+        return False
+    try:
+        storage.path(name)
+    except SuspiciousFileOperation:
+        # Путь вне MEDIA_ROOT: такой файл не наш.
+        return False
+    with storage.lock(name, blocking=False) as locked:
+        # Занятый файл сейчас переиспользуют: его подберёт clean_media.
+        if not locked or not storage.exists(name) or storage.is_recent(
+            name, settings.POST_IMAGE_ORPHAN_AGE
+        ):
+            return False
+        storage.delete(name)
+    default_storage.delete(thumbnails.thumbnail_name(name))
+    cache.delete_many([
+        thumbnails.THUMBNAIL_KEY.format(name),
+        thumbnails.PENDING_KEY.format(name),
+    ])
+    return True
+
+
+def stored_names(directory):
+    """Имена всех файлов хранилища картинок внутри directory."""
+    storage = get_storage()
+    if not storage.exists(directory):
+        return
+    directories, files = storage.listdir(directory)
+    for filename in files:
+        yield f'{directory}/{filename}'
+    for child in directories:
+        yield from stored_names(f'{directory}/{child}')
+
+
+def sweep():
+    """Удалить все файлы картинок без ссылок; вернуть их число."""
+    storage = get_storage()
+    upload_to = Post._meta.get_field('image').upload_to
+    names = [
+        name for name in stored_names(os.path.normpath(upload_to))
+        if storage.is_content_name(name)
+    ]
+    referenced = set()
+    for start in range(0, len(names), MEDIA_SWEEP_BATCH_SIZE):
+        referenced.update(Post.objects.filter(
+            image__in=names[start:start + MEDIA_SWEEP_BATCH_SIZE]
+        ).values_list('image', flat=True))
+    return sum(release(name) for name in names if name not in referenced)
@@ -0,0 +1,25 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    """Состояние моделей, не попавшее в миграции до 0006.
+
+    Ограничение уникальности подписки и подпись поля картинки уже были
+    в models.py, но makemigrations для них не запускали.
+    """
+
+    dependencies = [
+        ('posts', '0006_auto_20230513_1303'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='post',
+            name='image',
+            field=models.ImageField(blank=True, upload_to='posts/', verbose_name='Картинка'),
+        ),
+        migrations.AddConstraint(
+            model_name='follow',
+            constraint=models.UniqueConstraint(fields=('author', 'user'), name='unique_author_user'),
+        ),
+    ]
@@ -0,0 +1,123 @@
+# Generated by Django 2.2.16 on 2026-10-18 03:45
+
+import re
+from collections import Counter
+
+from django.db import OperationalError, migrations, models
+import django.db.models.deletion
+
+
+# Копия posts.search.tokenize на момент миграции: изменения стеммера
+# в приложении не должны менять то, что делает эта миграция.
+WORD_RE = re.compile(r'[0-9a-zа-я]+')
+
+STOP_WORDS = frozenset((
+    'и', 'в', 'во', 'не', 'что', 'он', 'на', 'я', 'с', 'со', 'как', 'а',
+    'то', 'все', 'она', 'так', 'его', 'но', 'да', 'ты', 'к', 'у', 'же',
+    'вы', 'за', 'бы', 'по', 'только', 'ее', 'мне', 'было', 'вот', 'от',
+    'меня', 'еще', 'нет', 'о', 'из', 'ему', 'ли', 'если', 'или', 'ни',
+    'быть', 'был', 'до', 'вас', 'уже', 'для', 'мы', 'их', 'это', 'при',
+))
+
+ENDINGS = sorted((
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими',
+    'ией', 'иях', 'ях', 'ах', 'ов', 'ев', 'ей', 'ой', 'ий', 'ый',
+    'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ую', 'юю', 'ом', 'ем', 'ам',
+    'ям', 'ию', 'ия', 'ться', 'тся', 'ешь', 'ете', 'ить', 'ать',
+    'ять', 'еть', 'ует', 'ют', 'ут', 'ит', 'ет', 'ал', 'ала', 'али',
+    'ило', 'ила', 'или', 'а', 'я', 'о', 'е', 'и', 'ы', 'у', 'ю', 'ь',
+), key=len, reverse=True)
+
+MIN_STEM = 3
+MAX_TERM_LENGTH = 64
+BATCH_SIZE = 1000
+
+
+def stem(word):
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(text):
+    words = WORD_RE.findall(text.lower().replace('ё', 'е'))
+    return [
+        stem(word)[:MAX_TERM_LENGTH]
+        for word in words if word not in STOP_WORDS
+    ]
+
+
+def create_fts_table(connection):
+    """Таблица FTS5 на SQLite; False — её не создать."""
+    if connection.vendor != 'sqlite':
+        return False
+    with connection.cursor() as cursor:
+        try:
+            cursor.execute(
+                'CREATE VIRTUAL TABLE posts_post_fts USING fts5(terms)'
+            )
+        except OperationalError:
+            return False
+    return True
+
+
+def fill_search_index(apps, schema_editor):
+    """Проиндексировать уже написанные посты.
+
+    На SQLite с FTS5 — виртуальная таблица, иначе (другие базы и
+    SQLite без FTS5) — SearchTerm.
+    """
+    connection = schema_editor.connection
+    Post = apps.get_model('posts', 'Post')
+    posts = Post.objects.order_by().values_list('id', 'text').iterator()
+    if create_fts_table(connection):
+        with connection.cursor() as cursor:
+            cursor.executemany(
+                'INSERT INTO posts_post_fts (rowid, terms) VALUES (%s, %s)',
+                (
+                    (post_id, ' '.join(tokenize(text)))
+                    for post_id, text in posts
+                ),
+            )
+        return
+    SearchTerm = apps.get_model('posts', 'SearchTerm')
+    batch = []
+    for post_id, text in posts:
+        batch.extend(
+            SearchTerm(term=term, post_id=post_id, weight=weight)
+            for term, weight in Counter(tokenize(text)).items()
+        )
+        if len(batch) >= BATCH_SIZE:
+            SearchTerm.objects.bulk_create(batch)
+            batch = []
+    SearchTerm.objects.bulk_create(batch)
+
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute('DROP TABLE IF EXISTS posts_post_fts')
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0010_auto_20261018_0339'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchTerm',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=64, verbose_name='Основа слова')),
+                ('weight', models.PositiveIntegerField(default=1, verbose_name='Число вхождений')),
+                ('post', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='search_terms', to='posts.Post')),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='searchterm',
+            constraint=models.UniqueConstraint(fields=('term', 'post'), name='unique_search_term_post'),
+        ),
+        migrations.RunPython(fill_search_index, drop_fts_index),
+    ]
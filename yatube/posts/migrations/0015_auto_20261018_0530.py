@@ -0,0 +1,48 @@
+# Generated by Django 2.2.16 on 2026-10-18 05:30
+
+from django.db import migrations
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+STAT_SOURCES = {
+    'posts_count': ('Post', 'author'),
+    'followers_count': ('Follow', 'author'),
+    'following_count': ('Follow', 'user'),
+    'comments_count': ('Comment', 'author'),
+}
+
+
+def fill_user_stats(apps, schema_editor):
+    """Завести строки счётчиков всем пользователям, у кого их нет."""
+    User = apps.get_model('auth', 'User')
+    UserStats = apps.get_model('posts', 'UserStats')
+    counts = {}
+    for field, (model_name, lookup) in STAT_SOURCES.items():
+        model = apps.get_model('posts', model_name)
+        counts[field] = Coalesce(Subquery(
+            model.objects.filter(**{lookup: OuterRef('pk')}).order_by(
+            ).values(lookup).annotate(
+                total=Count('id')
+            ).values('total')[:1]
+        ), 0)
+    users = User.objects.filter(stats__isnull=True).annotate(
+        **counts
+    ).values('pk', *STAT_SOURCES)
+    UserStats.objects.bulk_create(
+        (
+            UserStats(user_id=row.pop('pk'), **row)
+            for row in users.iterator()
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('posts', '0014_auto_20261018_0459'),
+    ]
+
+    operations = [
+        migrations.RunPython(fill_user_stats, migrations.RunPython.noop),
+    ]
@@ -1,6 +1,7 @@
 from django.db import models
 from django.contrib.auth import get_user_model
 from core.models import CreatedModel
+from core.storage import ContentAddressedStorage
 
 from .constants import MAX_SUMBOL
 
@@ -44,10 +45,40 @@ class Post(models.Model):
         'Картинка',
         upload_to='posts/',
         blank=True,
+        # Одинаковые картинки лежат одним файлом, см. posts.media.
+        storage=ContentAddressedStorage(),
+    )
+    # Размеры заполняет обработка при загрузке (posts.images), чтобы
+    # шаблону не открывать файл.
+    image_width = models.PositiveIntegerField(
+        'Ширина картинки', null=True, blank=True, editable=False,
+    )
+    image_height = models.PositiveIntegerField(
+        'Высота картинки', null=True, blank=True, editable=False,
+    )
+    comment_count = models.PositiveIntegerField(
+        'Число комментариев',
+        default=0,
+        editable=False,
     )
 
     class Meta:
-        ordering = ['-pub_date']
+        ordering = ['-pub_date', '-id']
+        indexes = [
+            models.Index(
+                fields=['-pub_date', '-id'], name='post_pub_date_id_idx'
+            ),
+            models.Index(
+                fields=['author', '-pub_date', '-id'],
+                name='post_author_pub_date_idx'
+            ),
+            models.Index(
+                fields=['group', '-pub_date', '-id'],
+                name='post_group_pub_date_idx'
+            ),
+            # Подсчёт ссылок на файл картинки (posts.media).
+            models.Index(fields=['image'], name='post_image_idx'),
+        ]
         verbose_name = 'Пост'
         verbose_name_plural = 'Посты'
 
@@ -77,6 +108,14 @@ class Comment(models.Model):
         auto_now_add=True,
     )
 
+    class Meta:
+        indexes = [
+            models.Index(
+                fields=['post', 'created', 'id'],
+                name='comment_post_created_idx'
+            ),
+        ]
+
     def __str__(self):
         return self.text[:MAX_SUMBOL]
 
@@ -100,3 +139,75 @@ class Follow(CreatedModel):
                 name='unique_author_user'
             )
         ]
+        indexes = [
+            models.Index(
+                fields=['user', 'author'], name='follow_user_author_idx'
+            ),
+        ]
+
+
+class FeedEntry(models.Model):
+    """Материализованная лента подписок: строка на пару читатель–пост."""
+    user = models.ForeignKey(
+        User,
+        on_delete=models.CASCADE,
+        related_name='feed',
+    )
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='feed_entries',
+    )
+    pub_date = models.DateTimeField('Дата публикации')
+
+    class Meta:
+        ordering = ['-pub_date', '-post']
+        constraints = [
+            models.UniqueConstraint(
+                fields=['user', 'post'],
+                name='unique_feed_user_post'
+            )
+        ]
+        indexes = [
+            models.Index(
+                fields=['user', '-pub_date', '-post'],
+                name='feed_user_pub_date_idx'
+            ),
+        ]
+
+
+class UserStats(models.Model):
+    """Счётчики пользователя, которые иначе считались бы COUNT(*)."""
+    user = models.OneToOneField(
+        User,
+        on_delete=models.CASCADE,
+        primary_key=True,
+        related_name='stats',
+    )
+    posts_count = models.PositiveIntegerField('Постов', default=0)
+    followers_count = models.PositiveIntegerField('Подписчиков', default=0)
+    following_count = models.PositiveIntegerField('Подписок', default=0)
+    comments_count = models.PositiveIntegerField('Комментариев', default=0)
+
+    class Meta:
+        verbose_name = 'Статистика пользователя'
+        verbose_name_plural = 'Статистика пользователей'
+
+
+class SearchTerm(models.Model):
+    """Обратный индекс поиска для баз без FTS5: основа слова в посте."""
+    term = models.CharField('Основа слова', max_length=64)
+    post = models.ForeignKey(
+        Post,
+        on_delete=models.CASCADE,
+        related_name='search_terms',
+    )
+    weight = models.PositiveIntegerField('Число вхождений', default=1)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=['term', 'post'],
+                name='unique_search_term_post'
+            )
+        ]
@@ -0,0 +1,160 @@
+"""Полнотекстовый поиск по текстам постов.
+
+Текст разбивается на слова, слова приводятся к основе упрощённым
+стеммером для русского языка. На SQLite основы хранятся в виртуальной
+таблице FTS5 и ранжируются bm25, на других базах — в таблице
+SearchTerm (обратный индекс: основа, пост, число вхождений).
+Индекс обновляется сигналами при сохранении и удалении поста.
+"""
+import re
+from collections import Counter
+from functools import lru_cache
+
+from django.db import connection, transaction
+from django.db.models import (
+    Count, IntegerField, OuterRef, Subquery, Sum, Value,
+)
+from django.db.models.expressions import RawSQL
+from django.db.models.functions import Coalesce
+
+from .models import Post, SearchTerm
+
+FTS_TABLE = 'posts_post_fts'
+
+WORD_RE = re.compile(r'[0-9a-zа-я]+')
+
+STOP_WORDS = frozenset((
+    'и', 'в', 'во', 'не', 'что', 'он', 'на', 'я', 'с', 'со', 'как', 'а',
+    'то', 'все', 'она', 'так', 'его', 'но', 'да', 'ты', 'к', 'у', 'же',
+    'вы', 'за', 'бы', 'по', 'только', 'ее', 'мне', 'было', 'вот', 'от',
+    'меня', 'еще', 'нет', 'о', 'из', 'ему', 'ли', 'если', 'или', 'ни',
+    'быть', 'был', 'до', 'вас', 'уже', 'для', 'мы', 'их', 'это', 'при',
+))
+
+# Окончания от длинных к коротким: отрезается первое подходящее.
+ENDINGS = sorted((
+    'иями', 'ями', 'ами', 'ого', 'его', 'ому', 'ему', 'ыми', 'ими',
+    'ией', 'иях', 'ях', 'ах', 'ов', 'ев', 'ей', 'ой', 'ий', 'ый',
+    'ая', 'яя', 'ое', 'ее', 'ые', 'ие', 'ую', 'юю', 'ом', 'ем', 'ам',
+    'ям', 'ию', 'ия', 'ться', 'тся', 'ешь', 'ете', 'ить', 'ать',
+    'ять', 'еть', 'ует', 'ют', 'ут', 'ит', 'ет', 'ал', 'ала', 'али',
+    'ило', 'ила', 'или', 'а', 'я', 'о', 'е', 'и', 'ы', 'у', 'ю', 'ь',
+), key=len, reverse=True)
+
+MIN_STEM = 3
+MAX_TERM_LENGTH = 64
+
+
+def stem(word):
+    for ending in ENDINGS:
+        if word.endswith(ending) and len(word) - len(ending) >= MIN_STEM:
+            return word[:-len(ending)]
+    return word
+
+
+def tokenize(text):
+    """Основы значимых слов текста в порядке появления."""
+    words = WORD_RE.findall(text.lower().replace('ё', 'е'))
+    return [
+        stem(word)[:MAX_TERM_LENGTH]
+        for word in words if word not in STOP_WORDS
+    ]
+
+
+def use_fts():
+    """Есть ли у текущей базы таблица FTS5 для поиска."""
+    if connection.vendor != 'sqlite':
+        return False
+    return _has_fts_table(connection.settings_dict['NAME'])
+
+
+@lru_cache(maxsize=None)
+def _has_fts_table(database_name):
+    return FTS_TABLE in connection.introspection.table_names()
+
+
+def index_post(post_id, text):
+    terms = tokenize(text)
+    if use_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'INSERT OR REPLACE INTO {FTS_TABLE} (rowid, terms) '
+                f'VALUES (%s, %s)', [post_id, ' '.join(terms)]
+            )
+        return
+    SearchTerm.objects.filter(post_id=post_id).delete()
+    SearchTerm.objects.bulk_create(
+        SearchTerm(term=term, post_id=post_id, weight=weight)
+        for term, weight in Counter(terms).items()
+    )
+
+
+def remove_post(post_id):
+    if use_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f'DELETE FROM {FTS_TABLE} WHERE rowid = %s', [post_id]
+            )
+        return
+    SearchTerm.objects.filter(post_id=post_id).delete()
+
+
+def rebuild():
+    """Пересобрать индекс по всем постам; вернуть их число."""
+    if use_fts():
+        with connection.cursor() as cursor:
+            cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    else:
+        SearchTerm.objects.all().delete()
+    return index_posts(Post.objects.all())
+
+
+def index_posts(posts):
+    """Проиндексировать посты выборки одной транзакцией; вернуть их число."""
+    total = 0
+    with transaction.atomic():
+        for post_id, text in posts.values_list('id', 'text').iterator():
+            index_post(post_id, text)
+            total += 1
+    return total
+
+
+def _fts_query(terms):
+    # Основы в кавычках через пробел: FTS5 требует каждую из них.
+    return ' '.join(f'"{term}"' for term in terms)
+
+
+def search(query, posts=None):
+    """Посты, содержащие все слова запроса, с оценкой search_rank."""
+    posts = Post.objects.all() if posts is None else posts
+    terms = list(dict.fromkeys(tokenize(query)))
+    if not terms:
+        return posts.annotate(
+            search_rank=Value(0, output_field=IntegerField())
+        ).none()
+    if use_fts():
+        match = _fts_query(terms)
+        # extra(), а не pk__in=RawSQL(): Django оборачивает RawSQL
+        # во вторые скобки, и SQLite читает IN ((...)) как одно значение.
+        return posts.extra(
+            where=[
+                f'posts_post.id IN (SELECT rowid FROM {FTS_TABLE} '
+                f'WHERE {FTS_TABLE} MATCH %s)'
+            ],
+            params=[match],
+        ).annotate(search_rank=RawSQL(
+            f'SELECT -bm25({FTS_TABLE}) FROM {FTS_TABLE} '
+            f'WHERE {FTS_TABLE} MATCH %s AND rowid = posts_post.id',
+            [match],
+        ))
+    matched = SearchTerm.objects.filter(term__in=terms)
+    return posts.filter(pk__in=matched.values('post').annotate(
+        found=Count('term', distinct=True)
+    ).filter(found=len(terms)).values('post')).annotate(
+        search_rank=Coalesce(Subquery(
+            matched.filter(post=OuterRef('pk')).values('post').annotate(
+                total=Sum('weight')
+            ).values('total')[:1],
+            output_field=IntegerField(),
+        ), 0)
+    )
@@ -0,0 +1,116 @@
+"""Наполнение базы синтетическими данными для замеров.
+
+Записи вставляются через bulk_create, мимо сигналов, поэтому после
+вставки производные данные (ленты подписок, счётчики, поисковый
+индекс) пересобираются целиком через rebuild_derived().
+"""
+import random
+import uuid
+from datetime import timedelta
+
+from django.utils import timezone
+from faker import Faker
+
+from . import feed, search, stats
+from .caching import FEED_SCOPE, GROUPS_SCOPE, bump
+from .models import Comment, Follow, Group, Post, User
+
+BATCH_SIZE = 500
+
+
+def rebuild_derived(bump_versions=True):
+    """Пересобрать всё, что сигналы поддерживают при обычной записи.
+
+    Без bump_versions закэшированные фрагменты страниц не сбрасываются:
+    так наполняют базу, страницы которой не показываются.
+    """
+    # Раздача в ленты решается по счётчикам подписчиков.
+    stats.recount_all()
+    feed.rebuild()
+    search.rebuild()
+    if bump_versions:
+        bump(FEED_SCOPE, GROUPS_SCOPE)
+
+
+def seed(users=50, groups=5, posts=1000, comments=1000, follows=200,
+         random_seed=0, bump_versions=True):
+    """Создать набор данных заданного объёма; вернуть его описание."""
+    rnd = random.Random(random_seed)
+    fake = Faker('ru_RU')
+    fake.seed_instance(random_seed)
+    prefix = uuid.uuid4().hex[:8]
+    User.objects.bulk_create(
+        (
+            User(username=f'seed_{prefix}_{i}', password='!')
+            for i in range(users)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    user_ids = list(User.objects.filter(
+        username__startswith=f'seed_{prefix}_'
+    ).values_list('id', flat=True))
+    Group.objects.bulk_create(
+        (
+            Group(
+                title=fake.sentence(nb_words=3)[:200],
+                slug=f'seed-{prefix}-{i}',
+                description=fake.text(max_nb_chars=200),
+            )
+            for i in range(groups)
+        ),
+        batch_size=BATCH_SIZE,
+    )
+    group_ids = list(Group.objects.filter(
+        slug__startswith=f'seed-{prefix}-'
+    ).values_list('id', flat=True))
+
+    start = timezone.now() - timedelta(minutes=posts)
+    new_posts = [
+        Post(
+            text=fake.text(max_nb_chars=400),
+            author_id=rnd.choice(user_ids),
+            group_id=rnd.choice(group_ids + [None]) if group_ids else None,
+        )
+        for _ in range(posts)
+    ]
+    Post.objects.bulk_create(new_posts, batch_size=BATCH_SIZE)
+    post_ids = list(Post.objects.filter(
+        author_id__in=user_ids
+    ).order_by('id').values_list('id', flat=True))
+    # auto_now_add ставит всем постам одно время: разносим их по минутам.
+    Post.objects.bulk_update(
+        [
+            Post(pk=post_id, pub_date=start + timedelta(minutes=i))
+            for i, post_id in enumerate(post_ids)
+        ],
+        ['pub_date'],
+        batch_size=BATCH_SIZE,
+    )
+
+    pairs = set()
+    while len(pairs) < min(follows, users * (users - 1)):
+        user_id, author_id = rnd.sample(user_ids, 2)
+        pairs.add((user_id, author_id))
+    Follow.objects.bulk_create(
+        (Follow(user_id=user, author_id=author) for user, author in pairs),
+        batch_size=BATCH_SIZE,
+    )
+    if post_ids:
+        Comment.objects.bulk_create(
+            (
+                Comment(
+                    text=fake.sentence(),
+                    author_id=rnd.choice(user_ids),
+                    post_id=rnd.choice(post_ids),
+                )
+                for _ in range(comments)
+            ),
+            batch_size=BATCH_SIZE,
+        )
+    rebuild_derived(bump_versions)
+    return {
+        'users': user_ids,
+        'groups': group_ids,
+        'posts': post_ids,
+        'follows': sorted(pairs),
+    }
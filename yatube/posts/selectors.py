@@ -0,0 +1,43 @@
+"""Общие запросы для страниц с постами.
+
+Все ленты строятся от feed_posts(), поэтому автор и группа каждой
+записи приходят одним JOIN, а не отдельным запросом на строку.
+"""
+from django.shortcuts import get_object_or_404
+
+from .models import Post
+
+FEED_RELATED = ('author', 'group')
+
+
+def feed_posts(**filters):
+    return Post.objects.select_related(*FEED_RELATED).filter(**filters)
+
+
+def index_posts():
+    return feed_posts()
+
+
+def group_posts(group):
+    return feed_posts(group=group)
+
+
+def profile_posts(author):
+    return feed_posts(author=author)
+
+
+def post_comments(post):
+    return post.comments.select_related('author')
+
+
+def page_object(request, klass, **lookup):
+    """get_object_or_404, который обращается к базе один раз за запрос.
+
+    Объект страницы нужен и валидаторам условного GET, и самой
+    странице.
+    """
+    objects = request.__dict__.setdefault('_page_objects', {})
+    key = (getattr(klass, 'model', klass), tuple(sorted(lookup.items())))
+    if key not in objects:
+        objects[key] = get_object_or_404(klass, **lookup)
+    return objects[key]
@@ -0,0 +1,113 @@
+from django.db import transaction
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from . import caching, feed, live, media, search, stats, thumbnails
+from .constants import FEED_FANOUT_LIMIT
+from .models import Comment, Follow, Group, Post, User
+
+
+def _release_image(name):
+    if name:
+        transaction.on_commit(lambda: media.release(name))
+
+
+@receiver(post_save, sender=User)
+def user_saved(sender, instance, created, **kwargs):
+    if created:
+        stats.create_stats(instance.pk)
+
+
+@receiver(pre_save, sender=Post)
+def post_saving(sender, instance, **kwargs):
+    # Пост мог сменить группу: фрагмент старой группы тоже устарел.
+    # Старая картинка после смены может остаться без ссылок.
+    instance.previous_group_id = instance.previous_image = None
+    if instance.pk is not None:
+        instance.previous_group_id, instance.previous_image = (
+            Post.objects.filter(pk=instance.pk).values_list(
+                'group_id', 'image'
+            ).first() or (None, None)
+        )
+
+
+@receiver(post_save, sender=Post)
+def post_saved(sender, instance, created, **kwargs):
+    caching.bump_post(
+        instance.pk, instance.author_id,
+        instance.group_id, instance.previous_group_id,
+    )
+    if instance.previous_image != instance.image.name:
+        _release_image(instance.previous_image)
+        # До публикации ниже: живая лента получит карточку с готовой
+        # миниатюрой, а не заглушку и вторую сборку той же картинки.
+        thumbnails.schedule(
+            instance, getattr(instance, 'processed_image', None)
+        )
+    search.index_post(instance.pk, instance.text)
+    if created:
+        stats.bump_user(instance.author_id, posts_count=1)
+        feed.fan_out(instance)
+        post_id = instance.pk
+        transaction.on_commit(lambda: live.publish_post(post_id))
+
+
+@receiver(post_delete, sender=Post)
+def post_deleted(sender, instance, **kwargs):
+    caching.bump_post(instance.pk, instance.author_id, instance.group_id)
+    search.remove_post(instance.pk)
+    stats.bump_user(instance.author_id, posts_count=-1)
+    _release_image(instance.image.name)
+
+
+def _bump_comment_post(comment):
+    post = Post.objects.filter(pk=comment.post_id).values(
+        'author_id', 'group_id'
+    ).first()
+    if post:
+        caching.bump_post(
+            comment.post_id, post['author_id'], post['group_id'],
+            followers=False,
+        )
+
+
+@receiver(post_save, sender=Comment)
+def comment_saved(sender, instance, created, **kwargs):
+    if created:
+        stats.bump_user(instance.author_id, comments_count=1)
+        stats.bump_post(instance.post_id, 1)
+    _bump_comment_post(instance)
+
+
+@receiver(post_delete, sender=Comment)
+def comment_deleted(sender, instance, **kwargs):
+    stats.bump_user(instance.author_id, comments_count=-1)
+    stats.bump_post(instance.post_id, -1)
+    _bump_comment_post(instance)
+
+
+@receiver(post_save, sender=Group)
+@receiver(post_delete, sender=Group)
+def group_changed(sender, instance, **kwargs):
+    caching.bump(caching.GROUPS_SCOPE)
+
+
+@receiver(post_save, sender=Follow)
+def follow_saved(sender, instance, created, **kwargs):
+    if not created:
+        return
+    stats.bump_user(instance.author_id, followers_count=1)
+    stats.bump_user(instance.user_id, following_count=1)
+    caching.bump(caching.follow_scope(instance.user_id))
+    if feed.is_fanout_author(instance.author_id):
+        feed.backfill(instance.user_id, instance.author_id)
+
+
+@receiver(post_delete, sender=Follow)
+def follow_deleted(sender, instance, **kwargs):
+    stats.bump_user(instance.author_id, followers_count=-1)
+    stats.bump_user(instance.user_id, following_count=-1)
+    caching.bump(caching.follow_scope(instance.user_id))
+    feed.prune(instance.user_id, instance.author_id)
+    if feed.followers_count(instance.author_id) == FEED_FANOUT_LIMIT - 1:
+        feed.backfill_followers(instance.author_id)
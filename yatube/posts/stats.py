@@ -0,0 +1,107 @@
+"""Денормализованные счётчики пользователей и постов.
+
+Строка UserStats заводится вместе с пользователем (сигнал и миграция
+для уже существующих), дальше счётчики двигаются атомарными
+UPDATE ... SET x = x + 1 из сигналов. Чтение ничего не пишет: оно
+идёт и с реплики. Расхождения чинит команда recount_stats.
+"""
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+from . import caching
+from .models import Comment, Follow, Post, User, UserStats
+
+STAT_SOURCES = {
+    'posts_count': (Post, 'author'),
+    'followers_count': (Follow, 'author'),
+    'following_count': (Follow, 'user'),
+    'comments_count': (Comment, 'author'),
+}
+
+
+def bump_user(user_id, **deltas):
+    """Сдвинуть счётчики пользователя, если строка уже заведена.
+
+    Разошедшийся счётчик не уходит ниже нуля: иначе UPDATE упал бы на
+    ограничении PositiveIntegerField.
+    """
+    UserStats.objects.filter(user_id=user_id).update(**{
+        field: Greatest(F(field) + delta, 0)
+        for field, delta in deltas.items()
+    })
+    caching.bump(caching.stats_scope(user_id))
+
+
+def bump_post(post_id, delta):
+    Post.objects.filter(pk=post_id).update(
+        comment_count=Greatest(F('comment_count') + delta, 0)
+    )
+
+
+def count_user(user_id):
+    return {
+        field: model.objects.filter(**{f'{lookup}_id': user_id}).count()
+        for field, (model, lookup) in STAT_SOURCES.items()
+    }
+
+
+def create_stats(user_id):
+    """Строка счётчиков нового пользователя."""
+    UserStats.objects.get_or_create(user_id=user_id)
+
+
+def get_stats(user):
+    """Счётчики пользователя без записи в базу.
+
+    Если строки нет (пользователь создан bulk_create до recount_stats),
+    счётчики считаются на лету и не сохраняются.
+    """
+    try:
+        return user.stats
+    except UserStats.DoesNotExist:
+        return UserStats(user=user, **count_user(user.pk))
+
+
+def _count_subquery(model, lookup, outer='pk'):
+    return Coalesce(Subquery(
+        model.objects.filter(**{lookup: OuterRef(outer)}).values(
+            lookup
+        ).annotate(total=Count('pk')).values('total')[:1]
+    ), 0)
+
+
+def recount_all():
+    """Пересчитать все счётчики; вернуть число исправленных строк."""
+    return recount(User.objects.all(), Post.objects.all())
+
+
+def recount(users, posts):
+    """Пересчитать счётчики пользователей и постов из выборок.
+
+    Возвращает число исправленных строк.
+    """
+    repaired = 0
+    existing = {
+        row['user_id']: row
+        for row in UserStats.objects.filter(user__in=users).values()
+    }
+    rows = users.annotate(**{
+        f'actual_{field}': _count_subquery(model, lookup)
+        for field, (model, lookup) in STAT_SOURCES.items()
+    }).values('pk', *(f'actual_{field}' for field in STAT_SOURCES))
+    missing = []
+    for row in rows.iterator():
+        actual = {field: row[f'actual_{field}'] for field in STAT_SOURCES}
+        stored = existing.get(row['pk'])
+        if stored is None:
+            missing.append(UserStats(user_id=row['pk'], **actual))
+        elif any(stored[field] != value for field, value in actual.items()):
+            UserStats.objects.filter(user_id=row['pk']).update(**actual)
+            repaired += 1
+    UserStats.objects.bulk_create(missing, batch_size=500)
+    repaired += posts.annotate(
+        actual=_count_subquery(Comment, 'post')
+    ).exclude(comment_count=F('actual')).update(
+        comment_count=_count_subquery(Comment, 'post')
+    )
+    return repaired + len(missing)
@@ -0,0 +1,16 @@
+from django import template
+
+from posts import articles
+
+register = template.Library()
+
+
+@register.simple_tag
+def render_articles(posts, without_group_links=False):
+    """HTML карточек всех постов страницы одним вызовом.
+
+    {% render_articles page_obj as articles %} и цикл по articles
+    вместо include posts/includes/article.html на каждый пост:
+    карточки из кэша не рендерятся заново.
+    """
+    return articles.render_articles(posts, without_group_links)
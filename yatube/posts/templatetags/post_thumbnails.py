@@ -0,0 +1,11 @@
+from django import template
+
+from posts.thumbnails import get_thumbnail
+
+register = template.Library()
+
+
+@register.simple_tag
+def post_thumbnail(post):
+    """Миниатюра картинки поста или None, пока она готовится."""
+    return get_thumbnail(post)
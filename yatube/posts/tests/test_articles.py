@@ -0,0 +1,130 @@
+import shutil
+import tempfile
+from io import StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.template.loader import render_to_string
+from django.test import TestCase, override_settings
+
+from .. import articles
+from ..models import Group, Post, User
+from ..selectors import feed_posts
+from ..thumbnails import generate
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+SMALL_GIF = (
+    b'\x47\x49\x46\x38\x39\x61\x02\x00'
+    b'\x01\x00\x80\x00\x00\x00\x00\x00'
+    b'\xFF\xFF\xFF\x21\xF9\x04\x00\x00'
+    b'\x00\x00\x00\x2C\x00\x00\x00\x00'
+    b'\x02\x00\x01\x00\x00\x02\x02\x0C'
+    b'\x0A\x00\x3B'
+)
+
+
+def render_page(posts, **kwargs):
+    return ''.join(articles.render_articles(posts, **kwargs))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POST_THUMBNAIL_WORKERS=0)
+class ArticleRendererTests(TestCase):
+    """render_articles выводит то же, что цикл с article.html."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user(
+            'автор', first_name='Иван', last_name='<Петров>'
+        )
+        cls.plain = User.objects.create_user('plain+user')
+        cls.group = Group.objects.create(
+            title='Группа & друзья', slug='articles', description='Описание'
+        )
+        Post.objects.create(
+            text='Первый <абзац>\n\nВторой абзац', author=cls.author,
+            group=cls.group,
+        )
+        Post.objects.create(text='Без группы', author=cls.plain)
+
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+
+    def posts(self):
+        return list(feed_posts())
+
+    def include_loop(self, posts, **context):
+        return ''.join(
+            render_to_string(
+                'posts/includes/article.html', {'post': post, **context}
+            )
+            for post in posts
+        )
+
+    def test_same_html_as_include(self):
+        posts = self.posts()
+        self.assertHTMLEqual(
+            render_page(posts), self.include_loop(posts)
+        )
+        self.assertHTMLEqual(
+            render_page(posts, without_group_links=True),
+            self.include_loop(posts, without_group_links=True),
+        )
+
+    def test_same_html_for_images(self):
+        """Заглушка, пока миниатюра строится, и готовая миниатюра."""
+        Post.objects.create(
+            text='С картинкой', author=self.plain,
+            image=SimpleUploadedFile('small.gif', SMALL_GIF, 'image/gif'),
+        )
+        posts = self.posts()
+        with mock.patch('posts.thumbnails.schedule'):
+            self.assertHTMLEqual(
+                render_page(posts), self.include_loop(posts)
+            )
+        generate(posts[0].image.name)
+        cache.clear()
+        html = render_page(posts)
+        self.assertIn('card-img', html)
+        self.assertHTMLEqual(html, self.include_loop(posts))
+
+    def test_cached_per_post(self):
+        """Повторный вывод не собирает карточки заново."""
+        posts = self.posts()
+        render_page(posts)
+        with mock.patch.object(articles, 'render_article') as render:
+            render_page(posts)
+        render.assert_not_called()
+
+    def test_post_change_refreshes_card(self):
+        render_page(self.posts())
+        post = Post.objects.get(text='Без группы')
+        post.text = 'Исправленный текст'
+        post.save()
+        with mock.patch.object(
+            articles, 'render_article', wraps=articles.render_article
+        ) as render:
+            html = render_page(self.posts())
+        self.assertEqual(render.call_count, 1)
+        self.assertIn('Исправленный текст', html)
+
+    def test_group_change_refreshes_cards(self):
+        render_page(self.posts())
+        group = Group.objects.get(pk=self.group.pk)
+        group.title = 'Новое название'
+        group.save()
+        html = render_page(self.posts())
+        self.assertIn('Новое название', html)
+
+    def test_benchmark_command(self):
+        out = StringIO()
+        call_command('benchmark_articles', iterations=2, stdout=out)
+        self.assertIn('cached', out.getvalue())
@@ -0,0 +1,71 @@
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..constants import COMMENTS_ON_PAGE
+from ..models import Comment, Post, User
+from ..stats import recount_all
+from .utils import QueryBudgetMixin
+
+
+class CommentPaginationTests(QueryBudgetMixin, TestCase):
+    """Комментарии поста выводятся порциями по курсору."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('comments_author')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+        for number in range(COMMENTS_ON_PAGE + 5):
+            Comment.objects.create(
+                text=f'Комментарий {number}', author=cls.author,
+                post=cls.post,
+            )
+        recount_all()
+        cls.url = reverse('posts:post_detail', args=[cls.post.pk])
+        cls.fragment_url = reverse('posts:comment_list', args=[cls.post.pk])
+
+    def setUp(self):
+        self.client = Client()
+
+    def texts(self, response):
+        return [comment.text for comment in response.context['comments']]
+
+    def test_first_page_and_summary(self):
+        response = self.client.get(self.url)
+        texts = self.texts(response)
+        self.assertEqual(len(texts), COMMENTS_ON_PAGE)
+        self.assertEqual(texts[0], 'Комментарий 0')
+        self.assertContains(
+            response, f'Комментариев: {COMMENTS_ON_PAGE + 5}'
+        )
+        self.assertContains(response, 'Показать ещё')
+
+    def test_newest_first(self):
+        response = self.client.get(self.url, {'order': 'new'})
+        self.assertEqual(
+            self.texts(response)[0], f'Комментарий {COMMENTS_ON_PAGE + 4}'
+        )
+        self.assertEqual(response.context['comments'].order, 'new')
+
+    def test_fragment_continues_after_cursor(self):
+        first = self.client.get(self.url)
+        next_query = first.context['comments'].paginator.next_query
+        response = self.client.get(f'{self.fragment_url}?{next_query}')
+        self.assertTemplateUsed(response, 'posts/includes/comment_list.html')
+        self.assertTemplateNotUsed(response, 'base.html')
+        self.assertEqual(
+            self.texts(response),
+            [f'Комментарий {number}'
+             for number in range(COMMENTS_ON_PAGE, COMMENTS_ON_PAGE + 5)],
+        )
+        self.assertNotContains(response, 'Показать ещё')
+
+    def test_fragment_of_missing_post(self):
+        response = self.client.get(
+            reverse('posts:comment_list', args=[self.post.pk + 100])
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_queries_do_not_grow_with_comments(self):
+        """Авторы комментариев приходят одним JOIN, без COUNT(*)."""
+        self.assertQueryBudget(self.client, self.url, 3)
+        self.assertQueryBudget(self.client, self.fragment_url, 2)
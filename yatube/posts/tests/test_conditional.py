@@ -0,0 +1,123 @@
+import time
+
+from django.core.cache import cache
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from ..caching import FEED_SCOPE, GROUPS_SCOPE, VERSION_KEY
+from ..models import Comment, Follow, Group, Post, User
+
+
+class ConditionalGetTests(TestCase):
+    """Неизменившиеся страницы отдаются как 304 Not Modified."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('conditional_author')
+        cls.reader = User.objects.create_user('conditional_reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='conditional', description='Описание'
+        )
+        cls.post = Post.objects.create(
+            text='Пост', author=cls.author, group=cls.group
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.guest_client = Client()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.urls = {
+            'index': reverse('posts:index'),
+            'group_list': reverse('posts:group_list', args=['conditional']),
+            'profile': reverse('posts:profile', args=[self.author.username]),
+            'post_detail': reverse('posts:post_detail', args=[self.post.pk]),
+        }
+
+    def revalidate(self, client, url):
+        etag = client.get(url)['ETag']
+        return client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+    def test_unchanged_pages_not_modified(self):
+        for name, url in self.urls.items():
+            with self.subTest(view=name):
+                response = self.revalidate(self.guest_client, url)
+                self.assertEqual(response.status_code, 304)
+                self.assertIn('private', response['Cache-Control'])
+
+    def test_not_modified_skips_feed_query(self):
+        """304 на ленту не обращается к базе, на группу — только за ней."""
+        etag = self.guest_client.get(self.urls['index'])['ETag']
+        with self.assertNumQueries(0):
+            self.guest_client.get(
+                self.urls['index'], HTTP_IF_NONE_MATCH=etag
+            )
+        etag = self.guest_client.get(self.urls['group_list'])['ETag']
+        with self.assertNumQueries(1):
+            self.guest_client.get(
+                self.urls['group_list'], HTTP_IF_NONE_MATCH=etag
+            )
+
+    def test_new_post_changes_pages(self):
+        etags = {
+            name: self.guest_client.get(url)['ETag']
+            for name, url in self.urls.items()
+        }
+        Post.objects.create(text='Новый', author=self.author,
+                            group=self.group)
+        for name in ('index', 'group_list', 'profile'):
+            with self.subTest(view=name):
+                response = self.guest_client.get(
+                    self.urls[name], HTTP_IF_NONE_MATCH=etags[name]
+                )
+                self.assertEqual(response.status_code, 200)
+
+    def test_comment_changes_post_page(self):
+        url = self.urls['post_detail']
+        etag = self.guest_client.get(url)['ETag']
+        Comment.objects.create(text='Ответ', author=self.reader,
+                               post=self.post)
+        response = self.guest_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_follow_changes_profile_for_reader(self):
+        """Подписка меняет кнопку и счётчик подписчиков в профиле."""
+        url = self.urls['profile']
+        etag = self.reader_client.get(url)['ETag']
+        Follow.objects.create(user=self.reader, author=self.author)
+        response = self.reader_client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+
+    def test_etag_depends_on_viewer(self):
+        url = self.urls['index']
+        guest_etag = self.guest_client.get(url)['ETag']
+        response = self.reader_client.get(url)
+        self.assertNotEqual(response['ETag'], guest_etag)
+        self.assertFalse(response.has_header('Last-Modified'))
+
+    def test_last_modified_for_guests(self):
+        """Страница, не менявшаяся больше секунды, получает Last-Modified."""
+        changed = time.time_ns() - 10 ** 10
+        cache.set_many({
+            VERSION_KEY.format(scope): changed
+            for scope in (FEED_SCOPE, GROUPS_SCOPE)
+        }, timeout=None)
+        response = self.guest_client.get(self.urls['index'])
+        response = self.guest_client.get(
+            self.urls['index'],
+            HTTP_IF_MODIFIED_SINCE=response['Last-Modified'],
+        )
+        self.assertEqual(response.status_code, 304)
+
+    @override_settings(DATABASE_REPLICAS=['default'], REPLICATION_LAG=30,
+                       REPLICATION_STAND_IN=False)
+    def test_no_validators_while_replica_lags(self):
+        response = self.guest_client.get(self.urls['index'])
+        self.assertEqual(response.status_code, 200)
+        self.assertFalse(response.has_header('ETag'))
+
+    def test_missing_object_not_found(self):
+        response = self.guest_client.get(
+            reverse('posts:group_list', args=['missing'])
+        )
+        self.assertEqual(response.status_code, 404)
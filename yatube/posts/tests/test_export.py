@@ -0,0 +1,101 @@
+import csv
+import json
+import os
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+from django.utils import timezone
+
+from ..export import export_rows
+from ..models import Comment, Follow, Group, Post, User
+
+
+class ExportTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('export_author')
+        cls.reader = User.objects.create_user('export_reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='export', description='Описание'
+        )
+        cls.old = Post.objects.create(
+            text='Старый пост', author=cls.author, group=cls.group
+        )
+        Post.objects.filter(pk=cls.old.pk).update(
+            pub_date=timezone.now() - timedelta(days=10)
+        )
+        cls.new = Post.objects.create(text='Новый, "пост"', author=cls.author)
+        Comment.objects.create(
+            text='Комментарий', author=cls.reader, post=cls.new
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def export(self, *args):
+        out = StringIO()
+        call_command('export_posts', *args, stdout=out)
+        return out.getvalue()
+
+    def test_jsonl_exports_every_model(self):
+        rows = [json.loads(line) for line in self.export().splitlines()]
+        self.assertEqual(
+            [row['model'] for row in rows],
+            ['post', 'post', 'comment', 'follow'],
+        )
+        self.assertEqual(rows[0]['author'], 'export_author')
+        self.assertEqual(rows[0]['group'], 'export')
+        self.assertEqual(rows[2]['post'], self.new.pk)
+        self.assertEqual(rows[3]['user'], 'export_reader')
+
+    def test_since_exports_only_new_rows(self):
+        since = (timezone.now() - timedelta(days=1)).date().isoformat()
+        rows = [
+            json.loads(line)
+            for line in self.export('--models', 'post',
+                                    '--since', since).splitlines()
+        ]
+        self.assertEqual([row['id'] for row in rows], [self.new.pk])
+
+    def test_csv(self):
+        rows = list(csv.reader(
+            StringIO(self.export('--format', 'csv', '--models', 'post'))
+        ))
+        self.assertEqual(
+            rows[0], ['id', 'text', 'pub_date', 'author', 'group', 'image']
+        )
+        self.assertEqual(rows[2][1], 'Новый, "пост"')
+        with self.assertRaises(CommandError):
+            self.export('--format', 'csv')
+
+    def test_output_file(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, 'export.jsonl')
+            self.export('--output', path)
+            with open(path, encoding='utf-8') as file:
+                self.assertEqual(len(file.readlines()), 4)
+
+    def test_rows_are_streamed(self):
+        """Строки отдаются по одной, а не списком."""
+        rows = export_rows('post', chunk_size=1)
+        self.assertEqual(next(rows)['id'], self.old.pk)
+        self.assertEqual(next(rows)['id'], self.new.pk)
+
+    def test_admin_action_streams(self):
+        admin = User.objects.create_superuser(
+            'export_admin', 'admin@example.com', 'password'
+        )
+        client = Client()
+        client.force_login(admin)
+        response = client.post(reverse('admin:posts_post_changelist'), {
+            'action': 'export_csv',
+            '_selected_action': [self.new.pk],
+        })
+        self.assertTrue(response.streaming)
+        self.assertIn('posts.csv', response['Content-Disposition'])
+        content = b''.join(response.streaming_content).decode()
+        self.assertEqual(len(content.splitlines()), 2)
+        self.assertIn('Новый', content)
@@ -0,0 +1,265 @@
+from unittest import mock
+
+from django.core.cache import cache
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..caching import DEEP_PAGE_CACHE, FRAGMENT_CACHE
+from ..models import Comment, FeedEntry, Follow, Post, User, UserStats
+from ..constants import FEED_FANOUT_LIMIT, POST_ON_PEGE
+from ..feed import get_pulled_authors, is_fanout_author
+
+
+class FeedTests(TestCase):
+    """Тесты материализованной ленты подписок."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('feed_author')
+        cls.reader = User.objects.create_user('feed_reader')
+        cls.old_post = Post.objects.create(
+            text='Пост до подписки',
+            author=cls.author,
+        )
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def follow_page(self, **params):
+        response = self.reader_client.get(
+            reverse('posts:follow_index'), params
+        )
+        return response.context['page_obj']
+
+    def test_follow_backfills_feed(self):
+        """После подписки старые посты автора попадают в ленту."""
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        self.assertTrue(FeedEntry.objects.filter(
+            user=self.reader, post=self.old_post
+        ).exists())
+        self.assertIn(self.old_post, self.follow_page())
+
+    def test_new_post_fans_out(self):
+        """Новый пост раскладывается по лентам подписчиков."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        post = Post.objects.create(text='Новый пост', author=self.author)
+        entry = FeedEntry.objects.get(user=self.reader, post=post)
+        self.assertEqual(entry.pub_date, post.pub_date)
+        self.assertEqual(self.follow_page()[0], post)
+
+    def test_unfollow_prunes_feed(self):
+        """После отписки посты автора уходят из ленты."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username])
+        )
+        self.assertFalse(FeedEntry.objects.filter(user=self.reader).exists())
+        self.assertEqual(len(self.follow_page()), 0)
+
+    def test_popular_author_read_on_demand(self):
+        """Посты популярного автора подмешиваются при чтении."""
+        with mock.patch('posts.feed.FEED_FANOUT_LIMIT', 1):
+            Follow.objects.create(user=self.reader, author=self.author)
+            post = Post.objects.create(text='Без раздачи', author=self.author)
+            self.assertFalse(FeedEntry.objects.filter(post=post).exists())
+            self.assertEqual(
+                list(self.follow_page()), [post, self.old_post]
+            )
+
+    def test_pull_decided_by_stats(self):
+        """Популярность автора берётся из UserStats, без COUNT по Follow."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        self.assertEqual(get_pulled_authors(self.reader), [])
+        UserStats.objects.filter(user=self.author).update(
+            followers_count=FEED_FANOUT_LIMIT
+        )
+        self.assertEqual(get_pulled_authors(self.reader), [self.author.pk])
+        self.assertFalse(is_fanout_author(self.author.pk))
+
+    def test_hybrid_feed_merges_ranges(self):
+        """Раздачу и популярного автора листают диапазоны по индексам."""
+        other = User.objects.create_user('feed_other')
+        Follow.objects.create(user=self.reader, author=self.author)
+        Follow.objects.create(user=self.reader, author=other)
+        UserStats.objects.filter(user=self.author).update(
+            followers_count=FEED_FANOUT_LIMIT
+        )
+        for i in range(POST_ON_PEGE + 3):
+            Post.objects.create(
+                text=f'Пост {i}', author=(self.author, other)[i % 2]
+            )
+        expected = list(Post.objects.filter(
+            author__in=[self.author, other]
+        ).order_by('-pub_date', '-id'))
+        page_obj = self.follow_page()
+        for queryset in page_obj.paginator.window_querysets():
+            plan = queryset.explain()
+            self.assertNotIn('TEMP B-TREE', plan)
+            self.assertNotIn('MULTI-INDEX OR', plan)
+        pages = [list(page_obj)]
+        page_obj = self.follow_page(cursor=page_obj.paginator.next_cursor)
+        pages.append(list(page_obj))
+        # Старый пост есть и в FeedEntry, и среди постов автора.
+        self.assertEqual(pages[0] + pages[1], expected)
+        page_obj = self.follow_page(
+            cursor=page_obj.paginator.previous_cursor
+        )
+        self.assertEqual(list(page_obj), pages[0])
+
+    def test_follow_feed_cursor(self):
+        """Лента подписок листается курсором."""
+        Follow.objects.create(user=self.reader, author=self.author)
+        for i in range(POST_ON_PEGE):
+            Post.objects.create(text=f'Пост {i}', author=self.author)
+        page_obj = self.follow_page()
+        self.assertEqual(len(page_obj), POST_ON_PEGE)
+        page_obj = self.follow_page(cursor=page_obj.paginator.next_cursor)
+        self.assertEqual(list(page_obj), [self.old_post])
+
+
+class FollowCacheTests(TestCase):
+    """Кэш ленты подписок разделён по читателям и страницам."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('cache_author')
+        cls.other_author = User.objects.create_user('cache_other_author')
+        cls.reader = User.objects.create_user('cache_reader')
+        cls.other_reader = User.objects.create_user('cache_other_reader')
+        Post.objects.create(text='Пост автора', author=cls.author)
+        Post.objects.create(text='Пост другого', author=cls.other_author)
+        Follow.objects.create(user=cls.reader, author=cls.author)
+        Follow.objects.create(user=cls.other_reader, author=cls.other_author)
+
+    def setUp(self):
+        cache.clear()
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+        self.other_client = Client()
+        self.other_client.force_login(self.other_reader)
+
+    def follow_content(self, client, **params):
+        return client.get(
+            reverse('posts:follow_index'), params
+        ).content.decode()
+
+    def test_readers_do_not_share_fragment(self):
+        self.assertIn('Пост автора', self.follow_content(self.reader_client))
+        content = self.follow_content(self.other_client)
+        self.assertIn('Пост другого', content)
+        self.assertNotIn('Пост автора', content)
+
+    def test_same_versions_do_not_share_fragment(self):
+        """Ключ различает читателей и при совпавших версиях."""
+        with mock.patch('posts.caching._new_version', return_value=1):
+            self.follow_content(self.reader_client)
+            content = self.follow_content(self.other_client)
+        self.assertIn('Пост другого', content)
+        self.assertNotIn('Пост автора', content)
+
+    def test_new_post_of_followed_author_resets_cache(self):
+        self.follow_content(self.reader_client)
+        Post.objects.create(text='Свежий пост', author=self.author)
+        self.assertIn('Свежий пост', self.follow_content(self.reader_client))
+
+    def test_deleted_post_resets_cache(self):
+        self.follow_content(self.reader_client)
+        Post.objects.filter(author=self.author).first().delete()
+        self.assertNotIn(
+            'Пост автора', self.follow_content(self.reader_client)
+        )
+
+    def test_follow_and_unfollow_reset_cache(self):
+        self.follow_content(self.reader_client)
+        self.reader_client.get(reverse(
+            'posts:profile_follow', args=[self.other_author.username]
+        ))
+        self.assertIn('Пост другого', self.follow_content(self.reader_client))
+        self.reader_client.get(reverse(
+            'posts:profile_unfollow', args=[self.other_author.username]
+        ))
+        self.assertNotIn(
+            'Пост другого', self.follow_content(self.reader_client)
+        )
+
+    def test_unrelated_post_keeps_cache(self):
+        """Пост автора вне подписок не сбрасывает ленту читателя."""
+        key = self.reader_client.get(
+            reverse('posts:follow_index')
+        ).context['cache_key']
+        Post.objects.create(text='Чужой пост', author=self.other_author)
+        self.assertEqual(
+            self.reader_client.get(
+                reverse('posts:follow_index')
+            ).context['cache_key'],
+            key,
+        )
+
+    def test_key_does_not_grow_with_follows(self):
+        """Ключ ленты не содержит версию каждого автора из подписок."""
+        key = self.reader_client.get(
+            reverse('posts:follow_index')
+        ).context['cache_key']
+        for number in range(5):
+            author = User.objects.create_user(f'cache_more_{number}')
+            Follow.objects.create(user=self.reader, author=author)
+        new_key = self.reader_client.get(
+            reverse('posts:follow_index')
+        ).context['cache_key']
+        self.assertNotEqual(new_key, key)
+        self.assertEqual(len(new_key), len(key))
+
+    def test_popular_author_post_resets_cache(self):
+        """Посты автора без раздачи сбрасывают ленту версией профиля."""
+        with mock.patch('posts.feed.FEED_FANOUT_LIMIT', 1):
+            self.follow_content(self.reader_client)
+            Post.objects.create(text='Популярный пост', author=self.author)
+            self.assertIn(
+                'Популярный пост', self.follow_content(self.reader_client)
+            )
+
+    def test_pages_cached_separately(self):
+        for i in range(POST_ON_PEGE):
+            Post.objects.create(text=f'Лента {i}', author=self.author)
+        first = self.follow_content(self.reader_client)
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        cursor = response.context['page_obj'].paginator.next_cursor
+        second = self.follow_content(self.reader_client, cursor=cursor)
+        self.assertNotIn('Лента 9', second)
+        self.assertIn('Лента 9', first)
+
+    def test_comment_keeps_follow_cache(self):
+        """Комментарий не обходит подписчиков автора поста."""
+        key = self.reader_client.get(
+            reverse('posts:follow_index')
+        ).context['cache_key']
+        with mock.patch('posts.feed.fanout_followers') as fanout_followers:
+            Comment.objects.create(
+                text='Комментарий', author=self.other_reader,
+                post=Post.objects.filter(author=self.author).first(),
+            )
+        fanout_followers.assert_not_called()
+        self.assertEqual(
+            self.reader_client.get(
+                reverse('posts:follow_index')
+            ).context['cache_key'],
+            key,
+        )
+
+    def test_deep_pages_not_cached(self):
+        """Курсор из адреса не заводит новых ключей в кэше."""
+        response = self.reader_client.get(reverse('posts:follow_index'))
+        self.assertEqual(response.context['cache_using'], FRAGMENT_CACHE)
+        key = response.context['cache_key']
+        for params in ({'cursor': 'придуманный'}, {'page': 2}):
+            with self.subTest(params=params):
+                response = self.reader_client.get(
+                    reverse('posts:follow_index'), params
+                )
+                self.assertEqual(
+                    response.context['cache_using'], DEEP_PAGE_CACHE
+                )
+                self.assertEqual(response.context['cache_key'], key)
@@ -1,3 +1,6 @@
+from unittest import mock
+
+from django.db import DatabaseError
 from django.test import TestCase, Client
 from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
@@ -65,7 +68,11 @@ class PostFormTests(TestCase):
         self.assertEqual(post_new.text, form_data['text'])
         self.assertEqual(post_new.author, PostFormTests.user)
         self.assertEqual(post_new.group, PostFormTests.group)
-        self.assertEqual(post_new.image, 'posts/' + uploaded.name)
+        # Картинка перекодируется при загрузке (posts.images) и
+        # хранится под хэшем содержимого (core.storage).
+        self.assertRegex(
+            post_new.image.name, r'^posts/(\w\w/){2}[0-9a-f]{64}\.jpg$'
+        )
 
     def test_edit_post(self):
         """Проверка, редактируется ли пост."""
@@ -89,6 +96,16 @@ class PostFormTests(TestCase):
         self.assertEqual(post.group, self.group2)
         self.assertEqual(post.author, self.user)
 
+    def test_edit_is_atomic(self):
+        """Ошибка в сигналах откатывает и само изменение поста."""
+        url = reverse('posts:post_edit', args=[self.post.pk])
+        with mock.patch('posts.signals.search.index_post',
+                        side_effect=DatabaseError('сбой')):
+            with self.assertRaises(DatabaseError):
+                self.authorized_client.post(url, {'text': 'Не сохранится'})
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.text, 'Пост с текстом')
+
     def test_comment_for_authorized_user(self):
         """Тест создания комментария авторизованным пользователем"""
         comments = list(Comment.objects.values_list('id', flat=True))
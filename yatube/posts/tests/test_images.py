@@ -0,0 +1,152 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import ValidationError
+from django.core.files.storage import default_storage
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import images, live
+from ..models import Post, User
+from ..thumbnails import thumbnail_name
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_upload(size=(3000, 1500), mode='RGB', image_format='JPEG',
+                name='photo.jpg', **options):
+    buffer = BytesIO()
+    Image.new(mode, size, 'red').save(buffer, image_format, **options)
+    return SimpleUploadedFile(name, buffer.getvalue())
+
+
+def with_exif():
+    exif = Image.Exif()
+    # Orientation: повернуть на 90 градусов; Make: модель камеры.
+    exif[0x0112] = 6
+    exif[0x010F] = 'Камера'
+    return {'exif': exif.tobytes()}
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POST_IMAGE_MAX_SIZE=1000,
+                   POST_IMAGE_FORMAT='JPEG', POST_THUMBNAIL_WORKERS=0,
+                   POST_IMAGE_ORPHAN_AGE=0)
+class ImagePipelineTests(TestCase):
+    """Тесты обработки картинок при загрузке."""
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(shutil.rmtree, TEMP_MEDIA_ROOT, True)
+        self.user = User.objects.create_user('image_author')
+        self.client.force_login(self.user)
+
+    def test_downsized_and_stripped(self):
+        processed = images.process(make_upload(**with_exif()))
+        self.assertEqual(processed.file.name, 'photo.jpg')
+        # Сначала поворот по EXIF, затем уменьшение большей стороны.
+        self.assertEqual((processed.width, processed.height), (500, 1000))
+        image = Image.open(BytesIO(processed.file.read()))
+        self.assertEqual(image.size, (500, 1000))
+        self.assertTrue(image.info.get('progressive'))
+        self.assertNotIn('exif', image.info)
+        self.assertNotIn('icc_profile', image.info)
+
+    def test_transparency_flattened(self):
+        processed = images.process(make_upload(
+            (10, 10), 'RGBA', 'PNG', 'logo.png'
+        ))
+        self.assertEqual(processed.file.name, 'logo.jpg')
+        self.assertEqual(processed.image.mode, 'RGB')
+
+    @override_settings(POST_IMAGE_FORMAT='WEBP')
+    def test_webp_falls_back_to_jpeg(self):
+        expected = 'WEBP' if images.features.check('webp') else 'JPEG'
+        self.assertEqual(images.output_format(), expected)
+
+    @override_settings(POST_IMAGE_MAX_PIXELS=100)
+    def test_too_many_pixels(self):
+        with self.assertRaises(ValidationError):
+            images.process(make_upload((20, 20)))
+
+    def test_form_rejects_broken_file(self):
+        response = self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост', 'image': SimpleUploadedFile('x.jpg', b'nope'),
+        })
+        self.assertFalse(Post.objects.filter(author=self.user).exists())
+        self.assertTrue(response.context['form'].errors['image'])
+
+    def test_upload_records_size_and_thumbnail(self):
+        callbacks = []
+        with mock.patch('posts.thumbnails.transaction.on_commit',
+                        callbacks.append):
+            self.client.post(reverse('posts:post_create'), {
+                'text': 'Пост с фото', 'image': make_upload(),
+            })
+        post = Post.objects.get(author=self.user)
+        # Миниатюра строится только после коммита.
+        self.assertFalse(default_storage.exists(
+            thumbnail_name(post.image.name)
+        ))
+        for callback in callbacks:
+            callback()
+        self.assertTrue(post.image.name.endswith('.jpg'))
+        self.assertEqual((post.image_width, post.image_height), (1000, 500))
+        self.assertTrue(default_storage.exists(
+            thumbnail_name(post.image.name)
+        ))
+        response = self.client.get(
+            reverse('posts:post_detail', args=[post.pk])
+        )
+        self.assertContains(response, 'width="1000" height="500"')
+
+    def test_process_images_command(self):
+        post = Post.objects.create(
+            text='Старый пост', author=self.user, image=make_upload()
+        )
+        original = post.image.name
+        out = StringIO()
+        call_command('process_images', stdout=out)
+        self.assertIn('Обработано картинок: 1', out.getvalue())
+        post.refresh_from_db()
+        self.assertEqual((post.image_width, post.image_height), (1000, 500))
+        self.assertFalse(default_storage.exists(original))
+        with default_storage.open(post.image.name) as f:
+            self.assertEqual(Image.open(f).size, (1000, 500))
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POST_IMAGE_MAX_SIZE=1000,
+                   POST_IMAGE_FORMAT='JPEG', POST_THUMBNAIL_WORKERS=0,
+                   LIVE_STAND_IN=False)
+class UploadCommitTests(TransactionTestCase):
+    """Настоящие хуки после коммита: миниатюра раньше живой ленты."""
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(shutil.rmtree, TEMP_MEDIA_ROOT, True)
+        self.user = User.objects.create_user('commit_author')
+        self.client.force_login(self.user)
+
+    def test_live_card_has_thumbnail(self):
+        subscription = live.bus.subscribe([live.FEED_CHANNEL])
+        self.addCleanup(subscription.close)
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'Пост с фото', 'image': make_upload(),
+        })
+        post = Post.objects.get(author=self.user)
+        event = subscription.get(timeout=0)
+        self.assertEqual(event['id'], post.pk)
+        self.assertIn(thumbnail_name(post.image.name), event['html'])
+        self.assertNotIn('Изображение обрабатывается', event['html'])
+        directory, _ = thumbnail_name(post.image.name).rsplit('/', 1)
+        # Одна сборка: без копии миниатюры с суффиксом.
+        self.assertEqual(len(default_storage.listdir(directory)[1]), 1)
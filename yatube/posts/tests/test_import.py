@@ -0,0 +1,215 @@
+import json
+import os
+import shutil
+import tempfile
+from datetime import timedelta
+from io import StringIO
+
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, TransactionTestCase
+from django.utils import timezone
+
+from ..imports import import_records, missing_indexes
+from ..models import Comment, FeedEntry, Follow, Group, Post, User
+from ..search import search
+
+
+def write_lines(directory, name, lines):
+    path = os.path.join(directory, name)
+    with open(path, 'w', encoding='utf-8') as file:
+        file.writelines(lines)
+    return path
+
+
+def jsonl(*rows):
+    return [json.dumps(row, ensure_ascii=False) + '\n' for row in rows]
+
+
+class ImportTests(TestCase):
+    def setUp(self):
+        self.directory = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.directory)
+
+    def load(self, *args):
+        out = StringIO()
+        call_command('import_posts', *args, stdout=out)
+        return out.getvalue()
+
+    def test_round_trip_through_export(self):
+        author = User.objects.create_user('import_author')
+        reader = User.objects.create_user('import_reader')
+        group = Group.objects.create(
+            title='Группа', slug='import', description='Описание'
+        )
+        post = Post.objects.create(text='Пост', author=author, group=group)
+        Comment.objects.create(text='Комментарий', author=reader, post=post)
+        Follow.objects.create(user=reader, author=author)
+        out = StringIO()
+        call_command('export_posts', stdout=out)
+        path = write_lines(self.directory, 'dump.jsonl', [out.getvalue()])
+        output = self.load(path)
+        self.assertIn('строк/с', output)
+        self.assertIn('записей/с', output)
+        self.assertEqual(Post.objects.filter(group=group).count(), 2)
+        copy = Post.objects.exclude(pk=post.pk).get()
+        self.assertEqual(copy.pub_date, post.pub_date)
+        self.assertEqual(copy.author, author)
+        self.assertEqual(copy.comments.get().author, reader)
+        # Повторная подписка не создаёт дубль.
+        self.assertEqual(Follow.objects.count(), 1)
+        self.assertEqual(
+            FeedEntry.objects.filter(user=reader).count(), 2
+        )
+
+    def test_creates_missing_authors_and_groups(self):
+        path = write_lines(self.directory, 'posts.jsonl', jsonl(
+            {'model': 'post', 'id': 7, 'text': 'Первый',
+             'pub_date': '2020-01-02T03:04:05+00:00',
+             'author': 'new_author', 'group': 'new-group', 'image': ''},
+            {'model': 'post', 'id': 8, 'text': 'Второй',
+             'pub_date': None, 'author': 'new_author', 'group': None},
+            {'model': 'comment', 'id': 1, 'post': 7,
+             'author': 'commenter', 'text': 'Ответ', 'created': None},
+            {'model': 'comment', 'id': 2, 'post': 999,
+             'author': 'commenter', 'text': 'Потерянный', 'created': None},
+            {'model': 'follow', 'id': 1, 'user': 'commenter',
+             'author': 'new_author', 'created': None},
+        ))
+        output = self.load(path, '--batch-size', '1')
+        self.assertIn('comment: загружено 1, пропущено 1', output)
+        author = User.objects.get(username='new_author')
+        self.assertFalse(author.has_usable_password())
+        first = Post.objects.get(text='Первый')
+        self.assertEqual(first.group.slug, 'new-group')
+        self.assertEqual(first.pub_date.year, 2020)
+        self.assertIsNone(Post.objects.get(text='Второй').group)
+        self.assertEqual(first.comments.get().text, 'Ответ')
+        self.assertEqual(
+            author.following.get().user.username, 'commenter'
+        )
+
+    def test_keep_ids(self):
+        path = write_lines(self.directory, 'posts.jsonl', jsonl(
+            {'model': 'post', 'id': 42, 'text': 'Пост',
+             'pub_date': None, 'author': 'keeper', 'group': None},
+        ))
+        self.load(path, '--keep-ids')
+        self.assertTrue(Post.objects.filter(pk=42).exists())
+        # Второй прогон не падает на занятом id.
+        self.load(path, '--keep-ids')
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_keep_ids_collision(self):
+        """Занятый id пропускается, комментарии не уходят к чужому посту."""
+        owner = User.objects.create_user('owner')
+        existing = Post.objects.create(text='Свой пост', author=owner)
+        path = write_lines(self.directory, 'posts.jsonl', jsonl(
+            {'model': 'post', 'id': existing.pk, 'text': 'Чужой пост',
+             'pub_date': None, 'author': 'keeper', 'group': None},
+            {'model': 'post', 'id': existing.pk + 1, 'text': 'Новый пост',
+             'pub_date': None, 'author': 'keeper', 'group': None},
+            {'model': 'comment', 'id': 1, 'post': existing.pk,
+             'author': 'commenter', 'text': 'К чужому', 'created': None},
+            {'model': 'comment', 'id': 2, 'post': existing.pk + 1,
+             'author': 'commenter', 'text': 'К новому', 'created': None},
+        ))
+        output = self.load(path, '--keep-ids')
+        self.assertIn('post: загружено 1, пропущено 1', output)
+        self.assertIn('comment: загружено 1, пропущено 1', output)
+        self.assertEqual(Post.objects.get(pk=existing.pk).text, 'Свой пост')
+        self.assertFalse(existing.comments.exists())
+        self.assertEqual(
+            Post.objects.get(pk=existing.pk + 1).comments.get().text,
+            'К новому',
+        )
+
+    def test_derived_data_rebuilt_after_failure(self):
+        author = User.objects.create_user('broken_author')
+        reader = User.objects.create_user('broken_reader')
+        Follow.objects.create(user=reader, author=author)
+        records = [
+            ('post', {'id': 1, 'text': 'Успел', 'pub_date': None,
+                      'author': 'broken_author', 'group': None}),
+            ('post', {'id': 2, 'text': 'Сломан', 'pub_date': 'вчера',
+                      'author': 'broken_author', 'group': None}),
+        ]
+        with self.assertRaises(ValueError):
+            import_records(records, batch_size=1, defer_indexes=False)
+        self.assertTrue(
+            FeedEntry.objects.filter(user=reader, post__text='Успел').exists()
+        )
+
+    def test_rebuild_limited_to_imported(self):
+        """Посты вне файла не переиндексируются и не раздаются заново."""
+        author = User.objects.create_user('untouched')
+        reader = User.objects.create_user('untouched_reader')
+        Follow.objects.create(user=reader, author=author)
+        # bulk_create мимо сигналов: поста нет ни в ленте, ни в поиске.
+        Post.objects.bulk_create([Post(text='Забытый', author=author)])
+        import_records([
+            ('post', {'id': 1, 'text': 'Загруженный', 'pub_date': None,
+                      'author': 'imported_author', 'group': None}),
+        ], defer_indexes=False)
+        self.assertTrue(search('Загруженный').exists())
+        self.assertFalse(search('Забытый').exists())
+        self.assertFalse(FeedEntry.objects.filter(user=reader).exists())
+
+    def test_csv(self):
+        User.objects.create_user('csv_author')
+        path = write_lines(self.directory, 'posts.csv', [
+            'id,text,pub_date,author,group,image\n',
+            '1,"Текст, с запятой",2021-05-06 07:08:09,csv_author,,\n',
+        ])
+        self.load(path, '--model', 'post')
+        post = Post.objects.get()
+        self.assertEqual(post.text, 'Текст, с запятой')
+        self.assertEqual(post.author.username, 'csv_author')
+        self.assertLess(post.pub_date, timezone.now() - timedelta(days=1))
+        with self.assertRaises(CommandError):
+            self.load(path)
+
+
+class DeferredIndexTests(TransactionTestCase):
+    def records(self, seen):
+        """Одна строка поста; отмечает индексы, снятые на время загрузки."""
+        seen.extend(index.name for index in missing_indexes(Post))
+        yield 'post', {'id': 1, 'text': 'Пост', 'pub_date': None,
+                       'author': 'indexed', 'group': None}
+
+    def test_indexes_restored(self):
+        with tempfile.TemporaryDirectory() as directory:
+            path = write_lines(directory, 'posts.jsonl', jsonl(
+                {'model': 'post', 'id': 1, 'text': 'Пост',
+                 'pub_date': None, 'author': 'indexed', 'group': None},
+            ))
+            call_command('import_posts', path, stdout=StringIO())
+        with connection.cursor() as cursor:
+            indexes = connection.introspection.get_constraints(
+                cursor, Post._meta.db_table
+            )
+        for index in Post._meta.indexes:
+            self.assertIn(index.name, indexes)
+        self.assertEqual(Post.objects.count(), 1)
+
+    def test_empty_table_only(self):
+        seen = []
+        import_records(self.records(seen))
+        self.assertEqual(
+            sorted(seen), sorted(index.name for index in Post._meta.indexes)
+        )
+        seen.clear()
+        import_records(self.records(seen))
+        self.assertEqual(seen, [])
+        self.assertEqual(missing_indexes(Post), [])
+
+    def test_lost_indexes_rebuilt(self):
+        """Индекс, потерянный оборванной загрузкой, строится заново."""
+        Post.objects.create(
+            text='Пост', author=User.objects.create_user('existing')
+        )
+        index = Post._meta.indexes[0]
+        with connection.schema_editor() as editor:
+            editor.remove_index(Post, index)
+        import_records(self.records([]))
+        self.assertEqual(missing_indexes(Post), [])
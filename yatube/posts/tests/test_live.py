@@ -0,0 +1,208 @@
+import asyncio
+import json
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import PermissionDenied
+from django.core.wsgi import get_wsgi_application
+from django.http import Http404
+from django.test import Client, TestCase, override_settings
+from django.urls import reverse
+
+from core.asgi import ASGIHandler
+
+from .. import live
+from ..models import Follow, Group, Post, User
+
+
+def event_data(chunk):
+    """Данные события SSE из куска потока."""
+    lines = chunk.decode().splitlines()
+    data = [line[len('data: '):] for line in lines
+            if line.startswith('data: ')]
+    return json.loads(data[0])
+
+
+@override_settings(LIVE_ENABLED=True, LIVE_STAND_IN=False,
+                   LIVE_HEARTBEAT=0.05)
+class LiveFeedTests(TestCase):
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('live_author')
+        cls.reader = User.objects.create_user('live_reader')
+        cls.group = Group.objects.create(
+            title='Группа', slug='live', description='Описание'
+        )
+        Follow.objects.create(user=cls.reader, author=cls.author)
+
+    def subscribe(self, channels):
+        subscription = live.bus.subscribe(channels)
+        self.addCleanup(subscription.close)
+        return subscription
+
+    def test_bus_delivers_by_channel_once(self):
+        feed = self.subscribe([live.FEED_CHANNEL, live.author_channel(1)])
+        group = self.subscribe([live.group_channel(1)])
+        live.bus.publish([
+            (live.FEED_CHANNEL, {'id': 1}),
+            (live.author_channel(1), {'id': 1}),
+        ])
+        self.assertEqual(feed.get(0), {'id': 1})
+        self.assertIsNone(feed.get(0))
+        self.assertIsNone(group.get(0))
+
+    def test_closed_subscription_gets_nothing(self):
+        subscription = live.bus.subscribe([live.FEED_CHANNEL])
+        subscription.close()
+        self.assertEqual(live.bus.deliver([(live.FEED_CHANNEL, {})]), 0)
+
+    def test_publish_post_renders_variants(self):
+        feed = self.subscribe([live.FEED_CHANNEL])
+        group = self.subscribe([live.group_channel(self.group.pk)])
+        follow = self.subscribe(
+            live.page_channels(self.reader, 'follow')
+        )
+        post = Post.objects.create(
+            text='Живой пост', author=self.author, group=self.group
+        )
+        self.assertEqual(live.publish_post(post.pk), 3)
+        group_url = reverse('posts:group_list', args=[self.group.slug])
+        feed_event = feed.get(0)
+        self.assertEqual(feed_event['id'], post.pk)
+        self.assertIn('Живой пост', feed_event['html'])
+        self.assertIn(group_url, feed_event['html'])
+        self.assertNotIn(group_url, group.get(0)['html'])
+        self.assertEqual(follow.get(0)['id'], post.pk)
+
+    def test_page_channels(self):
+        self.assertEqual(
+            live.page_channels(None, 'group', 'live'),
+            [live.group_channel(self.group.pk)],
+        )
+        with self.assertRaises(Http404):
+            live.page_channels(None, 'group', 'missing')
+        with self.assertRaises(PermissionDenied):
+            live.page_channels(None, 'follow')
+
+    def test_wsgi_stream(self):
+        response = Client().get(reverse('posts:live_index'))
+        self.assertTrue(response.streaming)
+        self.assertEqual(
+            response['Content-Type'], 'text/event-stream; charset=utf-8'
+        )
+        chunks = iter(response.streaming_content)
+        self.assertTrue(next(chunks).startswith(b'retry:'))
+        self.assertEqual(next(chunks), live.HEARTBEAT)
+        post = Post.objects.create(text='Пост в поток', author=self.author)
+        live.publish_post(post.pk)
+        self.assertEqual(event_data(next(chunks))['id'], post.pk)
+        response.close()
+        self.assertFalse(live.bus.subscriptions)
+
+    @override_settings(LIVE_WSGI_LIFETIME=0.1)
+    def test_wsgi_stream_ends(self):
+        """Под WSGI поток не держит поток сервера дольше срока."""
+        response = Client().get(reverse('posts:live_index'))
+        chunks = list(response.streaming_content)
+        self.assertTrue(chunks[0].startswith(b'retry:'))
+        self.assertFalse(live.bus.subscriptions)
+
+    @override_settings(LIVE_ENABLED=False)
+    def test_disabled_by_default(self):
+        response = Client().get(reverse('posts:index'))
+        self.assertNotContains(response, reverse('posts:live_index'))
+        response = Client().get(reverse('posts:live_index'))
+        self.assertEqual(response.status_code, 404)
+
+    def test_follow_stream_requires_login(self):
+        response = Client().get(reverse('posts:live_follow'))
+        self.assertEqual(response.status_code, 403)
+
+    def test_pages_listen_on_first_page_only(self):
+        response = Client().get(reverse('posts:index'))
+        self.assertContains(response, reverse('posts:live_index'))
+        response = Client().get(reverse('posts:index'), {'page': 2})
+        self.assertNotContains(response, reverse('posts:live_index'))
+
+    def test_relay_delivers_other_processes_events(self):
+        relay = live.Relay()
+        relay.poll()
+        subscription = self.subscribe([live.FEED_CHANNEL])
+        relay.store([(live.FEED_CHANNEL, {'id': 1})])
+        cache = caches['shared']
+        sequence = cache.incr(live.RELAY_SEQUENCE_KEY)
+        cache.set(live.RELAY_EVENT_KEY.format(sequence),
+                  ('другой процесс', [(live.FEED_CHANNEL, {'id': 2})]))
+        self.assertEqual(relay.poll(), 1)
+        self.assertEqual(subscription.get(0), {'id': 2})
+        self.assertIsNone(subscription.get(0))
+
+    def test_relay_waits_for_event_behind_sequence(self):
+        """Номер, опубликованный раньше события, не теряется."""
+        relay = live.Relay()
+        relay.poll()
+        subscription = self.subscribe([live.FEED_CHANNEL])
+        cache = caches['shared']
+        cache.add(live.RELAY_SEQUENCE_KEY, 0, timeout=None)
+        sequence = cache.incr(live.RELAY_SEQUENCE_KEY)
+        self.assertEqual(relay.poll(), 0)
+        cache.set(live.RELAY_EVENT_KEY.format(sequence),
+                  ('другой процесс', [(live.FEED_CHANNEL, {'id': 3})]))
+        self.assertEqual(relay.poll(), 1)
+        self.assertEqual(subscription.get(0), {'id': 3})
+        self.assertFalse(relay.pending)
+
+    def test_asgi_user_checks_session_hash(self):
+        """Под ASGI сессия после смены пароля не открывает подписки."""
+        client = Client()
+        client.force_login(self.reader)
+        cookie = client.cookies[settings.SESSION_COOKIE_NAME].OutputString()
+        scope = {'headers': [(b'cookie', cookie.encode())]}
+        self.assertEqual(live._scope_user(scope), self.reader)
+        reader = User.objects.get(pk=self.reader.pk)
+        reader.set_password('новый пароль')
+        reader.save()
+        with self.assertRaises(PermissionDenied):
+            live._scope_channels(scope, 'follow', None)
+
+    def test_asgi_stream(self):
+        """Под ASGI поток обслуживается в цикле событий."""
+        application = ASGIHandler(get_wsgi_application(), 1)
+        self.addCleanup(application.executor.shutdown)
+        scope = {
+            'type': 'http', 'method': 'GET', 'path': '/live/',
+            'query_string': b'', 'headers': [],
+        }
+        messages = []
+
+        async def run():
+            disconnect = asyncio.Event()
+
+            async def receive():
+                await disconnect.wait()
+                return {'type': 'http.disconnect'}
+
+            async def send(message):
+                messages.append(message)
+                if b'event: post' in message.get('body', b''):
+                    disconnect.set()
+
+            task = asyncio.create_task(application(scope, receive, send))
+            while len(messages) < 2:
+                await asyncio.sleep(0.01)
+            live.bus.deliver([(live.FEED_CHANNEL, {'id': 7, 'html': ''})])
+            await asyncio.wait_for(task, 5)
+
+        asyncio.run(run())
+        self.assertEqual(messages[0]['status'], 200)
+        self.assertIn(
+            (b'content-type', b'text/event-stream; charset=utf-8'),
+            messages[0]['headers'],
+        )
+        events = [
+            message['body'] for message in messages[1:]
+            if message['body'].startswith(b'id:')
+        ]
+        self.assertEqual(event_data(events[0])['id'], 7)
+        self.assertFalse(live.bus.subscriptions)
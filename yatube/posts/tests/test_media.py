@@ -0,0 +1,117 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from .. import media
+from ..models import Post, User
+from ..thumbnails import thumbnail_name
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_upload(color='red', name='repost.png'):
+    buffer = BytesIO()
+    Image.new('RGB', (40, 30), color).save(buffer, 'PNG')
+    return ContentFile(buffer.getvalue(), name=name)
+
+
+def run_on_commit(callback):
+    callback()
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POST_THUMBNAIL_WORKERS=0,
+                   POST_IMAGE_ORPHAN_AGE=0)
+@mock.patch('posts.signals.transaction',
+            mock.Mock(on_commit=run_on_commit))
+@mock.patch('posts.thumbnails.transaction',
+            mock.Mock(on_commit=run_on_commit))
+class ContentAddressedMediaTests(TestCase):
+    """Тесты хранения картинок по содержимому и подсчёта ссылок."""
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(shutil.rmtree, TEMP_MEDIA_ROOT, True)
+        self.user = User.objects.create_user('media_author')
+        self.client.force_login(self.user)
+
+    def create(self, upload):
+        self.client.post(reverse('posts:post_create'), {
+            'text': 'Репост', 'image': upload,
+        })
+        return Post.objects.filter(author=self.user).latest('pk')
+
+    def test_same_content_stored_once(self):
+        first = self.create(make_upload(name='a.png'))
+        second = self.create(make_upload(name='b.png'))
+        self.assertEqual(first.image.name, second.image.name)
+        self.assertRegex(first.image.name, r'^posts/\w\w/\w\w/\w{64}\.jpg$')
+        self.assertEqual(media.reference_count(first.image.name), 2)
+        self.assertEqual(len(list(media.stored_names('posts'))), 1)
+        self.assertTrue(default_storage.exists(
+            thumbnail_name(first.image.name)
+        ))
+
+    def test_file_removed_with_last_reference(self):
+        first = self.create(make_upload())
+        second = self.create(make_upload())
+        name = first.image.name
+        first.delete()
+        self.assertTrue(media.get_storage().exists(name))
+        second.delete()
+        self.assertFalse(media.get_storage().exists(name))
+        self.assertFalse(default_storage.exists(thumbnail_name(name)))
+
+    def test_edit_releases_old_image(self):
+        post = self.create(make_upload('red'))
+        old_name = post.image.name
+        self.client.post(reverse('posts:post_edit', args=[post.pk]), {
+            'text': 'Новая картинка', 'image': make_upload('blue'),
+        })
+        post.refresh_from_db()
+        self.assertNotEqual(post.image.name, old_name)
+        self.assertFalse(media.get_storage().exists(old_name))
+
+    @override_settings(POST_IMAGE_ORPHAN_AGE=60)
+    def test_locked_file_kept(self):
+        """Файл, который сейчас переиспользуют, не удаляется."""
+        post = self.create(make_upload())
+        name = post.image.name
+        post.delete()
+        with override_settings(POST_IMAGE_ORPHAN_AGE=0):
+            with media.get_storage().lock(name):
+                self.assertFalse(media.release(name))
+            self.assertTrue(media.get_storage().exists(name))
+            self.assertTrue(media.release(name))
+
+    @override_settings(POST_IMAGE_ORPHAN_AGE=60)
+    def test_recent_orphan_kept_until_sweep(self):
+        post = self.create(make_upload())
+        name = post.image.name
+        post.delete()
+        self.assertTrue(media.get_storage().exists(name))
+        with override_settings(POST_IMAGE_ORPHAN_AGE=0):
+            out = StringIO()
+            call_command('clean_media', stdout=out)
+        self.assertIn('Удалено файлов без ссылок: 1', out.getvalue())
+        self.assertFalse(media.get_storage().exists(name))
+
+    def test_foreign_path_ignored(self):
+        post = Post.objects.create(
+            text='Чужой путь', author=self.user, image='/tmp/none.jpg'
+        )
+        self.assertFalse(media.release(post.image.name))
+        post.delete()
@@ -0,0 +1,117 @@
+from contextlib import nullcontext
+from io import StringIO
+from unittest import mock
+
+from django.core.cache import cache
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..caching import FEED_SCOPE, VERSION_KEY
+from ..constants import POST_ON_PEGE
+from ..models import Comment, Follow, Group, Post, User
+from ..stats import recount_all
+from .utils import QueryBudgetMixin
+
+# Бюджеты запросов на страницу при пустом кэше: сессия и пользователь,
+# объекты страницы, счётчики, сама лента. От числа постов не зависят.
+QUERY_BUDGETS = {
+    'posts:index': 3,
+    'posts:group_list': 4,
+    'posts:profile': 6,
+    'posts:post_detail': 6,
+    'posts:follow_index': 4,
+}
+
+
+class QueryBudgetTests(QueryBudgetMixin, TestCase):
+    """Страницы с постами не делают запрос на каждую запись."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.reader = User.objects.create_user('budget_reader')
+        cls.group = Group.objects.create(
+            title='Группа',
+            slug='budget',
+            description='Описание',
+        )
+        authors = [
+            User.objects.create_user(f'budget_author_{i}') for i in range(3)
+        ]
+        for author in authors:
+            Follow.objects.create(user=cls.reader, author=author)
+        cls.post = None
+        for i in range(POST_ON_PEGE * 2):
+            cls.post = Post.objects.create(
+                text=f'Пост {i}',
+                author=authors[i % len(authors)],
+                group=cls.group,
+            )
+        for author in authors:
+            Comment.objects.create(
+                text='Комментарий', author=author, post=cls.post
+            )
+        recount_all()
+
+    def setUp(self):
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_views_within_budget(self):
+        """Каждая страница укладывается в свой бюджет запросов."""
+        urls = {
+            'posts:index': reverse('posts:index'),
+            'posts:group_list': reverse(
+                'posts:group_list', args=[self.group.slug]
+            ),
+            'posts:profile': reverse(
+                'posts:profile', args=[self.post.author.username]
+            ),
+            'posts:post_detail': reverse(
+                'posts:post_detail', args=[self.post.pk]
+            ),
+            'posts:follow_index': reverse('posts:follow_index'),
+        }
+        for name, url in urls.items():
+            with self.subTest(view=name):
+                self.assertQueryBudget(
+                    self.reader_client, url, QUERY_BUDGETS[name]
+                )
+
+
+# Тест уже идёт в отдельной базе: вторую команда не создаёт.
+@mock.patch(
+    'posts.management.commands.audit_query_plans.scratch_database',
+    nullcontext,
+)
+class QueryPlanAuditTests(TestCase):
+    """Запросы страниц идут по индексам, а не полным просмотром."""
+    def test_audit_query_plans(self):
+        posts_before = Post.objects.count()
+        versions = cache.get_many([VERSION_KEY.format(FEED_SCOPE)])
+        out = StringIO()
+        call_command(
+            'audit_query_plans', users=40, groups=4, posts=600,
+            comments=300, follows=200, stdout=out,
+        )
+        self.assertNotIn('FAIL', out.getvalue())
+        for name in ('post_search', 'get_pulled_authors',
+                     'follow_index pull [1]', 'comment_list (new)'):
+            self.assertIn(f'[ok] {name}\n', out.getvalue())
+        self.assertEqual(Post.objects.count(), posts_before)
+        # Наполнение не сбрасывает фрагменты рабочего кэша.
+        self.assertEqual(
+            cache.get_many([VERSION_KEY.format(FEED_SCOPE)]), versions
+        )
+
+    def test_audit_without_follows(self):
+        """Без подписок их планы пропускаются, а не роняют команду."""
+        Follow.objects.all().delete()
+        out = StringIO()
+        call_command(
+            'audit_query_plans', users=10, groups=2, posts=100,
+            comments=50, follows=0, stdout=out,
+        )
+        self.assertIn('Нет подписок', out.getvalue())
+        self.assertNotIn('] follow_index', out.getvalue())
+        self.assertIn('] profile', out.getvalue())
@@ -0,0 +1,107 @@
+from importlib import import_module
+from unittest import mock
+
+from django.apps import apps
+from django.db import connection
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..constants import POST_ON_PEGE
+from ..models import Post, SearchTerm, User
+from ..search import search, tokenize
+
+
+class SearchTests(TestCase):
+    """Тесты полнотекстового поиска."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.user = User.objects.create_user('search_author')
+
+    def setUp(self):
+        self.cat_post = Post.objects.create(
+            text='Кошки любят спать. Кошка спит весь день.',
+            author=self.user,
+        )
+        self.dog_post = Post.objects.create(
+            text='Собака гуляет, а кошку не видно.',
+            author=self.user,
+        )
+
+    def found(self, query):
+        response = self.client.get(reverse('posts:post_search'), {'q': query})
+        return list(response.context['page_obj'])
+
+    def test_tokenize(self):
+        """Слова приводятся к основе, стоп-слова отброшены."""
+        self.assertEqual(tokenize('Кошки и КОШКАМИ'), ['кошк', 'кошк'])
+        self.assertEqual(tokenize('Ёлка'), ['елк'])
+
+    def test_search_ranks_results(self):
+        """Пост с большим числом совпадений выше в выдаче."""
+        self.assertEqual(self.found('кошка'), [self.cat_post, self.dog_post])
+        self.assertEqual(self.found('собаки'), [self.dog_post])
+        self.assertEqual(self.found('кошки собаки'), [self.dog_post])
+        self.assertEqual(self.found(''), [])
+
+    def test_index_follows_edits(self):
+        """Правка и удаление поста обновляют индекс."""
+        self.dog_post.text = 'Попугай'
+        self.dog_post.save()
+        self.assertEqual(self.found('собака'), [])
+        self.assertEqual(self.found('попугай'), [self.dog_post])
+        self.dog_post.delete()
+        self.assertEqual(self.found('попугай'), [])
+
+    def test_search_pagination(self):
+        """Выдача листается курсором и сохраняет запрос в ссылках."""
+        for i in range(POST_ON_PEGE):
+            Post.objects.create(text=f'Кошка номер {i}', author=self.user)
+        url = reverse('posts:post_search')
+        response = self.client.get(url, {'q': 'кошка'})
+        paginator = response.context['page_obj'].paginator
+        self.assertIn('q=', paginator.next_query)
+        response = self.client.get(
+            url, {'q': 'кошка', 'cursor': paginator.next_cursor}
+        )
+        next_page = response.context['page_obj']
+        seen = set(paginator.items) | set(next_page)
+        self.assertEqual(len(seen), POST_ON_PEGE + 2)
+
+    def test_table_backend(self):
+        """Без FTS5 поиск идёт по таблице SearchTerm."""
+        with mock.patch('posts.search.use_fts', return_value=False):
+            post = Post.objects.create(
+                text='Кошки и кошки', author=self.user
+            )
+            self.assertEqual(
+                SearchTerm.objects.get(post=post, term='кошк').weight, 2
+            )
+            self.assertEqual(list(search('кошки')), [post])
+
+    def test_migration_fills_terms_without_fts(self):
+        """Без FTS5 миграция заполняет SearchTerm, в том числе на SQLite."""
+        migration = import_module('posts.migrations.0011_auto_20261018_0345')
+        SearchTerm.objects.all().delete()
+        with mock.patch.object(
+            migration, 'create_fts_table', return_value=False
+        ):
+            migration.fill_search_index(
+                apps, mock.Mock(connection=connection)
+            )
+        self.assertEqual(
+            SearchTerm.objects.get(post=self.cat_post, term='кошк').weight, 2
+        )
+        self.assertTrue(
+            SearchTerm.objects.filter(post=self.dog_post).exists()
+        )
+
+    def test_admin_uses_index(self):
+        """Поиск в админке идёт через индекс."""
+        admin = User.objects.create_superuser('admin', 'a@a.ru', 'pass')
+        client = Client()
+        client.force_login(admin)
+        response = client.get('/admin/posts/post/', {'q': 'собаки'})
+        self.assertEqual(
+            list(response.context['cl'].result_list), [self.dog_post]
+        )
@@ -0,0 +1,107 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import Client, TestCase
+from django.urls import reverse
+
+from ..models import Comment, Follow, Post, User, UserStats
+from ..stats import get_stats
+
+
+class StatsTests(TestCase):
+    """Тесты денормализованных счётчиков."""
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.author = User.objects.create_user('stats_author')
+        cls.reader = User.objects.create_user('stats_reader')
+        cls.post = Post.objects.create(text='Пост', author=cls.author)
+
+    def setUp(self):
+        self.author = User.objects.get(pk=self.author.pk)
+        self.reader = User.objects.get(pk=self.reader.pk)
+        self.reader_client = Client()
+        self.reader_client.force_login(self.reader)
+
+    def test_stats_created_with_user(self):
+        """Строка счётчиков заводится вместе с пользователем."""
+        stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 0)
+
+    def test_read_does_not_write(self):
+        """Без строки счётчики считаются на лету и не сохраняются."""
+        UserStats.objects.filter(user=self.author).delete()
+        author = User.objects.get(pk=self.author.pk)
+        self.assertEqual(get_stats(author).posts_count, 1)
+        self.assertFalse(UserStats.objects.filter(user=author).exists())
+
+    def test_counter_does_not_go_negative(self):
+        """Разошедшийся счётчик при уменьшении упирается в ноль."""
+        UserStats.objects.filter(user=self.reader).update(comments_count=0)
+        comment = Comment.objects.create(
+            text='Комментарий', author=self.reader, post=self.post
+        )
+        UserStats.objects.filter(user=self.reader).update(comments_count=0)
+        comment.delete()
+        self.assertEqual(
+            UserStats.objects.get(user=self.reader).comments_count, 0
+        )
+
+    def test_counters_follow_writes(self):
+        """Счётчики двигаются вместе с записями."""
+        get_stats(self.author)
+        get_stats(self.reader)
+        self.reader_client.get(
+            reverse('posts:profile_follow', args=[self.author.username])
+        )
+        self.reader_client.post(
+            reverse('posts:add_comment', args=[self.post.pk]),
+            {'text': 'Комментарий'},
+        )
+        Post.objects.create(text='Ещё пост', author=self.author)
+        author_stats = UserStats.objects.get(user=self.author)
+        reader_stats = UserStats.objects.get(user=self.reader)
+        self.assertEqual(author_stats.posts_count, 2)
+        self.assertEqual(author_stats.followers_count, 1)
+        self.assertEqual(reader_stats.following_count, 1)
+        self.assertEqual(reader_stats.comments_count, 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 1)
+
+        self.reader_client.get(
+            reverse('posts:profile_unfollow', args=[self.author.username])
+        )
+        Comment.objects.filter(author=self.reader).delete()
+        author_stats.refresh_from_db()
+        reader_stats.refresh_from_db()
+        self.post.refresh_from_db()
+        self.assertEqual(author_stats.followers_count, 0)
+        self.assertEqual(reader_stats.following_count, 0)
+        self.assertEqual(reader_stats.comments_count, 0)
+        self.assertEqual(self.post.comment_count, 0)
+
+    def test_profile_reads_stats(self):
+        """Профиль показывает счётчики без COUNT по постам и подпискам."""
+        get_stats(self.author)
+        with self.assertNumQueries(3):
+            response = self.client.get(
+                reverse('posts:profile', args=[self.author.username])
+            )
+        self.assertContains(response, 'Постов у автора: 1')
+
+    def test_recount_repairs_drift(self):
+        """Команда recount_stats чинит расхождения."""
+        get_stats(self.author)
+        UserStats.objects.filter(user=self.author).update(posts_count=7)
+        Follow.objects.create(user=self.reader, author=self.author)
+        Post.objects.filter(pk=self.post.pk).update(comment_count=3)
+        out = StringIO()
+        call_command('recount_stats', stdout=out)
+        stats = UserStats.objects.get(user=self.author)
+        self.assertEqual(stats.posts_count, 1)
+        self.assertEqual(stats.followers_count, 1)
+        self.post.refresh_from_db()
+        self.assertEqual(self.post.comment_count, 0)
+        # Счётчики автора и число комментариев поста.
+        self.assertIn('Исправлено записей: 2', out.getvalue())
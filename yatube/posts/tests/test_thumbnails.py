@@ -0,0 +1,99 @@
+import shutil
+import tempfile
+from io import BytesIO, StringIO
+from unittest import mock
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.files.storage import default_storage
+from django.core.management import call_command
+from django.test import TestCase, override_settings
+from django.urls import reverse
+from PIL import Image
+
+from ..constants import THUMBNAIL_SIZE
+from ..models import Post, User
+from .. import thumbnails
+from ..thumbnails import generate, get_thumbnail, thumbnail_name
+
+TEMP_MEDIA_ROOT = tempfile.mkdtemp(dir=settings.BASE_DIR)
+
+
+def make_image(size=(1200, 900)):
+    buffer = BytesIO()
+    Image.new('RGB', size, 'red').save(buffer, 'JPEG')
+    return SimpleUploadedFile(
+        'big.jpg', buffer.getvalue(), content_type='image/jpeg'
+    )
+
+
+@override_settings(MEDIA_ROOT=TEMP_MEDIA_ROOT, POST_THUMBNAIL_WORKERS=0)
+class ThumbnailTests(TestCase):
+    """Тесты фоновой подготовки миниатюр."""
+    @classmethod
+    def tearDownClass(cls):
+        super().tearDownClass()
+        shutil.rmtree(TEMP_MEDIA_ROOT, ignore_errors=True)
+
+    def setUp(self):
+        cache.clear()
+        self.addCleanup(shutil.rmtree, TEMP_MEDIA_ROOT, True)
+        self.user = User.objects.create_user('thumb_author')
+        self.post = Post.objects.create(
+            text='Пост с картинкой', author=self.user, image=make_image()
+        )
+
+    def test_placeholder_until_ready(self):
+        """Пока миниатюры нет, страница показывает заглушку."""
+        self.assertIsNone(get_thumbnail(self.post))
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        self.assertContains(response, 'Изображение обрабатывается')
+        self.assertTrue(generate(self.post.image.name))
+        response = self.client.get(
+            reverse('posts:post_detail', args=[self.post.pk])
+        )
+        self.assertContains(response, thumbnail_name(self.post.image.name))
+
+    def test_thumbnail_size(self):
+        """Миниатюра обрезана по центру до размера ленты."""
+        generate(self.post.image.name)
+        with default_storage.open(thumbnail_name(self.post.image.name)) as f:
+            self.assertEqual(Image.open(f).size, THUMBNAIL_SIZE)
+        self.assertEqual(
+            get_thumbnail(self.post).width, THUMBNAIL_SIZE[0]
+        )
+
+    def test_broken_image_is_skipped(self):
+        """Битая картинка не роняет воркер."""
+        Post.objects.filter(pk=self.post.pk).update(image='posts/none.jpg')
+        with self.assertLogs('posts.thumbnails', 'WARNING'):
+            self.assertFalse(generate('posts/none.jpg'))
+
+    def test_failed_build_retried(self):
+        """Неудачная сборка из очереди повторяется, а не висит заглушкой."""
+        name = self.post.image.name
+        args = (name, self.post.pk, self.user.pk, None)
+        with mock.patch.object(thumbnails, '_retry_later') as retry_later, \
+                mock.patch.object(thumbnails, 'render',
+                                  side_effect=OSError('сбой')), \
+                self.assertLogs('posts.thumbnails', 'WARNING'):
+            self.assertFalse(generate(*args))
+            retry_later.assert_called_once_with(
+                thumbnails.RETRY_DELAY, *args, 2
+            )
+            self.assertFalse(generate(*args, thumbnails.ATTEMPTS))
+            retry_later.assert_called_once()
+        self.assertTrue(generate(*args, 2))
+        self.assertIsNotNone(get_thumbnail(self.post))
+
+    def test_warm_thumbnails_command(self):
+        """Команда warm_thumbnails строит миниатюры всех картинок."""
+        out = StringIO()
+        call_command('warm_thumbnails', workers=2, stdout=out)
+        self.assertIn('Готово миниатюр: 1', out.getvalue())
+        self.assertTrue(default_storage.exists(
+            thumbnail_name(self.post.image.name)
+        ))
@@ -4,8 +4,10 @@ from django.core.files.uploadedfile import SimpleUploadedFile
 from django.urls import reverse
 from django.core.cache import cache
 from django.core.paginator import Page
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
 
-from ..models import Post, Group, User, Follow
+from ..models import Comment, Post, Group, User, Follow
 from ..constants import POST_ON_PEGE, TEST_SECOND_PAGE
 
 
@@ -221,6 +223,48 @@ class PaginatorViewsTest(TestCase):
                 self.assertEqual(len(response.context['page_obj']),
                                  TEST_SECOND_PAGE)
 
+    def test_cursor_pages(self):
+        """Курсор ведёт на следующую страницу и обратно без COUNT."""
+        url = reverse('posts:index')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertFalse(
+            any('COUNT(' in query['sql'] for query in queries)
+        )
+        first_page = list(response.context['page_obj'])
+        paginator = response.context['page_obj'].paginator
+        self.assertFalse(paginator.has_previous_cursor)
+        self.assertTrue(paginator.has_next_cursor)
+        response = self.client.get(url, {'cursor': paginator.next_cursor})
+        second_page = list(response.context['page_obj'])
+        self.assertEqual(len(second_page), TEST_SECOND_PAGE)
+        self.assertTrue(set(first_page).isdisjoint(second_page))
+        paginator = response.context['page_obj'].paginator
+        self.assertFalse(paginator.has_next_cursor)
+        response = self.client.get(
+            url, {'cursor': paginator.previous_cursor}
+        )
+        self.assertEqual(list(response.context['page_obj']), first_page)
+
+    def test_cursor_last_page(self):
+        """Ссылка «Последняя» открывает хвост ленты."""
+        url = reverse('posts:index')
+        response = self.client.get(url)
+        last_cursor = response.context['page_obj'].paginator.last_cursor
+        response = self.client.get(url, {'cursor': last_cursor})
+        page_obj = response.context['page_obj']
+        self.assertEqual(len(page_obj), POST_ON_PEGE)
+        self.assertEqual(page_obj[POST_ON_PEGE - 1], self.post[0])
+        self.assertTrue(page_obj.paginator.has_previous_cursor)
+
+    def test_broken_cursor_gives_first_page(self):
+        """Испорченный курсор не ломает страницу."""
+        response = self.client.get(
+            reverse('posts:index'), {'cursor': 'broken!'}
+        )
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.context['page_obj']), POST_ON_PEGE)
+
 
 class FollowTests(TestCase):
     """Тесты на проверку подписок."""
@@ -312,20 +356,51 @@ class CacheViewsTest(TestCase):
         )
 
     def test_cache_index(self):
-        """Проверка хранения и очищения кэша для index."""
-        response = self.client.get(reverse('posts:index'))
-        Post.objects.create(
-            text='New post',
-            author=self.user,
-        )
-        response_old = self.client.get(reverse('posts:index'))
-        self.assertEqual(
-            response.content,
-            response_old.content
-        )
+        """Повторный запрос index отдаётся из кэша без запроса ленты."""
         cache.clear()
-        response_new = self.client.get(reverse('posts:index'))
-        self.assertNotEqual(
-            response.content,
-            response_new.content
+        response = self.client.get(reverse('posts:index'))
+        with CaptureQueriesContext(connection) as queries:
+            response_old = self.client.get(reverse('posts:index'))
+        self.assertEqual(response.content, response_old.content)
+        self.assertFalse(
+            any('posts_post' in query['sql'] for query in queries)
         )
+
+    def test_cache_invalidated_by_writes(self):
+        """Новый пост или комментарий сбрасывает фрагменты лент."""
+        urls = [
+            reverse('posts:index'),
+            reverse('posts:group_list', args=[self.group.slug]),
+            reverse('posts:profile', args=[self.user.username]),
+        ]
+        writes = {
+            'post': lambda: Post.objects.create(
+                text='Новый пост', author=self.user, group=self.group
+            ),
+            'comment': lambda: Comment.objects.create(
+                text='Комментарий', author=self.user, post=self.post
+            ),
+        }
+        for name, write in writes.items():
+            before = [self.client.get(url).content for url in urls]
+            write()
+            for url, content in zip(urls, before):
+                with self.subTest(write=name, url=url):
+                    self.assertNotEqual(self.client.get(url).content, content)
+
+    def test_cache_invalidated_by_group_rename(self):
+        """Переименование группы видно в закэшированной ленте."""
+        self.client.get(reverse('posts:index'))
+        self.group.title = 'Новое название группы'
+        self.group.save()
+        response = self.client.get(reverse('posts:index'))
+        self.assertContains(response, 'Новое название группы')
+
+    def test_cache_separates_pages(self):
+        """Разные страницы ленты кэшируются под разными ключами."""
+        for i in range(POST_ON_PEGE):
+            Post.objects.create(text=f'Пост {i}', author=self.user)
+        first = self.client.get(reverse('posts:index'))
+        second = self.client.get(reverse('posts:index'), {'page': 2})
+        self.assertNotEqual(first.content, second.content)
+        self.assertContains(second, self.post.text)
@@ -0,0 +1,19 @@
+from django.core.cache import cache
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+
+
+class QueryBudgetMixin:
+    """Проверка, что страница укладывается в заданное число запросов."""
+
+    def assertQueryBudget(self, client, url, budget):
+        cache.clear()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get(url)
+        self.assertEqual(response.status_code, 200, url)
+        if len(queries) > budget:
+            self.fail(
+                f'{url}: {len(queries)} запросов при бюджете {budget}:\n'
+                + '\n'.join(query['sql'] for query in queries)
+            )
+        return response
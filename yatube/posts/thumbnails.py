@@ -0,0 +1,177 @@
+"""Фоновая подготовка миниатюр для картинок постов.
+
+Миниатюра 960x339 кладётся в хранилище по предсказуемому пути. Для
+только что загруженной картинки она строится сразу из уже
+декодированных пикселей (posts.images), для остальных — в пуле
+потоков. Шаблон только спрашивает кэш, есть ли готовый файл, и пока
+его нет показывает заглушку, поэтому декодирование картинки не
+попадает в ответ. Фрагмент с заглушкой обновится, только когда
+миниатюра будет готова, поэтому неудачная сборка из очереди
+повторяется с растущей паузой (RETRY_DELAY, до ATTEMPTS попыток).
+"""
+import logging
+import os
+import threading
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from io import BytesIO
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.base import ContentFile
+from django.core.files.storage import default_storage
+from django.db import transaction
+from PIL import Image, ImageOps
+
+from core.storage import name_lock
+
+from . import caching
+from .constants import THUMBNAIL_QUALITY, THUMBNAIL_SIZE
+
+logger = logging.getLogger(__name__)
+
+Thumbnail = namedtuple('Thumbnail', ['url', 'width', 'height'])
+
+THUMBNAIL_KEY = 'posts:thumbnail:{}'
+PENDING_KEY = 'posts:thumbnail:pending:{}'
+PENDING_TIMEOUT = 60
+FAILED_TIMEOUT = 60 * 60
+ATTEMPTS = 3
+RETRY_DELAY = 60
+
+_executor = None
+
+
+def get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(
+            max_workers=settings.POST_THUMBNAIL_WORKERS,
+            thread_name_prefix='thumbnails',
+        )
+    return _executor
+
+
+def thumbnail_name(name):
+    width, height = THUMBNAIL_SIZE
+    root, _ = os.path.splitext(name.lstrip('/'))
+    return f'thumbnails/{width}x{height}/{root}.jpg'
+
+
+def _describe(name):
+    width, height = THUMBNAIL_SIZE
+    return Thumbnail(default_storage.url(thumbnail_name(name)), width, height)
+
+
+def render(name, image=None):
+    """Построить миниатюру картинки name, если её ещё нет.
+
+    image — уже открытая картинка; без неё файл читается из хранилища.
+    Сборка идёт под замком имени миниатюры: вторая сборка той же
+    картинки дождётся первой и не запишет копию с суффиксом.
+    """
+    target = thumbnail_name(name)
+    with name_lock(target):
+        if not default_storage.exists(target):
+            if image is None:
+                with default_storage.open(name) as source:
+                    image = ImageOps.exif_transpose(Image.open(source))
+            image = ImageOps.fit(
+                image.convert('RGB'), THUMBNAIL_SIZE, Image.LANCZOS,
+                centering=(0.5, 0.5),
+            )
+            buffer = BytesIO()
+            image.save(buffer, 'JPEG', quality=THUMBNAIL_QUALITY,
+                       optimize=True, progressive=True)
+            default_storage.save(target, ContentFile(buffer.getvalue()))
+    thumbnail = _describe(name)
+    cache.set(THUMBNAIL_KEY.format(name), thumbnail, timeout=None)
+    return thumbnail
+
+
+def _submit(*args):
+    if not settings.POST_THUMBNAIL_WORKERS:
+        return generate(*args)
+    return get_executor().submit(generate, *args)
+
+
+def _retry_later(delay, *args):
+    timer = threading.Timer(delay, _submit, args)
+    timer.daemon = True
+    timer.start()
+
+
+def generate(name, post_id=None, author_id=None, group_id=None, attempt=1):
+    """Задача воркера: миниатюра и сброс лент, где висела заглушка.
+
+    Задача из очереди (с post_id) после неудачи повторяется позже:
+    иначе закэшированная заглушка осталась бы на странице навсегда.
+    """
+    try:
+        render(name)
+    except (OSError, ValueError, SuspiciousFileOperation):
+        logger.warning('Не удалось построить миниатюру %s', name,
+                       exc_info=True)
+        if post_id is not None and attempt < ATTEMPTS:
+            delay = RETRY_DELAY * 2 ** (attempt - 1)
+            # Пока ждёт повтор, показ не ставит картинку в очередь.
+            cache.set(PENDING_KEY.format(name), True,
+                      delay + PENDING_TIMEOUT)
+            _retry_later(delay, name, post_id, author_id, group_id,
+                         attempt + 1)
+        else:
+            # Битую картинку не пересобираем на каждом показе, но через
+            # FAILED_TIMEOUT первый же показ поставит её в очередь снова.
+            cache.set(PENDING_KEY.format(name), True, FAILED_TIMEOUT)
+        return False
+    cache.delete(PENDING_KEY.format(name))
+    if post_id is not None:
+        caching.bump_post(post_id, author_id, group_id)
+    return True
+
+
+def _render_uploaded(name, image):
+    try:
+        render(name, image)
+    except (OSError, ValueError):
+        # Миниатюру соберёт очередь при первом показе (get_thumbnail).
+        logger.warning('Не удалось построить миниатюру %s', name,
+                       exc_info=True)
+
+
+def schedule(post, processed=None):
+    """Поставить миниатюру картинки поста в очередь после коммита.
+
+    С processed (images.ProcessedImage только что загруженной
+    картинки) миниатюра строится после коммита в том же запросе, без
+    повторного чтения файла. Откат или повтор транзакции
+    (retry_on_locked) не оставляет и не строит её лишний раз.
+    """
+    name = post.image.name
+    if name and processed is not None:
+        image = processed.image
+        transaction.on_commit(lambda: _render_uploaded(name, image))
+        return
+    if not name or not cache.add(
+        PENDING_KEY.format(name), True, PENDING_TIMEOUT
+    ):
+        return
+    args = (name, post.pk, post.author_id, post.group_id)
+    transaction.on_commit(lambda: _submit(*args))
+
+
+def get_thumbnail(post):
+    """Готовая миниатюра поста или None, пока она строится."""
+    name = post.image.name
+    if not name:
+        return None
+    thumbnail = cache.get(THUMBNAIL_KEY.format(name))
+    if thumbnail is not None:
+        return thumbnail
+    if default_storage.exists(thumbnail_name(name)):
+        thumbnail = _describe(name)
+        cache.set(THUMBNAIL_KEY.format(name), thumbnail, timeout=None)
+        return thumbnail
+    schedule(post)
+    return None
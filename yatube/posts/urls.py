@@ -8,12 +8,20 @@ urlpatterns = [
     path('', views.index, name='index'),
     path('group/<slug:slug>/', views.group_list, name='group_list'),
     path('profile/<str:username>/', views.profile, name='profile'),
+    path('search/', views.post_search, name='post_search'),
     path('posts/<int:post_id>/', views.post_detail, name='post_detail'),
     path('create/', views.post_create, name='post_create'),
     path('posts/<int:post_id>/edit/', views.post_edit, name='post_edit'),
+    path('posts/<int:post_id>/comments/',
+         views.comment_list, name='comment_list'),
     path('posts/<int:post_id>/comment/',
          views.add_comment, name='add_comment'),
     path('follow/', views.follow_index, name='follow_index'),
+    path('live/', views.live_stream, {'kind': 'index'}, name='live_index'),
+    path('live/group/<slug:slug>/', views.live_stream, {'kind': 'group'},
+         name='live_group'),
+    path('live/follow/', views.live_stream, {'kind': 'follow'},
+         name='live_follow'),
     path(
         'profile/<str:username>/follow/',
         views.profile_follow,
@@ -1,10 +1,285 @@
+import binascii
+import json
+from base64 import urlsafe_b64decode, urlsafe_b64encode
+
+from django.core.exceptions import FieldDoesNotExist, ValidationError
 from django.core.paginator import Paginator
+from django.db.models import Q
+from django.utils.functional import cached_property
+from django.utils.http import urlencode
+
+from .constants import (
+    CURSOR_BACKWARD, CURSOR_FORWARD, FEED_ORDERING, POST_ON_PEGE,
+)
+
+
+class KeysetWindow:
+    """Ленивая выборка одной страницы: запрос выполняется при первом
+    обращении к записям, поэтому закэшированный шаблон его не вызывает."""
+
+    def __init__(self, paginator):
+        self.paginator = paginator
+
+    def __iter__(self):
+        return iter(self.paginator.items)
+
+    def __len__(self):
+        return len(self.paginator.items)
+
+    def __getitem__(self, index):
+        return self.paginator.items[index]
+
+
+class CursorPaginator(Paginator):
+    """Постраничный вывод по ключу сортировки (по умолчанию pub_date, id).
+
+    Страница выбирается диапазонным запросом по индексу вместо
+    OFFSET и не требует COUNT(*). Позиция передаётся непрозрачным
+    токеном ?cursor=, старые ссылки ?page=N обслуживает get_page().
+    """
+
+    def __init__(self, object_list, per_page, ordering=FEED_ORDERING,
+                 query=None, transform=None, **kwargs):
+        super().__init__(object_list.order_by(*ordering), per_page, **kwargs)
+        self.ordering = ordering
+        self.fields = [field.lstrip('-') for field in ordering]
+        self.query = query or {}
+        self.transform = transform
+        self.direction = CURSOR_FORWARD
+        self.position = None
+        self.legacy_window = None
+
+    def get_cursor_page(self, token):
+        """Страница по токену курсора; битый токен даёт первую страницу."""
+        self.direction, self.position = self.decode(token)
+        return self._get_page(KeysetWindow(self), 1, self)
+
+    def page(self, number):
+        page_obj = super().page(number)
+        self.legacy_window = (
+            list(page_obj.object_list),
+            page_obj.has_previous(),
+            page_obj.has_next(),
+        )
+        page_obj.object_list = KeysetWindow(self)
+        return page_obj
+
+    @cached_property
+    def window(self):
+        """Строки страницы и признаки наличия соседних страниц."""
+        return self.legacy_window or self._fetch()
+
+    @property
+    def rows(self):
+        return self.window[0]
+
+    @cached_property
+    def items(self):
+        """Объекты страницы для шаблона."""
+        if self.transform is None:
+            return self.rows
+        return [self.transform(row) for row in self.rows]
+
+    def window_queryset(self):
+        """Запрос строк страницы и ещё одной — признака следующей."""
+        backward = self.direction == CURSOR_BACKWARD
+        queryset = self.object_list
+        if backward:
+            queryset = queryset.reverse()
+        if self.position is not None:
+            queryset = queryset.filter(self._after(self.position, backward))
+        return queryset[:self.per_page + 1]
+
+    def _window_rows(self):
+        return list(self.window_queryset())
+
+    def _fetch(self):
+        backward = self.direction == CURSOR_BACKWARD
+        rows = self._window_rows()
+        has_more = len(rows) > self.per_page
+        rows = rows[:self.per_page]
+        positioned = self.position is not None
+        if backward:
+            rows.reverse()
+            return rows, has_more, positioned
+        return rows, positioned, has_more
+
+    def _after(self, values, backward, ordering=None):
+        """Условие «строго после values» в порядке обхода.
+
+        Нестрогое сравнение по первому полю дублирует условие, но даёт
+        базе диапазон по индексу вместо объединения нескольких выборок.
+        """
+        condition, equal, bound = Q(), Q(), Q()
+        for field, value in zip(ordering or self.ordering, values):
+            name = field.lstrip('-')
+            descending = field.startswith('-') != backward
+            lookup = 'lt' if descending else 'gt'
+            if not bound:
+                bound = Q(**{f'{name}__{lookup}e': value})
+            condition |= equal & Q(**{f'{name}__{lookup}': value})
+            equal &= Q(**{name: value})
+        return bound & condition
+
+    def encode(self, direction, row=None):
+        values = None
+        if row is not None:
+            values = [
+                self._dump(self._value(row, name)) for name in self.fields
+            ]
+        raw = json.dumps([direction, values]).encode()
+        return urlsafe_b64encode(raw).decode().rstrip('=')
+
+    def decode(self, token):
+        if not token:
+            return CURSOR_FORWARD, None
+        try:
+            raw = urlsafe_b64decode(token + '=' * (-len(token) % 4))
+            direction, values = json.loads(raw.decode())
+            if direction not in (CURSOR_FORWARD, CURSOR_BACKWARD):
+                raise ValueError(direction)
+            if values is not None:
+                values = [
+                    self._load(name, value)
+                    for name, value in zip(self.fields, values)
+                ]
+                if len(values) != len(self.fields) or None in values:
+                    raise ValueError(values)
+        except (ValueError, TypeError, binascii.Error, ValidationError):
+            return CURSOR_FORWARD, None
+        return direction, values
+
+    def _load(self, name, value):
+        try:
+            field = self.object_list.model._meta.get_field(name)
+        except FieldDoesNotExist:
+            # Вычисляемое поле сортировки (например, ранг поиска).
+            if not isinstance(value, (int, float)):
+                raise ValueError(value)
+            return value
+        return field.to_python(value)
+
+    @staticmethod
+    def _value(row, name):
+        # Строки приходят моделями или словарями из .values().
+        if isinstance(row, dict):
+            return row[name]
+        return getattr(row, name)
+
+    @staticmethod
+    def _dump(value):
+        return value.isoformat() if hasattr(value, 'isoformat') else value
+
+    @property
+    def has_previous_cursor(self):
+        return self.window[1]
+
+    @property
+    def has_next_cursor(self):
+        return self.window[2]
+
+    @property
+    def previous_cursor(self):
+        if self.has_previous_cursor and self.rows:
+            return self.encode(CURSOR_BACKWARD, self.rows[0])
+        return None
+
+    @property
+    def next_cursor(self):
+        if self.has_next_cursor and self.rows:
+            return self.encode(CURSOR_FORWARD, self.rows[-1])
+        return None
+
+    @property
+    def last_cursor(self):
+        return self.encode(CURSOR_BACKWARD)
+
+    def _query_string(self, cursor=None):
+        query = dict(self.query)
+        if cursor:
+            query['cursor'] = cursor
+        return urlencode(query)
+
+    @property
+    def first_query(self):
+        return self._query_string()
+
+    @property
+    def previous_query(self):
+        return self._query_string(self.previous_cursor)
+
+    @property
+    def next_query(self):
+        return self._query_string(self.next_cursor)
+
+    @property
+    def last_query(self):
+        return self._query_string(self.last_cursor)
+
+
+class MergedCursorPaginator(CursorPaginator):
+    """Курсорная страница из нескольких источников, слитых в Python.
+
+    sources — тройки (queryset, ordering, transform): ordering
+    источника сортирует по тем же значениям, что ordering страницы, а
+    transform приводит его строки к объектам страницы. Каждый источник
+    читается своим диапазоном по индексу с LIMIT per_page + 1 вместо
+    одного запроса с OR, который сортировал бы всю выборку. Строки
+    с одинаковым pk берутся один раз. Старые ссылки ?page=N читают
+    object_list.
+    """
+
+    def __init__(self, object_list, per_page, sources, **kwargs):
+        super().__init__(object_list, per_page, **kwargs)
+        self.sources = sources
+
+    def window_querysets(self):
+        """Запросы источников: строки страницы и ещё одна в каждом."""
+        backward = self.direction == CURSOR_BACKWARD
+        querysets = []
+        for queryset, ordering, _ in self.sources:
+            queryset = queryset.order_by(*ordering)
+            if backward:
+                queryset = queryset.reverse()
+            if self.position is not None:
+                queryset = queryset.filter(
+                    self._after(self.position, backward, ordering)
+                )
+            querysets.append(queryset[:self.per_page + 1])
+        return querysets
 
-from .constants import POST_ON_PEGE
+    def _window_rows(self):
+        rows = {}
+        querysets = self.window_querysets()
+        for queryset, (_, _, transform) in zip(querysets, self.sources):
+            for row in queryset:
+                row = transform(row) if transform else row
+                rows.setdefault(row.pk, row)
+        # Все поля ordering сортируются в одну сторону.
+        descending = self.ordering[0].startswith('-')
+        backward = self.direction == CURSOR_BACKWARD
+        return sorted(
+            rows.values(), reverse=descending != backward,
+            key=lambda row: [self._value(row, name) for name in self.fields],
+        )[:self.per_page + 1]
 
 
-def get_page_paginator(request, posts):
-    pagi = Paginator(posts, POST_ON_PEGE)
+def get_page_paginator(request, posts, per_page=POST_ON_PEGE,
+                       ordering=FEED_ORDERING, transform=None, sources=None):
+    query = {
+        key: value for key, value in request.GET.items()
+        if key not in ('cursor', 'page')
+    }
+    if sources:
+        pagi = MergedCursorPaginator(
+            posts, per_page, sources, ordering=ordering, query=query,
+        )
+    else:
+        pagi = CursorPaginator(
+            posts, per_page, ordering=ordering, query=query,
+            transform=transform,
+        )
     page_number = request.GET.get('page')
-    page_obj = pagi.get_page(page_number)
-    return page_obj
+    if page_number and 'cursor' not in request.GET:
+        return pagi.get_page(page_number)
+    return pagi.get_cursor_page(request.GET.get('cursor'))
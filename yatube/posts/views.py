@@ -1,38 +1,72 @@
+from django.conf import settings
+from django.http import Http404, StreamingHttpResponse
 from django.shortcuts import render, get_object_or_404, redirect
 from django.contrib.auth.decorators import login_required
+from django.db import transaction
 
+from core.asgi import asgi_variant
+from core.db import retry_on_locked
+from core.routers import replica_reads
+
+from . import live
 from .models import Post, Group, User, Follow
+from .caching import (
+    FEED_SCOPE, conditional_page, follow_scope, fragment_cache,
+    group_page_scopes, group_scope, index_scopes, post_page_scopes,
+    profile_page_scopes, profile_scope,
+)
+from .constants import (
+    COMMENT_DEFAULT_ORDER, COMMENT_ORDERINGS, COMMENTS_ON_PAGE,
+    SEARCH_ORDERING,
+)
+from .feed import get_follow_page, get_pulled_authors
 from .forms import PostForm, CommentForm
+from .selectors import (
+    feed_posts, group_posts, index_posts, page_object, post_comments,
+    profile_posts,
+)
+from .search import search
+from .stats import get_stats
 from .utils import get_page_paginator
 
 
+@replica_reads
+@conditional_page(index_scopes)
 def index(request):
-    posts = Post.objects.all()
+    posts = index_posts()
     page_obj = get_page_paginator(request, posts)
     context = {
         'page_obj': page_obj,
+        **fragment_cache(request, FEED_SCOPE),
     }
     return render(request, 'posts/index.html', context)
 
 
+@replica_reads
+@conditional_page(group_page_scopes)
 def group_list(request, slug):
-    group = get_object_or_404(Group, slug=slug)
-    posts = group.posts.all()
+    group = page_object(request, Group, slug=slug)
+    posts = group_posts(group)
     page_obj = get_page_paginator(request, posts)
     context = {
         'group': group,
         'page_obj': page_obj,
+        **fragment_cache(request, group_scope(group.pk)),
     }
     return render(request, 'posts/group_list.html', context)
 
 
+@replica_reads
+@conditional_page(profile_page_scopes)
 def profile(request, username):
-    author = get_object_or_404(User, username=username)
-    post_list = author.posts.all()
+    author = page_object(request, User, username=username)
+    post_list = profile_posts(author)
     page_obj = get_page_paginator(request, post_list)
     context = {
         'author': author,
+        'stats': get_stats(author),
         'page_obj': page_obj,
+        **fragment_cache(request, profile_scope(author.pk)),
     }
     if request.user.is_authenticated:
         following = Follow.objects.filter(
@@ -42,19 +76,60 @@ def profile(request, username):
     return render(request, 'posts/profile.html', context)
 
 
+def post_search(request):
+    query = request.GET.get('q', '').strip()
+    posts = search(query, feed_posts())
+    context = {
+        'query': query,
+        'page_obj': get_page_paginator(
+            request, posts, ordering=SEARCH_ORDERING
+        ),
+    }
+    return render(request, 'posts/search.html', context)
+
+
+def get_comment_page(request, post):
+    """Страница комментариев по курсору; ?order=new — сначала новые."""
+    order = request.GET.get('order')
+    if order not in COMMENT_ORDERINGS:
+        order = COMMENT_DEFAULT_ORDER
+    page_obj = get_page_paginator(
+        request, post_comments(post), per_page=COMMENTS_ON_PAGE,
+        ordering=COMMENT_ORDERINGS[order],
+    )
+    page_obj.order = order
+    return page_obj
+
+
+@replica_reads
+@conditional_page(post_page_scopes)
 def post_detail(request, post_id):
-    post = get_object_or_404(Post, pk=post_id)
-    comments = post.comments.all()
+    post = page_object(request, feed_posts(), pk=post_id)
     form = CommentForm()
     context = {
         'post': post,
-        'comments': comments,
+        'author_stats': get_stats(post.author),
+        'comments': get_comment_page(request, post),
         'form': form,
     }
     return render(request, 'posts/post_detail.html', context)
 
 
+@replica_reads
+@conditional_page(post_page_scopes)
+def comment_list(request, post_id):
+    """Фрагмент HTML со следующей порцией комментариев."""
+    post = page_object(request, feed_posts(), pk=post_id)
+    context = {
+        'post': post,
+        'comments': get_comment_page(request, post),
+    }
+    return render(request, 'posts/includes/comment_list.html', context)
+
+
 @login_required
+@retry_on_locked
+@transaction.atomic
 def post_create(request):
     form = PostForm(request.POST or None,
                     files=request.FILES or None)
@@ -71,6 +146,8 @@ def post_create(request):
 
 
 @login_required
+@retry_on_locked
+@transaction.atomic
 def post_edit(request, post_id):
     post = get_object_or_404(Post, pk=post_id)
     if post.author != request.user:
@@ -93,6 +170,8 @@ def post_edit(request, post_id):
 
 
 @login_required
+@retry_on_locked
+@transaction.atomic
 def add_comment(request, post_id):
     form = CommentForm(request.POST or None)
     if form.is_valid():
@@ -104,18 +183,25 @@ def add_comment(request, post_id):
 
 
 @login_required
+@replica_reads
 def follow_index(request):
-    posts = Post.objects.select_related(
-        'author', 'group').filter(author__following__user=request.user)
-
+    pulled = get_pulled_authors(request.user)
+    # Посты раздаваемых авторов сбрасывают ленту через follow_scope
+    # читателя (caching.bump_post); посты популярных авторов в ленту
+    # не раздаются, поэтому ключ включает версии их профилей.
+    scopes = [follow_scope(request.user.pk)]
+    scopes += [profile_scope(author_id) for author_id in pulled]
     context = {
-        'page_obj': get_page_paginator(request, posts),
+        'page_obj': get_follow_page(request, pulled),
+        **fragment_cache(request, *scopes),
     }
 
     return render(request, 'posts/follow.html', context)
 
 
 @login_required
+@retry_on_locked
+@transaction.atomic
 def profile_follow(request, username):
     user = request.user
     author = get_object_or_404(User, username=username)
@@ -125,7 +211,24 @@ def profile_follow(request, username):
 
 
 @login_required
+@retry_on_locked
+@transaction.atomic
 def profile_unfollow(request, username):
     Follow.objects.filter(user=request.user,
                           author__username=username).delete()
     return redirect('posts:profile', username)
+
+
+@asgi_variant(live.asgi_stream)
+def live_stream(request, kind, slug=None):
+    """Поток SSE с карточками новых постов ленты kind."""
+    if not settings.LIVE_ENABLED:
+        raise Http404
+    channels = live.page_channels(request.user, kind, slug)
+    response = StreamingHttpResponse(
+        live.stream(channels),
+        content_type='text/event-stream; charset=utf-8',
+    )
+    response['Cache-Control'] = 'no-cache'
+    response['X-Accel-Buffering'] = 'no'
+    return response
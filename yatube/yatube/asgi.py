@@ -0,0 +1,20 @@
+"""
+ASGI config for yatube project.
+
+It exposes the ASGI callable as a module-level variable named
+``application``: ``uvicorn yatube.asgi:application``. Django 2.2 has no
+ASGI handler of its own, see core.asgi.
+"""
+
+import os
+
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
+
+from core.asgi import get_asgi_application  # noqa: E402
+
+application = get_asgi_application()
+
+# Шаблоны разбираются при старте процесса, а не на первом запросе.
+from core.templating import warm_templates  # noqa: E402
+
+warm_templates()
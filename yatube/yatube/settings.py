@@ -11,7 +11,7 @@ BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
 SECRET_KEY = 'mz-1p9-zpf^dp81zzxc4913d)9-bt4roluix*-$trv+qsx(%bb'
 
 # SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
+DEBUG = os.environ.get('YATUBE_DEBUG', '1') != '0'
 
 ALLOWED_HOSTS = [
     'localhost',
@@ -34,10 +34,13 @@ INSTALLED_APPS = [
     'users.apps.UsersConfig',
     'core.apps.CoreConfig',
     'about.apps.AboutConfig',
+    'api.apps.ApiConfig',
     'sorl.thumbnail',
 ]
 
 MIDDLEWARE = [
+    'core.middleware.PerformanceMiddleware',
+    'core.routers.ReplicaPinMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -51,36 +54,101 @@ ROOT_URLCONF = 'yatube.urls'
 
 TEMPLATES_DIR = os.path.join(BASE_DIR, 'templates')
 
+# Без DEBUG шаблоны разбираются один раз на процесс: кэширующий
+# загрузчик, а core.templating.warm_templates() собирает их при старте
+# (yatube/wsgi.py), до первого запроса.
+TEMPLATE_LOADERS = [
+    'django.template.loaders.filesystem.Loader',
+    'django.template.loaders.app_directories.Loader',
+]
+if not DEBUG:
+    TEMPLATE_LOADERS = [
+        ('django.template.loaders.cached.Loader', TEMPLATE_LOADERS),
+    ]
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
         'DIRS': [TEMPLATES_DIR],
-        'APP_DIRS': True,
         'OPTIONS': {
+            'loaders': TEMPLATE_LOADERS,
             'context_processors': [
                 'django.template.context_processors.debug',
                 'django.template.context_processors.request',
                 'django.contrib.auth.context_processors.auth',
                 'django.contrib.messages.context_processors.messages',
                 'core.context_processors.year.year',
+                'core.context_processors.live.live',
             ],
         },
     },
 ]
 
 WSGI_APPLICATION = 'yatube.wsgi.application'
+ASGI_APPLICATION = 'yatube.asgi.application'
+# Потоки, в которых ASGI-приложение выполняет синхронный Django: столько
+# запросов обрабатывается одновременно, остальные ждут в цикле событий.
+ASGI_THREADS = int(os.environ.get('YATUBE_ASGI_THREADS', 32))
+
+# Доля общего времени разбора шаблонов, начиная с которой шаблон
+# считается узким местом (manage.py warm_templates, check --deploy).
+TEMPLATE_PARSE_DOMINANT_SHARE = 0.25
 
 
 # Database
 # https://docs.djangoproject.com/en/2.2/ref/settings/#databases
 
+# Соединение живёт CONN_MAX_AGE секунд и проверяется в начале каждого
+# запроса (core.db.check_connections); timeout — сколько секунд SQLite
+# ждёт занятую базу, прежде чем ответить «database is locked».
 DATABASES = {
     'default': {
         'ENGINE': 'django.db.backends.sqlite3',
         'NAME': os.path.join(BASE_DIR, 'db.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {'timeout': 20},
     }
 }
 
+# Прагмы каждого нового соединения SQLite (core.db.configure_connection):
+# WAL не даёт писателю блокировать читателей.
+SQLITE_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'mmap_size': 128 * 1024 * 1024,
+    'cache_size': -16000,
+    'temp_store': 'MEMORY',
+}
+# Повторы записи, упавшей с «database is locked», и первая пауза.
+SQLITE_WRITE_RETRIES = 5
+SQLITE_RETRY_DELAY = 0.05
+
+# Реплики для чтения страниц лент: YATUBE_DB_REPLICAS=2 добавит две
+# копии основной базы. Первую копию делает manage.py sync_replicas,
+# дальше их обновляет core.replication после каждой записи.
+DATABASE_REPLICAS = [
+    f'replica_{number}'
+    for number in range(1, int(os.environ.get('YATUBE_DB_REPLICAS', 0)) + 1)
+]
+for alias in DATABASE_REPLICAS:
+    DATABASES[alias] = {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': os.path.join(BASE_DIR, f'db-{alias}.sqlite3'),
+        'CONN_MAX_AGE': 60,
+        'OPTIONS': {'timeout': 20},
+        'TEST': {'MIRROR': 'default'},
+    }
+
+DATABASE_ROUTERS = ['core.routers.ReplicaRouter']
+
+# Сколько секунд после записи пользователь читает с основной базы.
+REPLICA_PIN_SECONDS = 5
+REPLICA_PIN_COOKIE = 'use_primary'
+
+# Копировать основную базу в реплики-файлы и с какой задержкой.
+REPLICATION_STAND_IN = True
+REPLICATION_LAG = 1
+
 
 # Password validation
 # https://docs.djangoproject.com/en/2.2/ref/settings/#auth-password-validators
@@ -130,10 +198,73 @@ EMAIL_FILE_PATH = os.path.join(BASE_DIR, 'sent_emails')
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Потоки, в которых строятся миниатюры картинок; 0 — строить сразу.
+POST_THUMBNAIL_WORKERS = 2
+
+# Картинки постов при загрузке (posts.images): большая сторона не
+# длиннее POST_IMAGE_MAX_SIZE, формат WEBP или JPEG, если Pillow
+# собран без WebP. Больше POST_IMAGE_MAX_PIXELS пикселей не принимаем.
+POST_IMAGE_MAX_SIZE = 1920
+POST_IMAGE_FORMAT = 'WEBP'
+POST_IMAGE_QUALITY = 82
+POST_IMAGE_MAX_PIXELS = 40 * 10 ** 6
+# Файл картинки без ссылок удаляется, только если его не записывали и
+# не переиспользовали последние POST_IMAGE_ORPHAN_AGE секунд: на него
+# может сослаться пост, который ещё не зафиксирован.
+POST_IMAGE_ORPHAN_AGE = 10 * 60
+
+# Живая лента (posts.live). Выключена по умолчанию: под WSGI каждая
+# открытая вкладка держит поток сервера. Включать при запуске через
+# ASGI (yatube.asgi) или с запасом потоков WSGI-сервера.
+LIVE_ENABLED = os.environ.get('YATUBE_LIVE_ENABLED') == '1'
+# Под WSGI поток закрывается через LIVE_WSGI_LIFETIME секунд, и браузер
+# переподключается сам: поток сервера не занят вкладкой навсегда.
+LIVE_WSGI_LIFETIME = 60
+# Сколько событий ждёт медленного клиента и как часто слать пустой
+# комментарий, чтобы прокси не рвали поток.
+LIVE_QUEUE_SIZE = 100
+LIVE_HEARTBEAT = 15
+# Заместитель доставки между процессами: события кладутся в общий кэш
+# (без локальной копии), процессы забирают чужие раз в
+# LIVE_POLL_INTERVAL секунд.
+LIVE_STAND_IN = True
+LIVE_RELAY_CACHE = 'shared'
+LIVE_POLL_INTERVAL = 0.5
+LIVE_EVENT_TIMEOUT = 60
+
 CSRF_FAILURE_VIEW = 'core.views.csrf_failure'
 
+# Доля запросов, у которых замеряются база, шаблоны и кэш.
+PERFORMANCE_SAMPLE_RATE = 0.1
+
+# Адреса, с которых доступны метрики /metrics/.
+INTERNAL_IPS = ['127.0.0.1']
+
+# Память процесса перед общим для всех воркеров кэшем в SQLite. Пустой
+# LOCATION кладёт файл кэша рядом с базой, в тестах — в память.
+# Для нескольких машин SHARED можно направить на memcached.
 CACHES = {
     'default': {
-        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
-    }
+        'BACKEND': 'core.cache.TieredCache',
+        'LOCATION': 'yatube',
+        'OPTIONS': {
+            'SHARED': 'shared',
+            'MAX_ENTRIES': 1000,
+            'MAX_BYTES': 32 * 1024 * 1024,
+            'LOCAL_TIMEOUT': 60,
+            'POLL_INTERVAL': 0.5,
+        },
+    },
+    'shared': {
+        'BACKEND': 'core.cache.SQLiteCache',
+        'LOCATION': '',
+        'OPTIONS': {
+            'MAX_ENTRIES': 50000,
+        },
+    },
+    # Фрагменты дальних страниц лент (?cursor=, ?page=) не хранятся:
+    # иначе каждый придуманный курсор оставлял бы в кэше свой ключ.
+    'uncached': {
+        'BACKEND': 'django.core.cache.backends.dummy.DummyCache',
+    },
 }
@@ -3,6 +3,8 @@ from django.urls import include, path
 from django.conf import settings
 from django.conf.urls.static import static
 
+from core.views import prometheus_metrics
+
 
 handler404 = 'core.views.page_not_found'
 handler500 = 'core.views.server_error'
@@ -14,6 +16,8 @@ urlpatterns = [
     path('auth/', include('users.urls', namespace='users')),
     path('auth/', include('django.contrib.auth.urls')),
     path('about/', include('about.urls', namespace='about')),
+    path('api/v1/', include('api.urls', namespace='api')),
+    path('metrics/', prometheus_metrics, name='metrics'),
 ]
 
 if settings.DEBUG:
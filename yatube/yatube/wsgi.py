@@ -1,5 +1,5 @@
 """
-WSGI config for education project.
+WSGI config for yatube project.
 
 It exposes the WSGI callable as a module-level variable named ``application``.
 
@@ -11,6 +11,11 @@ import os
 
 from django.core.wsgi import get_wsgi_application
 
-os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'education.settings')
+os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'yatube.settings')
 
 application = get_wsgi_application()
+
+# Шаблоны разбираются при старте процесса, а не на первом запросе.
+from core.templating import warm_templates  # noqa: E402
+
+warm_templates()